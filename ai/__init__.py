@@ -1,6 +1,25 @@
 """
 AI Module for Disease Risk Prediction
 """
+from .knowledge_base import (
+    KnowledgeBase,
+    KnowledgeBaseError,
+    KnowledgeBaseWatcher,
+    get_knowledge_base,
+    reload_knowledge_base
+)
 from .risk.risk_model import predict_risks
+from .risk.batch_model import predict_risks_batch
+from .instrumentation import ENGINE_TIMINGS, enable_engine_timing
 
-__all__ = ['predict_risks']
\ No newline at end of file
+__all__ = [
+    'predict_risks',
+    'predict_risks_batch',
+    'KnowledgeBase',
+    'KnowledgeBaseError',
+    'KnowledgeBaseWatcher',
+    'get_knowledge_base',
+    'reload_knowledge_base',
+    'ENGINE_TIMINGS',
+    'enable_engine_timing'
+]
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""
+Offline population scoring
+Streams a JSONL or CSV cohort through the batch risk engine
+
+Usage:
+    python -m ai.batch cohort.jsonl -o scores.jsonl --workers 4
+    python -m ai.batch cohort.csv -o scores.jsonl --resume
+
+Each input record has the RiskRequest shape (patient, lifestyle, family,
+lab_values). CSV files use dotted column names (patient.age,
+lifestyle.smoking, lab_values.hba1c, ...) with family as a JSON array.
+
+Output is one JSON line per input record, in input order:
+    {"index": 0, "id": ..., "kb_version": "...", "results": [...]}
+    {"index": 1, "error": "..."}
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from .knowledge_base import get_knowledge_base
+from .risk.risk_model import predict_risks
+from .risk.batch_model import predict_risks_batch
+
+DEFAULT_CHUNK_SIZE = 1000
+CHECKPOINT_SUFFIX = ".ckpt"
+
+# -------------------- INPUT --------------------
+
+def detect_format(path: str) -> str:
+    """'csv' for .csv files, 'jsonl' otherwise"""
+    return "csv" if str(path).lower().endswith(".csv") else "jsonl"
+
+
+def iter_records(path: str, fmt: str = "auto") -> Iterator[Tuple[Optional[Dict], Optional[str]]]:
+    """
+    Yield (record, error) pairs in file order - exactly one of them is None
+
+    Blank JSONL lines are skipped and do not count as records.
+    """
+    fmt = detect_format(path) if fmt == "auto" else fmt
+    stream = sys.stdin if path == "-" else open(path, "r", newline="" if fmt == "csv" else None)
+
+    try:
+        if fmt == "csv":
+            for row in csv.DictReader(stream):
+                try:
+                    yield normalize_record(csv_row_to_record(row)), None
+                except (ValueError, TypeError) as e:
+                    yield None, str(e)
+        else:
+            for line in stream:
+                if not line.strip():
+                    continue
+                try:
+                    yield normalize_record(json.loads(line)), None
+                except (ValueError, TypeError) as e:
+                    yield None, str(e)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def csv_row_to_record(row: Dict[str, str]) -> Dict[str, Any]:
+    """Nest dotted CSV columns; cells are JSON-decoded when possible"""
+    record: Dict[str, Any] = {}
+    for column, cell in row.items():
+        if column is None or cell is None or cell == "":
+            continue
+        try:
+            value = json.loads(cell)
+        except ValueError:
+            value = cell
+
+        target = record
+        *parents, leaf = column.strip().split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return record
+
+
+def normalize_record(record: Any) -> Dict[str, Any]:
+    """
+    Check the RiskRequest shape and fill optional sections
+
+    Raises:
+        ValueError: If a required section is missing or has the wrong type
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record must be a JSON object")
+    for key, kind in (("patient", dict), ("lifestyle", dict), ("family", list)):
+        if not isinstance(record.get(key), kind):
+            raise ValueError(f"'{key}' must be a{'n object' if kind is dict else ' list'}")
+
+    lab_values = record.get("lab_values") or {}
+    if not isinstance(lab_values, dict):
+        raise ValueError("'lab_values' must be an object")
+
+    normalized = dict(record)
+    normalized["lab_values"] = lab_values
+    return normalized
+
+
+# -------------------- SCORING (worker side) --------------------
+
+def score_chunk(chunk: List[Tuple[int, Optional[Dict], Optional[str]]], details: bool) -> Tuple[str, int, float, float]:
+    """
+    Score one chunk and serialize it
+
+    Runs in a worker process. A record that breaks the batch path is
+    re-scored alone so one bad record does not fail its whole chunk.
+
+    Returns:
+        (output lines, error count, scoring seconds, serialization seconds)
+    """
+    kb = get_knowledge_base()
+    start = time.perf_counter()
+
+    valid = [(index, record) for index, record, error in chunk if error is None]
+    try:
+        scored = predict_risks_batch([record for _, record in valid], kb, details=details)
+        outcomes = {index: (results, None) for (index, _), results in zip(valid, scored)}
+    except Exception:
+        outcomes = {}
+        for index, record in valid:
+            try:
+                outcomes[index] = (_score_one(record, kb, details), None)
+            except Exception as e:
+                outcomes[index] = (None, f"{type(e).__name__}: {e}")
+
+    scored_at = time.perf_counter()
+
+    lines = []
+    errors = 0
+    for index, record, error in chunk:
+        results, error = outcomes.get(index, (None, error))
+        if error is not None:
+            errors += 1
+            lines.append(json.dumps({"index": index, "error": error}, separators=(",", ":")))
+            continue
+        row = {"index": index}
+        if "id" in record:
+            row["id"] = record["id"]
+        row["kb_version"] = kb.version
+        row["results"] = results
+        lines.append(json.dumps(row, separators=(",", ":")))
+
+    done = time.perf_counter()
+    return "".join(line + "\n" for line in lines), errors, scored_at - start, done - scored_at
+
+
+def _score_one(record: Dict, kb, details: bool) -> List[Dict]:
+    """Scalar fallback for a single record"""
+    results = predict_risks(record, kb)
+    if details:
+        return results
+    keys = ("disease_name", "disease_id", "probability", "risk_class")
+    return [{key: r[key] for key in keys} for r in results]
+
+
+# -------------------- CHECKPOINT --------------------
+
+def read_checkpoint(path: Path) -> Dict[str, Any]:
+    """Checkpoint contents, or an empty dict if there is none"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_checkpoint(path: Path, records_done: int, output_bytes: int, input_path: str) -> None:
+    """Atomically record how far the output is complete"""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"input": input_path, "records_done": records_done, "output_bytes": output_bytes}, f)
+    os.replace(tmp, path)
+
+
+# -------------------- DRIVER --------------------
+
+def run(
+    input_path: str,
+    output_path: str,
+    fmt: str = "auto",
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    details: bool = False,
+    resume: bool = False,
+    checkpoint_path: Optional[str] = None,
+    log=sys.stderr
+) -> Dict[str, Any]:
+    """
+    Score a cohort file and write results in input order
+
+    At most 2 x workers chunks are in flight, so memory stays bounded by
+    chunk_size regardless of the cohort size.
+
+    Returns:
+        Run statistics (records, errors, elapsed and per-stage seconds)
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    to_stdout = output_path == "-"
+    checkpoint = None if to_stdout else Path(checkpoint_path or output_path + CHECKPOINT_SUFFIX)
+
+    skip = 0
+    if resume and checkpoint is not None:
+        state = read_checkpoint(checkpoint)
+        if state and state.get("input") != input_path:
+            raise ValueError(f"Checkpoint {checkpoint} belongs to {state.get('input')}, not {input_path}")
+        skip = state.get("records_done", 0)
+        if skip and Path(output_path).exists():
+            # Drop anything written after the last checkpoint
+            with open(output_path, "r+b") as f:
+                f.truncate(state.get("output_bytes", 0))
+        print(f"Resuming at record {skip}", file=log)
+
+    out = sys.stdout if to_stdout else open(output_path, "a" if skip else "w", encoding="utf-8")
+    stats = {"records": 0, "errors": 0, "read_s": 0.0, "score_s": 0.0, "serialize_s": 0.0, "write_s": 0.0}
+    records_done = skip
+    started = time.perf_counter()
+
+    def write(result) -> None:
+        nonlocal records_done
+        text, errors, score_s, serialize_s, count = result
+        write_start = time.perf_counter()
+        out.write(text)
+        out.flush()
+        records_done += count
+        if checkpoint is not None:
+            write_checkpoint(checkpoint, records_done, out.tell(), input_path)
+        stats["write_s"] += time.perf_counter() - write_start
+        stats["records"] += count
+        stats["errors"] += errors
+        stats["score_s"] += score_s
+        stats["serialize_s"] += serialize_s
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    pending = deque()
+    try:
+        for chunk in _chunks(iter_records(input_path, fmt), chunk_size, skip, stats):
+            if pool is None:
+                write((*score_chunk(chunk, details), len(chunk)))
+                continue
+
+            pending.append((pool.submit(score_chunk, chunk, details), len(chunk)))
+            # Backpressure: wait for the oldest chunk before reading further ahead
+            while len(pending) >= 2 * workers:
+                future, count = pending.popleft()
+                write((*future.result(), count))
+
+        while pending:
+            future, count = pending.popleft()
+            write((*future.result(), count))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if not to_stdout:
+            out.close()
+
+    stats["elapsed_s"] = time.perf_counter() - started
+    stats["records_per_s"] = stats["records"] / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+    stats["records_done"] = records_done
+    return stats
+
+
+def _chunks(records: Iterator, chunk_size: int, skip: int, stats: Dict) -> Iterator[List]:
+    """Group (index, record, error) into chunks, skipping already-done records"""
+    chunk = []
+    read_start = time.perf_counter()
+    for index, (record, error) in enumerate(records):
+        if index < skip:
+            continue
+        chunk.append((index, record, error))
+        if len(chunk) >= chunk_size:
+            stats["read_s"] += time.perf_counter() - read_start
+            yield chunk
+            chunk = []
+            read_start = time.perf_counter()
+    stats["read_s"] += time.perf_counter() - read_start
+    if chunk:
+        yield chunk
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m ai.batch",
+        description="Score a JSONL/CSV cohort of RiskRequest records"
+    )
+    parser.add_argument("input", help="Input file (.jsonl or .csv), or - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="Output JSONL file, or - for stdout")
+    parser.add_argument("--format", choices=["auto", "jsonl", "csv"], default="auto")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count, 0 = score in this process)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--details", action="store_true",
+                        help="Include reasons, prevention, tests and consult guidance")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint")
+    parser.add_argument("--checkpoint", help=f"Checkpoint file (default: OUTPUT{CHECKPOINT_SUFFIX})")
+    args = parser.parse_args(argv)
+
+    if args.resume and args.output == "-":
+        parser.error("--resume needs a file output")
+
+    print(f"Knowledge base version {get_knowledge_base().version}", file=sys.stderr)
+    stats = run(
+        args.input,
+        args.output,
+        fmt=args.format,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        details=args.details,
+        resume=args.resume,
+        checkpoint_path=args.checkpoint
+    )
+
+    print(
+        f"Scored {stats['records']:,} records ({stats['errors']:,} errors) in {stats['elapsed_s']:.2f}s "
+        f"- {stats['records_per_s']:,.0f} records/s\n"
+        f"  read {stats['read_s']:.2f}s | score {stats['score_s']:.2f}s | "
+        f"serialize {stats['serialize_s']:.2f}s | write {stats['write_s']:.2f}s "
+        f"(score/serialize summed over workers)",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,21 +3,14 @@ Prevention recommendation engine
 Generates personalized prevention plans based on disease, risk class, and user profile
 """
 
-import json
-from pathlib import Path
 from typing import Dict, List, Any
-
-# Module-relative paths
-BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
-GUIDELINES_PATH = DATA_DIR / "guidelines.json"
+from ..knowledge_base import get_knowledge_base
 
 
 def load_guidelines():
-    """Load prevention guidelines from JSON"""
+    """Load prevention guidelines from the compiled knowledge base"""
     try:
-        with open(GUIDELINES_PATH, 'r') as f:
-            return json.load(f)
+        return get_knowledge_base().guidelines
     except Exception as e:
         print(f"Error loading guidelines: {e}")
         return {}
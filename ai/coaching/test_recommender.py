@@ -3,21 +3,14 @@ Screening test recommender
 Suggests appropriate medical tests based on disease risk and user profile
 """
 
-import json
-from pathlib import Path
 from typing import Dict, List, Any
-
-# Module-relative paths
-BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
-TESTS_PATH = DATA_DIR / "tests_map.json"
+from ..knowledge_base import get_knowledge_base
 
 
 def load_tests_map():
-    """Load tests mapping from JSON"""
+    """Load tests mapping from the compiled knowledge base"""
     try:
-        with open(TESTS_PATH, 'r') as f:
-            return json.load(f)
+        return get_knowledge_base().tests_map
     except Exception as e:
         print(f"Error loading tests map: {e}")
         return {}
@@ -0,0 +1,183 @@
+"""
+Engine instrumentation
+Per-stage, per-disease timing histograms for the risk engine plus an
+optional per-request timing collector; a single flag check per stage
+when both are off
+"""
+
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds - engine stages run in microseconds
+ENGINE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.1
+)
+
+STAGES = ('score', 'reasons', 'prevention', 'tests', 'consult')
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus semantics)
+
+    Attributes:
+        buckets: Sorted upper bounds; an implicit +Inf bucket follows
+        counts: Observations per bucket (not cumulative)
+        total: Sum of observed values
+        count: Number of observations
+    """
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        """([(upper_bound, cumulative_count), ...], sum, count) - last bound is inf"""
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+        cumulative = []
+        running = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            running += n
+            cumulative.append((bound, running))
+        return cumulative, total, count
+
+
+class EngineTimings:
+    """
+    Stage timings for predict_risks
+
+    Usage (hot path):
+        timings = ENGINE_TIMINGS if ENGINE_TIMINGS.enabled else None
+        start = perf_counter() if timings else 0.0
+        ...
+        if timings: start = timings.lap('score', disease_id, start)
+    """
+
+    def __init__(self, buckets: Iterable[float] = ENGINE_BUCKETS):
+        self.enabled = False
+        self.buckets = tuple(buckets)
+        self.stages: Dict[Tuple[str, str], Histogram] = {}
+        self.calls = Histogram(self.buckets)
+        self._lock = threading.Lock()
+
+    def active(self) -> bool:
+        """True if histograms are on or the current request collects timings"""
+        return self.enabled or _request_timings.get() is not None
+
+    def lap(self, stage: str, disease_id: str, start: float) -> float:
+        """Record perf_counter() - start for (stage, disease); return now"""
+        now = perf_counter()
+        if self.enabled:
+            histogram = self.stages.get((stage, disease_id))
+            if histogram is None:
+                with self._lock:
+                    histogram = self.stages.setdefault((stage, disease_id), Histogram(self.buckets))
+            histogram.observe(now - start)
+        record_timing(f"engine-{stage}", now - start)
+        return now
+
+    def finish_call(self, seconds: float) -> None:
+        """Record one whole predict_risks call"""
+        if self.enabled:
+            self.calls.observe(seconds)
+        record_timing("engine", seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages = {}
+            self.calls = Histogram(self.buckets)
+
+
+ENGINE_TIMINGS = EngineTimings()
+
+
+def enable_engine_timing(enabled: bool = True) -> None:
+    """Turn predict_risks stage timing on or off (off by default)"""
+    ENGINE_TIMINGS.enabled = enabled
+
+
+# -------------------- PER-REQUEST TIMINGS --------------------
+
+class RequestTimings:
+    """
+    Durations collected while serving one request (for Server-Timing)
+
+    Attributes:
+        start: perf_counter() when the request began
+        durations: Accumulated seconds per stage name
+        marks: perf_counter() timestamps of named points
+        profile: True if this request should be profiled
+        profiles: cProfile.Profile objects collected from worker threads
+    """
+
+    def __init__(self, profile: bool = False):
+        self.start = perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self.profile = profile
+        self.profiles: List[Any] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = perf_counter()
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def begin_request_timings(profile: bool = False):
+    """Start collecting for the current context; returns (timings, token)"""
+    timings = RequestTimings(profile)
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timings(token) -> None:
+    _request_timings.reset(token)
+
+
+def current_request_timings() -> Optional[RequestTimings]:
+    return _request_timings.get()
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """Add to the current request's timings (no-op outside a request)"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def mark_timing(name: str) -> None:
+    """Timestamp a named point in the current request (no-op outside a request)"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.mark(name)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Time a block into the current request's timings"""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, perf_counter() - start)
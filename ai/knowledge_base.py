@@ -0,0 +1,339 @@
+"""
+Compiled knowledge base
+Loads the JSON files in ai/data once, validates them and builds the
+lookup indexes used by the risk engine, coaching modules and backend
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+# Module-relative paths
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+
+# File name -> attribute name on the knowledge base
+DATA_FILES = {
+    "diseases_config.json": "diseases_config",
+    "guidelines.json": "guidelines",
+    "tests_map.json": "tests_map",
+    "sample_inputs.json": "sample_inputs",
+}
+
+RISK_CLASSES = ['I', 'II', 'III', 'IV']
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLDS = {
+    'I': {'min': 0.0, 'max': 0.30},
+    'II': {'min': 0.30, 'max': 0.55},
+    'III': {'min': 0.55, 'max': 0.75},
+    'IV': {'min': 0.75, 'max': 1.0}
+}
+
+
+class KnowledgeBaseError(ValueError):
+    """Raised when the data files are missing or fail validation"""
+
+
+class KnowledgeBase:
+    """
+    Immutable, pre-indexed snapshot of the data files
+
+    Build with KnowledgeBase.load(). Treat every attribute as read-only:
+    a snapshot is shared by all requests scored against it.
+
+    Attributes:
+        version: Short content hash of all data files
+        diseases: Disease configs in file order
+        diseases_by_id: Disease config keyed by disease id
+        thresholds: Risk class thresholds ({'I': {'min', 'max'}, ...})
+        tests_by_disease: Screening tests keyed by disease id
+        prevention_index: Prevention list keyed by (disease_id, risk_class)
+    """
+
+    def __init__(self, raw: Dict[str, Any], version: str, data_dir: Path = DATA_DIR):
+        validate(raw)
+
+        self.version = version
+        self.data_dir = data_dir
+
+        self.diseases_config = raw['diseases_config']
+        self.guidelines = raw['guidelines']
+        self.tests_map = raw['tests_map']
+        self.sample_inputs = raw['sample_inputs']
+
+        self.diseases: List[Dict[str, Any]] = self.diseases_config['diseases']
+        self.diseases_by_id: Dict[str, Dict[str, Any]] = {d['id']: d for d in self.diseases}
+        self.thresholds: Dict[str, Dict[str, float]] = self.diseases_config.get(
+            'risk_class_thresholds', DEFAULT_THRESHOLDS
+        )
+        self.risk_classes: Dict[str, Dict[str, Any]] = self.guidelines.get('risk_classes', {})
+        self.tests_by_disease: Dict[str, List[Dict[str, Any]]] = self.tests_map.get('disease_tests', {})
+        self.prevention_index: Dict[Tuple[str, str], List[str]] = {
+            (disease['id'], risk_class): build_prevention(self.guidelines, disease['id'], risk_class)
+            for disease in self.diseases
+            for risk_class in RISK_CLASSES
+        }
+
+    @classmethod
+    def load(cls, data_dir: Path = DATA_DIR) -> 'KnowledgeBase':
+        """Read, hash, parse and validate every data file in data_dir"""
+        digest = hashlib.sha256()
+        raw = {}
+
+        for filename, key in DATA_FILES.items():
+            path = Path(data_dir) / filename
+            try:
+                content = path.read_bytes()
+            except OSError as e:
+                raise KnowledgeBaseError(f"Cannot read {path}: {e}") from e
+
+            try:
+                raw[key] = json.loads(content)
+            except json.JSONDecodeError as e:
+                raise KnowledgeBaseError(f"Invalid JSON in {path}: {e}") from e
+
+            digest.update(filename.encode())
+            digest.update(content)
+
+        return cls(raw, digest.hexdigest()[:12], Path(data_dir))
+
+    def get_disease(self, disease_id: str) -> Optional[Dict[str, Any]]:
+        """Disease config by id, or None"""
+        return self.diseases_by_id.get(disease_id)
+
+    def get_tests(self, disease_id: str) -> List[Dict[str, Any]]:
+        """Screening tests for a disease (empty list if unknown)"""
+        return self.tests_by_disease.get(disease_id, [])
+
+    def get_prevention(self, disease_id: str, risk_class: str) -> List[str]:
+        """Top prevention recommendations for a disease at a risk class"""
+        prevention = self.prevention_index.get((disease_id, risk_class))
+        if prevention is None:
+            prevention = build_prevention(self.guidelines, disease_id, risk_class)
+        return list(prevention)
+
+    def get_risk_class_info(self, risk_class: str) -> Dict[str, Any]:
+        """Label, description, color and guidance for a risk class"""
+        return self.risk_classes.get(risk_class, {})
+
+
+def validate(raw: Dict[str, Any]) -> None:
+    """
+    Check the structure the engine relies on
+
+    Raises:
+        KnowledgeBaseError: On the first problem found
+    """
+    config = raw['diseases_config']
+    if not isinstance(config, dict) or not isinstance(config.get('diseases'), list):
+        raise KnowledgeBaseError("diseases_config.json must contain a 'diseases' list")
+
+    seen = set()
+    for index, disease in enumerate(config['diseases']):
+        if not isinstance(disease, dict):
+            raise KnowledgeBaseError(f"Disease #{index} is not an object")
+        for key in ('id', 'name'):
+            if not isinstance(disease.get(key), str) or not disease[key]:
+                raise KnowledgeBaseError(f"Disease #{index} is missing '{key}'")
+        if disease['id'] in seen:
+            raise KnowledgeBaseError(f"Duplicate disease id '{disease['id']}'")
+        seen.add(disease['id'])
+
+        family_weight = disease.get('family_weight', 0.30)
+        if not isinstance(family_weight, (int, float)) or not 0.0 <= family_weight <= 1.0:
+            raise KnowledgeBaseError(f"Disease '{disease['id']}' has invalid family_weight")
+        for key in ('lifestyle_factors', 'lab_markers'):
+            if not isinstance(disease.get(key, []), list):
+                raise KnowledgeBaseError(f"Disease '{disease['id']}' field '{key}' must be a list")
+        thresholds = disease.get('thresholds', {})
+        if not isinstance(thresholds, dict) or not all(
+            isinstance(v, (int, float)) for v in thresholds.values()
+        ):
+            raise KnowledgeBaseError(f"Disease '{disease['id']}' thresholds must be numeric")
+
+    class_thresholds = config.get('risk_class_thresholds', DEFAULT_THRESHOLDS)
+    previous = None
+    for risk_class in RISK_CLASSES:
+        bound = class_thresholds.get(risk_class, {}).get('min')
+        if not isinstance(bound, (int, float)):
+            raise KnowledgeBaseError(f"risk_class_thresholds.{risk_class}.min is missing")
+        if previous is not None and bound < previous:
+            raise KnowledgeBaseError("risk_class_thresholds must be increasing")
+        previous = bound
+
+    guidelines = raw['guidelines']
+    if not isinstance(guidelines, dict) or not isinstance(guidelines.get('risk_classes'), dict):
+        raise KnowledgeBaseError("guidelines.json must contain 'risk_classes'")
+
+    tests_map = raw['tests_map']
+    disease_tests = tests_map.get('disease_tests', {}) if isinstance(tests_map, dict) else None
+    if not isinstance(disease_tests, dict):
+        raise KnowledgeBaseError("tests_map.json must contain a 'disease_tests' object")
+    for disease_id, tests in disease_tests.items():
+        if not isinstance(tests, list) or not all(isinstance(t, dict) and 'name' in t for t in tests):
+            raise KnowledgeBaseError(f"Tests for '{disease_id}' must be objects with a 'name'")
+
+    if not isinstance(raw['sample_inputs'], dict):
+        raise KnowledgeBaseError("sample_inputs.json must be an object")
+
+
+def build_prevention(guidelines: Dict, disease_id: str, risk_class: str) -> List[str]:
+    """Combine disease-specific and risk-class prevention into the top 5 items"""
+    # Get risk class general prevention
+    general_prevention = guidelines.get('risk_classes', {}).get(risk_class, {}).get('prevention', [])
+
+    # Get disease-specific prevention
+    disease_prevention = guidelines.get('disease_specific_prevention', {}).get(disease_id, {})
+
+    combined = []
+
+    # Add top items from disease-specific categories
+    if 'diet' in disease_prevention:
+        combined.extend(disease_prevention['diet'][:2])
+    if 'exercise' in disease_prevention:
+        combined.extend(disease_prevention['exercise'][:1])
+    if 'lifestyle' in disease_prevention:
+        combined.extend(disease_prevention['lifestyle'][:2])
+
+    # Add general prevention if high risk
+    if risk_class in ['III', 'IV']:
+        combined.extend(general_prevention[:2])
+
+    # Deduplicate while preserving order
+    seen = set()
+    deduped = []
+    for item in combined:
+        if item not in seen:
+            seen.add(item)
+            deduped.append(item)
+
+    return deduped[:5]  # Return top 5 recommendations
+
+
+def data_files_signature(data_dir: Path = DATA_DIR) -> Tuple:
+    """(mtime_ns, size) of every data file - cheap change detection"""
+    signature = []
+    for filename in DATA_FILES:
+        try:
+            stat = (Path(data_dir) / filename).stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+# -------------------- SHARED SNAPSHOT --------------------
+
+_current: Optional[KnowledgeBase] = None
+_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """
+    Return the active knowledge base, loading it on first use
+
+    Callers should fetch the snapshot once per unit of work and keep
+    using that reference, so one prediction never mixes two versions.
+    """
+    kb = _current
+    if kb is None:
+        with _lock:
+            if _current is None:
+                _set_current(KnowledgeBase.load())
+            kb = _current
+    return kb
+
+
+def reload_knowledge_base(data_dir: Path = DATA_DIR) -> KnowledgeBase:
+    """
+    Build a fresh snapshot and swap it in
+
+    The new snapshot is fully loaded and validated before the swap, so
+    on error the previous snapshot stays active and the error propagates.
+    In-flight callers keep the reference they already hold.
+    """
+    kb = KnowledgeBase.load(data_dir)
+    with _lock:
+        _set_current(kb)
+    return kb
+
+
+def _set_current(kb: KnowledgeBase) -> None:
+    global _current
+    _current = kb
+
+
+class KnowledgeBaseWatcher:
+    """
+    Background thread that polls the data files and hot-reloads on change
+
+    Usage:
+        watcher = KnowledgeBaseWatcher(interval=5.0)
+        watcher.start()
+        ...
+        watcher.stop()
+    """
+
+    def __init__(self, interval: float = 5.0, data_dir: Path = DATA_DIR):
+        self.interval = interval
+        self.data_dir = Path(data_dir)
+        self.last_error: Optional[str] = None
+        self._signature = data_files_signature(self.data_dir)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start polling (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # Make sure a snapshot exists before the first comparison
+        get_knowledge_base()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="kb-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling and wait for the thread to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def check(self) -> bool:
+        """
+        Reload once if any data file changed since the last check
+
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        signature = data_files_signature(self.data_dir)
+        if signature == self._signature:
+            return False
+
+        previous = get_knowledge_base().version
+        try:
+            kb = reload_knowledge_base(self.data_dir)
+        except KnowledgeBaseError as e:
+            # Keep serving the old snapshot; retry when the files change again
+            self.last_error = str(e)
+            logger.error("Knowledge base reload failed, keeping %s: %s", previous, e)
+            self._signature = signature
+            return False
+
+        self._signature = signature
+        self.last_error = None
+        if kb.version != previous:
+            logger.info("Knowledge base reloaded: %s -> %s", previous, kb.version)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Knowledge base watcher error")
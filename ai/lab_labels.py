@@ -0,0 +1,344 @@
+"""
+Lab label index
+Resolves lab names as OCR reads them ("hbalc", "trig1ycerides", "LDL-C",
+"S.Cholestero1") or as API clients spell them ("ldl_c") to canonical
+markers, with a similarity score
+
+Built once at import from LAB_ALIASES: words are compared after folding
+characters OCR confuses (0/o, 1/l/i, 5/s); a misspelled word is compared
+by edit similarity only with the few vocabulary words it shares the most
+trigrams with, never with every label. Lookups are memoized, so a
+document costs a dict lookup per word once its words have been seen.
+"""
+
+import difflib
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+# Marker -> aliases as plain words; the first alias is the spelling
+# correct_text() writes back, so it must match the OCR label patterns
+LAB_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'hba1c': ('hba1c', 'hb a1c', 'a1c', 'hemoglobin a1c', 'haemoglobin a1c', 'glycated hemoglobin',
+              'glycated haemoglobin', 'glycosylated hemoglobin', 'glycated hb', 'glycated'),
+    'fasting_glucose': ('fasting glucose', 'fasting blood glucose', 'fasting blood sugar',
+                        'fasting plasma glucose', 'glucose fasting', 'fbs', 'fbg'),
+    'random_glucose': ('random glucose', 'random blood glucose', 'random blood sugar', 'glucose random', 'rbs'),
+    'ldl': ('ldl', 'ldl c', 'ldl cholesterol', 'ldl direct', 'low density lipoprotein'),
+    'hdl': ('hdl', 'hdl c', 'hdl cholesterol', 'hdl direct', 'high density lipoprotein'),
+    'triglycerides': ('triglycerides', 'triglyceride', 'trig', 'tg'),
+    'total_cholesterol': ('total cholesterol', 'cholesterol total', 'cholesterol'),
+    'systolic_bp': ('systolic bp', 'systolic', 'systolic blood pressure', 'sbp'),
+    'diastolic_bp': ('diastolic bp', 'diastolic', 'diastolic blood pressure', 'dbp'),
+    'blood_pressure': ('blood pressure', 'bp'),
+    'tsh': ('tsh', 'thyroid stimulating hormone'),
+    't4': ('t4', 'thyroxine', 'total t4'),
+    't3': ('t3', 'triiodothyronine', 'total t3'),
+    'hemoglobin': ('hemoglobin', 'haemoglobin', 'hgb', 'hb'),
+    'rbc': ('rbc', 'rbc count', 'red blood cell', 'red blood cells', 'red blood cell count'),
+    'mcv': ('mcv', 'mean corpuscular volume'),
+    'mch': ('mch', 'mean corpuscular hemoglobin')
+}
+
+# Sample prefixes dropped before a label ("S. Cholesterol", "Serum TSH")
+SPECIMEN_WORDS = ('s', 'sr', 'serum', 'plasma')
+
+# A label right after one of these words names another analyte
+# ("Non-HDL Cholesterol", "VLDL Cholesterol")
+QUALIFIER_WORDS = ('non', 'vldl', 'idl', 'remnant')
+
+# Alias -> words that, right before it, make it another analyte: a bare
+# "cholesterol" after a lipid word is not total cholesterol
+NOT_AFTER: Dict[str, Tuple[str, ...]] = {
+    'cholesterol': ('ldl', 'hdl', 'lipoprotein', 'lp') + QUALIFIER_WORDS
+}
+
+# Characters OCR confuses, folded to one letter on both sides of a lookup
+OCR_FOLD = str.maketrans({'0': 'o', '1': 'l', 'i': 'l', '5': 's'})
+
+# Edit similarity (difflib ratio) a misspelled word or label needs to resolve
+MIN_SCORE = 0.8
+
+# Strings sharing the most trigrams with a query that are compared with it
+CANDIDATES = 4
+
+# Shorter words and aliases ("tg", "ldl", "mch", "vldl") only match
+# exactly (after folding) - one character apart is another analyte
+MIN_FUZZY_LENGTH = 5
+
+# Characters allowed between the words of one label ("S.", "LDL-C", ", ")
+MAX_WORD_GAP = 3
+
+# Memoized words and labels; cleared when full
+MEMO_SIZE = 20000
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class ResolvedLabel(NamedTuple):
+    """A lab name resolved to its marker"""
+    marker: str  # LAB_ALIASES key, e.g. "total_cholesterol"
+    alias: str  # alias it matched, e.g. "cholesterol"
+    score: float  # 1.0 for an exact match (after folding), else edit similarity
+
+
+def fold(word: str) -> str:
+    """Lower case word with OCR-confusable characters folded"""
+    return word.lower().translate(OCR_FOLD)
+
+
+def plausible_edit(alias: str, query: str) -> bool:
+    """
+    True if query reads as alias damaged by OCR, not as alias plus more
+
+    Characters may be swapped, dropped, or added one at a time inside
+    the word. Rejected: extra characters before or after the alias ("v" +
+    "ldl") and an added run of two or more ("random" + "urine" + "glucose").
+    """
+    opcodes = difflib.SequenceMatcher(None, alias, query, autojunk=False).get_opcodes()
+    for position, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        added = (j2 - j1) - (i2 - i1) if tag == 'replace' else (j2 - j1 if tag == 'insert' else 0)
+        if added >= 2:
+            return False
+        if added > 0 and position in (0, len(opcodes) - 1):
+            return False
+    return True
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of text padded with word boundaries"""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Strings indexed by trigram for nearest-match lookups
+
+    A lookup counts the trigrams each string shares with the query and
+    compares only the CANDIDATES strings sharing the most by edit
+    similarity; a candidate the query only matches with extra characters
+    is rejected (see plausible_edit).
+    """
+
+    def __init__(self, strings: Iterable[str]):
+        self.strings = list(dict.fromkeys(strings))
+        self._postings: Dict[str, List[int]] = {}
+        for position, text in enumerate(self.strings):
+            for gram in trigrams(text):
+                self._postings.setdefault(gram, []).append(position)
+
+    def best(self, query: str, min_score: float = MIN_SCORE) -> Optional[Tuple[str, float]]:
+        """Most similar indexed string and its score, if at least min_score"""
+        grams = trigrams(query)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        candidates = sorted(shared, key=lambda position: (-shared[position], position))[:CANDIDATES]
+        best, best_score = None, min_score
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(query)
+        for position in candidates:
+            matcher.set_seq1(self.strings[position])
+            # Cheap upper bounds first, as difflib.get_close_matches does
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if (score > best_score or (score == best_score and best is None)) and \
+                    plausible_edit(self.strings[position], query):
+                best, best_score = position, score
+        return None if best is None else (self.strings[best], round(best_score, 3))
+
+
+class LabelIndex:
+    """
+    Lab aliases indexed for noisy lookups
+
+    Words are corrected against the alias vocabulary (exactly after
+    folding, or through the trigram index from MIN_FUZZY_LENGTH
+    characters), then the corrected words are looked up as a whole alias.
+    Labels written without separators ("ldlcholesterol") fall back to a
+    trigram index of whole aliases.
+
+    Usage:
+        index = LabelIndex(LAB_ALIASES)
+        index.resolve("S.Cholestero1")  # ResolvedLabel('total_cholesterol', 'cholesterol', 1.0)
+        index.correct_text("trig1ycerides 180")  # 'triglycerides 180'
+    """
+
+    def __init__(
+        self,
+        aliases: Dict[str, Sequence[str]],
+        specimen_words: Sequence[str] = SPECIMEN_WORDS,
+        min_score: float = MIN_SCORE
+    ):
+        self.min_score = min_score
+        self.labels = {marker: names[0] for marker, names in aliases.items()}
+        self._specimens = {fold(word) for word in specimen_words}
+        self._qualifiers = {fold(word) for word in QUALIFIER_WORDS}
+        self._not_after = {alias: {fold(word) for word in words} for alias, words in NOT_AFTER.items()}
+        # Folded alias words -> (marker, alias); the first marker listing an alias wins
+        self._phrases: Dict[Tuple[str, ...], Tuple[str, str]] = {}
+        for marker, names in aliases.items():
+            for name in names:
+                self._phrases.setdefault(tuple(fold(word) for word in WORD_PATTERN.findall(name.lower())),
+                                         (marker, name))
+        self._max_words = max(len(words) for words in self._phrases) + 1
+        self._vocabulary = {word for words in self._phrases for word in words} | self._specimens
+        self._words = TrigramIndex(sorted(word for word in self._vocabulary if len(word) >= MIN_FUZZY_LENGTH))
+        self._joined = {"".join(words): words for words in self._phrases}
+        self._whole = TrigramIndex(sorted(joined for joined in self._joined if len(joined) >= MIN_FUZZY_LENGTH))
+        self._word_memo: Dict[str, Optional[Tuple[str, float]]] = {}
+        self._label_memo: Dict[str, Optional[ResolvedLabel]] = {}
+
+    def correct_word(self, word: str) -> Optional[Tuple[str, float]]:
+        """(folded vocabulary word, score) for one word, or None if it is not part of any alias"""
+        found = self._word_memo.get(word, False)
+        if found is not False:
+            return found
+        folded = fold(word)
+        if folded in self._vocabulary:
+            found = (folded, 1.0)
+        elif len(folded) >= MIN_FUZZY_LENGTH and not folded.isdigit():
+            found = self._words.best(folded, self.min_score)
+        else:
+            found = None
+        if len(self._word_memo) >= MEMO_SIZE:
+            self._word_memo.clear()
+        self._word_memo[word] = found
+        return found
+
+    def _lookup(self, words: Sequence[Tuple[str, float]]) -> Optional[ResolvedLabel]:
+        """Alias for corrected words (specimen prefix dropped), if any"""
+        start = 0
+        while start < len(words) - 1 and words[start][0] in self._specimens:
+            start += 1
+        key = tuple(word for word, _ in words[start:])
+        found = self._phrases.get(key)
+        if found is None:
+            return None
+        return ResolvedLabel(found[0], found[1], min(score for _, score in words[start:]))
+
+    def _qualified(self, previous: Optional[str], label: ResolvedLabel) -> bool:
+        """True if the word before a label (folded) makes it another analyte"""
+        return previous is not None and (
+            previous in self._qualifiers or previous in self._not_after.get(label.alias, ())
+        )
+
+    def _lookup_whole(self, words: Sequence[str]) -> Optional[ResolvedLabel]:
+        """Alias for words run together or split apart ("ldlcholesterol"), compared as one string"""
+        joined = "".join(fold(word) for word in words if fold(word) not in self._specimens)
+        if joined in self._joined:
+            match = (joined, 1.0)
+        elif len(joined) >= MIN_FUZZY_LENGTH:
+            match = self._whole.best(joined, self.min_score)
+        else:
+            return None
+        if match is None:
+            return None
+        marker, name = self._phrases[self._joined[match[0]]]
+        return ResolvedLabel(marker, name, match[1])
+
+    def resolve(self, label: str) -> Optional[ResolvedLabel]:
+        """
+        Marker for a whole lab name, e.g. an API key or a label cell
+
+        Returns:
+            ResolvedLabel, or None if the name is no known lab
+        """
+        if label in self._label_memo:
+            return self._label_memo[label]
+        words = WORD_PATTERN.findall(label.lower())
+        corrected = [self.correct_word(word) for word in words]
+        found = None
+        if words and None not in corrected:
+            found = self._lookup(corrected)
+        if (found is None and any(word is None or word[1] < 1.0 for word in corrected)) or \
+                (found is not None and found.score < 1.0):
+            # A misspelled or unknown word may be a label run together ("ldlcholesterol")
+            whole = self._lookup_whole(words)
+            if whole is not None and (found is None or whole.score > found.score):
+                found = whole
+        if len(self._label_memo) >= MEMO_SIZE:
+            self._label_memo.clear()
+        self._label_memo[label] = found
+        return found
+
+    def find(self, text: str) -> List[Tuple[int, int, ResolvedLabel]]:
+        """
+        Lab labels in free text as (start, end, ResolvedLabel), in order
+
+        The longest alias starting at each word wins; words of one label
+        may be separated by up to MAX_WORD_GAP non-word characters. A
+        misspelled single word is resolved like resolve() does. A label
+        right after a qualifier ("Non-HDL", "VLDL Cholesterol") is skipped.
+        """
+        # (word number, start, end, correction, previous word folded) of words that belong to an alias
+        tokens = []
+        memo = self._word_memo
+        previous = None
+        for number, word in enumerate(WORD_PATTERN.finditer(text.lower())):
+            value = word.group()
+            corrected = memo.get(value, False)
+            if corrected is False:
+                corrected = self.correct_word(value)
+            if corrected is not None:
+                tokens.append((number, word.start(), word.end(), corrected, previous))
+            previous = fold(value)
+
+        found = []
+        i = 0
+        while i < len(tokens):
+            run = i + 1
+            while (run < len(tokens) and run - i < self._max_words and tokens[run][0] == tokens[run - 1][0] + 1
+                   and tokens[run][1] - tokens[run - 1][2] <= MAX_WORD_GAP):
+                run += 1
+            for end in range(run, i, -1):
+                if end - i == 1 and tokens[i][3][1] < 1.0:
+                    label = self.resolve(text[tokens[i][1]:tokens[i][2]])
+                else:
+                    label = self._lookup([token[3] for token in tokens[i:end]])
+                if label is not None:
+                    if not self._qualified(tokens[i][4], label):
+                        found.append((tokens[i][1], tokens[end - 1][2], label))
+                    i = end
+                    break
+            else:
+                i += 1
+        return found
+
+    def correct_text(self, text: str) -> str:
+        """
+        Text with every lab label found by find() written as its marker's
+        first alias; everything else is kept as is
+
+        Labels of one lab next to each other ("Glycated Hb (HbA1c)") are
+        written once. Labels run into another lab's label ("Cholesterol/HDL
+        ratio") are left alone - they name a ratio or a column, not a value.
+        """
+        labels: List[Tuple[int, int, ResolvedLabel]] = []
+        for start, end, label in self.find(text):
+            if labels and labels[-1][2].marker == label.marker and start - labels[-1][1] <= MAX_WORD_GAP:
+                labels[-1] = (labels[-1][0], end, labels[-1][2])
+            else:
+                labels.append((start, end, label))
+
+        def touching(first, second) -> bool:
+            return first[2].marker != second[2].marker and second[0] - first[1] <= MAX_WORD_GAP
+
+        pieces, position = [], 0
+        for i, (start, end, label) in enumerate(labels):
+            if (i > 0 and touching(labels[i - 1], labels[i])) or \
+                    (i + 1 < len(labels) and touching(labels[i], labels[i + 1])):
+                continue
+            pieces.append(text[position:start])
+            pieces.append(self.labels[label.marker])
+            position = end
+        if not pieces:
+            return text
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+
+# Built once; shared by OCR parsing and the risk engine
+LAB_LABELS = LabelIndex(LAB_ALIASES)
@@ -0,0 +1,50 @@
+"""
+OCR and lab report parsing
+Importing is cheap: EasyOCR, OpenCV and the PDF libraries load on first use
+"""
+from .label_matcher import LabelMatcher, LabelMatch
+from .layout import TextBox, LayoutValue, extract_layout_values
+from .two_stage import extract_two_stage
+from .progressive import extract_progressive
+from .templates import TemplateRegistry, create_template, extract_with_templates
+from .ocr_pipeline import (
+    LAB_DEFINITIONS,
+    LAB_MATCHER,
+    OCR_MODES,
+    create_reader,
+    decode_images,
+    extract_many,
+    extract_file,
+    ocr_page,
+    text_page,
+    parse_lab_values,
+    parse_pages,
+    reading_values,
+    interpret
+)
+
+__all__ = [
+    'LabelMatcher',
+    'LabelMatch',
+    'TextBox',
+    'LayoutValue',
+    'extract_layout_values',
+    'extract_two_stage',
+    'extract_progressive',
+    'TemplateRegistry',
+    'create_template',
+    'extract_with_templates',
+    'LAB_DEFINITIONS',
+    'LAB_MATCHER',
+    'OCR_MODES',
+    'create_reader',
+    'decode_images',
+    'extract_many',
+    'extract_file',
+    'ocr_page',
+    'text_page',
+    'parse_lab_values',
+    'parse_pages',
+    'reading_values',
+    'interpret'
+]
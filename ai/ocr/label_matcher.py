@@ -0,0 +1,319 @@
+"""
+Lab label matcher
+Label patterns compiled once; one keyword scan finds every label/value
+candidate with its position, and one value per lab is resolved with fixed
+precedence rules
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Up to 30 non-digit characters between a label and its number
+VALUE_PATTERN = r'[^0-9]{0,30}(\d+\.?\d*)'
+
+
+def _literal_run(piece: str) -> str:
+    """Plain characters (letters, digits, spaces) at the start of a regex piece"""
+    run = ''
+    for char in piece:
+        if not (char.isalnum() or char == ' '):
+            # A quantifier makes the preceding character optional
+            if char in '?*+{' and run:
+                run = run[:-1]
+            break
+        run += char
+    return run
+
+
+def required_literals(label: str) -> Tuple[str, ...]:
+    """
+    Substrings every match of a label regex must contain
+
+    Conservative: the literal run at the start of the label and after each
+    '.*'; anything after the first other regex syntax is ignored, and
+    labels with groups or alternation get none.
+    """
+    if '(' in label or '|' in label:
+        return ()
+    return tuple(run for run in map(_literal_run, label.split('.*')) if run)
+
+
+def label_anchors(label: str) -> Tuple[str, ...]:
+    """
+    Words a match of a label regex can start with
+
+    Leading \\b and lookbehinds are skipped (they consume no text); a leading
+    (?:a|b) group of plain words gives one anchor per alternative. ('',)
+    when no anchor can be derived - the label is then tried everywhere.
+    """
+    while True:
+        if label.startswith(r'\b'):
+            label = label[2:]
+        elif label.startswith(('(?<!', '(?<=')) and ')' in label:
+            label = label[label.index(')') + 1:]
+        else:
+            break
+
+    if label.startswith('(?:') and ')' in label:
+        group, _, rest = label[3:].partition(')')
+        words = tuple(group.split('|'))
+        if rest[:1] in ('?', '*', '{') or any(_literal_run(word) != word or not word for word in words):
+            return ('',)
+        return words
+    return (_literal_run(label),)
+
+
+def _alternation(words: Iterable[str]) -> str:
+    """
+    Regex matching the longest of words at each position, factored as a
+    trie ('t(?:3|4|sh)') so each position costs one branch per character
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def branch(node: dict) -> str:
+        paths = [re.escape(char) + branch(child) for char, child in sorted(node.items()) if char]
+        if not paths:
+            return ''
+        body = paths[0] if len(paths) == 1 else '(?:' + '|'.join(paths) + ')'
+        # Greedy: a longer word wins over its prefix
+        return f'(?:{body})?' if '' in node else body
+
+    return branch(trie)
+
+
+class LabelMatch(NamedTuple):
+    """One label followed by its value(s) in the text"""
+    lab: str
+    label: int  # index into the lab's labels - lower wins
+    start: int  # where the label starts
+    end: int  # where the value ends
+    values: Tuple[str, ...]  # captured numbers, as written
+
+
+class LabelMatcher:
+    """
+    Matcher for a LAB_DEFINITIONS-style table
+
+    Each definition has "labels" (regexes without capturing groups, in
+    order of preference), an optional "min_digits" and an optional "value"
+    regex replacing VALUE_PATTERN (its groups become LabelMatch.values).
+
+    One scan of the text, a single alternation of every label's anchor
+    word (e.g. "total" for 'total.*cholesterol'), records where labels can
+    start; each label's regex is then only tried, anchored, at those
+    positions, and its value read right there. Labels whose other required
+    literals (e.g. "blood" and "cell" in 'red.*blood.*cell') are missing
+    from the text are never tried - greedy '.*' labels otherwise rescan the
+    rest of the text from every occurrence of their first word.
+
+    Precedence, for each lab: take the label patterns in order, and for
+    each one only its first occurrence; the first of those whose value has
+    at least min_digits digits wins. Ties between labs at the same
+    position are broken by definition order, so results never depend on
+    dict or set iteration.
+
+    Usage:
+        matcher = LabelMatcher({"ldl": {"labels": [r'ldl'], "min_digits": 2}})
+        matcher.match("ldl cholesterol 145 mg/dl")["ldl"].values  # ('145',)
+    """
+
+    def __init__(self, definitions: Dict[str, dict]):
+        self.labs = list(definitions)
+        labels = [
+            (lab, index, label, config)
+            for lab, config in definitions.items()
+            for index, label in enumerate(config["labels"])
+        ]
+        # (lab, label index, pattern, min_digits, required literals) in definition order
+        self._patterns: List[Tuple[str, int, re.Pattern, int, Tuple[str, ...]]] = [
+            (lab, index, re.compile(label + config.get("value", VALUE_PATTERN)),
+             config.get("min_digits", 1), required_literals(label))
+            for lab, index, label, config in labels
+        ]
+        # Labels and values on their own, for text already split into cells
+        self._labels: List[Tuple[str, int, re.Pattern]] = [
+            (lab, index, re.compile(label)) for lab, index, label, _ in labels
+        ]
+        self._values: Dict[str, Tuple[re.Pattern, int]] = {
+            lab: (re.compile(config.get("value", VALUE_PATTERN)), config.get("min_digits", 1))
+            for lab, config in definitions.items()
+        }
+
+        # Anchor word -> label positions (in _patterns / _labels) that may start
+        # there: every label whose anchor is a prefix of the word
+        anchors = [label_anchors(label) for _, _, label, _ in labels]
+        words = {word for label_words in anchors for word in label_words}
+        self._anchored: Dict[str, Tuple[int, ...]] = {
+            word: tuple(
+                order for order, label_words in enumerate(anchors)
+                if any(word.startswith(anchor) for anchor in label_words)
+            )
+            for word in words
+        }
+        # Where to resume after a word: the first offset inside it at which
+        # another anchor could start ("a1c" in "hba1c"), else its end
+        self._resume: Dict[str, int] = {
+            word: next(
+                (k for k in range(1, len(word)) if any(
+                    anchor.startswith(word[k:]) or word[k:].startswith(anchor) for anchor in words
+                )),
+                max(len(word), 1)
+            )
+            for word in words
+        }
+        # Labels needing more than their anchor; per text, those whose other
+        # literals are missing are blocked, and their anchors left out of the scan
+        self._gated: List[Tuple[int, Tuple[str, ...]]] = [
+            (order, literals) for order, (_, _, _, _, literals) in enumerate(self._patterns)
+            if len(literals) > 1
+        ]
+        self._scans: Dict[frozenset, Tuple[re.Pattern, Dict[str, Tuple[int, ...]], frozenset]] = {}
+        # Lab -> its label positions, in order of preference
+        self._lab_orders: Dict[str, List[int]] = {lab: [] for lab in definitions}
+        for order, (lab, _, _, _, _) in enumerate(self._patterns):
+            self._lab_orders[lab].append(order)
+
+    @staticmethod
+    def _may_match(text: str, literals: Tuple[str, ...]) -> bool:
+        for literal in literals:
+            if literal not in text:
+                return False
+        return True
+
+    @staticmethod
+    def _enough_digits(values: Tuple[str, ...], min_digits: int) -> bool:
+        for value in values:
+            if len(value) - value.count('.') < min_digits:
+                return False
+        return True
+
+    def _scan(self, text: str) -> Tuple[re.Pattern, Dict[str, Tuple[int, ...]], frozenset]:
+        """
+        Anchor scan, word -> label positions and the label positions
+        themselves, for the labels text may hold
+        """
+        blocked = frozenset(order for order, literals in self._gated if not self._may_match(text, literals))
+        scan = self._scans.get(blocked)
+        if scan is None:
+            anchored = {}
+            for word, orders in self._anchored.items():
+                orders = tuple(order for order in orders if order not in blocked)
+                if orders:
+                    anchored[word] = orders
+            # At most one entry per subset of the (few) gated labels
+            pattern = re.compile(_alternation(anchored) if anchored else '(?!)')
+            possible = frozenset(range(len(self._patterns))) - blocked
+            scan = self._scans[blocked] = (pattern, anchored, possible)
+        return scan
+
+    def _starts(self, text: str, scan: Tuple) -> Iterator[Tuple[int, int]]:
+        """
+        (position, label position) wherever a label may start, in text
+        order then definition order (scan: _scan(text))
+        """
+        pattern, anchored, _ = scan
+        scan, resume = pattern.search, self._resume
+        anchor = scan(text)
+        while anchor is not None:
+            start, word = anchor.start(), anchor.group()
+            for order in anchored[word]:
+                yield start, order
+            anchor = scan(text, start + resume[word])
+
+    def _winners(self, first: Dict[Tuple[str, int], LabelMatch]) -> Dict[str, LabelMatch]:
+        """Precedence over the first occurrence of each (lab, label index)"""
+        results = {}
+        for lab, index, _, min_digits, _ in self._patterns:
+            match = first.get((lab, index))
+            if lab not in results and match is not None and self._enough_digits(match.values, min_digits):
+                results[lab] = match
+        return results
+
+    def find_all(self, text: str) -> List[LabelMatch]:
+        """
+        Every candidate in the text, ordered by position
+
+        Occurrences of one label pattern do not overlap each other, but
+        different labels may cover the same text.
+        """
+        candidates = []
+        resume: Dict[int, int] = {}  # label position -> end of its previous occurrence
+        for start, order in self._starts(text, self._scan(text)):
+            if start < resume.get(order, 0):
+                continue
+            lab, index, pattern, _, _ = self._patterns[order]
+            found = pattern.match(text, start)
+            if found is not None:
+                resume[order] = found.end()
+                candidates.append(LabelMatch(lab, index, start, found.end(), found.groups()))
+        return candidates
+
+    def resolve(self, candidates: Iterable[LabelMatch]) -> Dict[str, LabelMatch]:
+        """Apply the precedence rules to find_all() output; {lab: winning match}"""
+        first: Dict[Tuple[str, int], LabelMatch] = {}
+        for match in sorted(candidates, key=lambda m: m.start):
+            first.setdefault((match.lab, match.label), match)
+        return self._winners(first)
+
+    def match(self, text: str) -> Dict[str, LabelMatch]:
+        """
+        Winning match per lab, in definition order
+
+        Same result as resolve(find_all(text)), but each label pattern
+        stops at its first occurrence, a label is no longer tried once a
+        preferred label of its lab has a value, and the scan ends once no
+        label is left open.
+        """
+        scan = self._scan(text)
+        open_labels = set(scan[2])  # labels whose first occurrence could still change the result
+        first: Dict[Tuple[str, int], LabelMatch] = {}
+        settled: Dict[str, int] = {}  # lab -> lowest label index with a value so far
+        for start, order in self._starts(text, scan):
+            lab, index, pattern, min_digits, _ = self._patterns[order]
+            if (lab, index) in first or settled.get(lab, index) < index:
+                continue
+            found = pattern.match(text, start)
+            if found is None:
+                continue
+            values = found.groups()
+            first[lab, index] = LabelMatch(lab, index, start, found.end(), values)
+            open_labels.discard(order)
+            if self._enough_digits(values, min_digits):
+                # Less preferred labels of the lab can no longer win
+                open_labels.difference_update(self._lab_orders[lab][index + 1:])
+                settled[lab] = index
+                if not open_labels:
+                    break
+        return self._winners(first)
+
+    def find_labels(self, text: str) -> List[Tuple[str, int, int, int]]:
+        """Every label occurrence as (lab, label index, start, end), ordered by position"""
+        found = []
+        resume: Dict[int, int] = {}
+        for start, order in self._starts(text, self._scan(text)):
+            if start < resume.get(order, 0):
+                continue
+            lab, index, pattern = self._labels[order]
+            label = pattern.match(text, start)
+            if label is not None:
+                resume[order] = label.end()
+                found.append((lab, index, start, label.end()))
+        return found
+
+    def read_value(self, lab: str, text: str, start: int = 0) -> Optional[Tuple[Tuple[str, ...], int]]:
+        """
+        The lab's value at text[start:] (after up to 30 non-digits)
+
+        Returns:
+            (values, end position) or None if absent or too short
+        """
+        pattern, min_digits = self._values[lab]
+        found = pattern.match(text, start)
+        if found is None or not self._enough_digits(found.groups(), min_digits):
+            return None
+        return found.groups(), found.end()
@@ -0,0 +1,182 @@
+"""
+Layout-aware lab value extraction
+Groups OCR text boxes into rows and pairs each lab label with the
+nearest numeric cell to its right on the same row
+"""
+
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .label_matcher import LabelMatcher
+
+# Units as printed after lab values (matched case-insensitively)
+UNIT_PATTERN = re.compile(
+    r'\s*(%|mg/dl|g/dl|g/l|mmol/l|mmol/mol|[mµu]iu/m?l|ng/dl|ng/ml|pg/ml|pmol/l|mmhg|fl|pg'
+    r'|(?:million|mill|10\^6|x10\^12)\s*/\s*(?:[µu]l|cumm|l))(?![a-z])',
+    re.IGNORECASE
+)
+
+# Reference range cells ("4.0 - 5.6", "< 100") are never a result
+RANGE_PATTERN = re.compile(r'\s*(?:[<>]=?\s*\d+\.?\d*|\d+\.?\d*\s*[-–]\s*\d+\.?\d*)\s*$')
+
+# Boxes whose vertical centers differ by less than this fraction of the
+# smaller box height share a row
+ROW_TOLERANCE = 0.5
+
+
+class TextBox(NamedTuple):
+    """One recognized text segment with its axis-aligned bounds"""
+    text: str
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    confidence: float
+
+
+class LayoutValue(NamedTuple):
+    """A lab value paired with its label on one row"""
+    lab: str
+    values: Tuple[str, ...]  # numbers as written
+    unit: Optional[str]
+    confidence: float  # lower of the label and value box confidences
+    row: int  # row index on the page, top to bottom
+    box: Optional[TextBox] = None  # box the value was read from
+
+
+def boxes_from_readtext(result: Iterable) -> List[TextBox]:
+    """TextBoxes from EasyOCR readtext() output [(corner points, text, confidence), ...]"""
+    boxes = []
+    for points, text, confidence in result:
+        xs = [float(point[0]) for point in points]
+        ys = [float(point[1]) for point in points]
+        boxes.append(TextBox(text, min(xs), min(ys), max(xs), max(ys), float(confidence)))
+    return boxes
+
+
+def group_rows(boxes: Sequence[TextBox], tolerance: float = ROW_TOLERANCE) -> List[List[TextBox]]:
+    """
+    Boxes grouped into rows (top to bottom), each row sorted left to right
+
+    One sort by vertical center plus a linear sweep: O(n log n).
+    """
+    rows: List[List[TextBox]] = []
+    row_center = row_height = 0.0
+    for box in sorted(boxes, key=lambda b: (b.y0 + b.y1) / 2):
+        center, height = (box.y0 + box.y1) / 2, box.y1 - box.y0
+        if rows and abs(center - row_center) <= tolerance * min(height, row_height):
+            row = rows[-1]
+            row.append(box)
+            # Running mean keeps long rows from drifting on a single tall box
+            row_center += (center - row_center) / len(row)
+            row_height = max(row_height, height)
+        else:
+            rows.append([box])
+            row_center, row_height = center, height
+    for row in rows:
+        row.sort(key=lambda b: b.x0)
+    return rows
+
+
+def read_unit(text: str, start: int = 0) -> Optional[str]:
+    """Unit at text[start:] (after optional whitespace), as written"""
+    found = UNIT_PATTERN.match(text, start)
+    return found.group(1) if found else None
+
+
+def extract_row_values(
+    row: List[TextBox],
+    row_index: int,
+    matcher: LabelMatcher,
+    seen: Optional[Set[str]] = None
+) -> List[Tuple[int, LayoutValue]]:
+    """
+    (label index, value) pairs on one row, in reading order
+
+    A value is taken from the label's own box when it follows the label
+    there (e.g. "HbA1c 6.2 %"); otherwise from the first box to the right
+    that holds a number (reference ranges skipped), as long as no other
+    label sits in between.
+    """
+    texts = [box.text.lower() for box in row]
+    line = " ".join(texts)
+    offsets, position = [], 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text) + 1
+
+    labels = matcher.find_labels(line)
+    if seen is not None:
+        seen.update(lab for lab, _, _, _ in labels)
+    label_boxes = sorted({bisect_right(offsets, start) - 1 for _, _, start, _ in labels})
+    numeric_boxes = [
+        i for i, text in enumerate(texts)
+        if any(ch.isdigit() for ch in text) and not RANGE_PATTERN.match(text)
+    ]
+
+    found = []
+    for lab, label_index, start, end in labels:
+        box_index = bisect_right(offsets, max(start, end - 1)) - 1
+        label_box = row[box_index]
+        local_end = end - offsets[box_index]
+
+        # Value inside the label's own box
+        value = matcher.read_value(lab, texts[box_index], local_end)
+        value_index, value_end = box_index, None
+        if value is not None:
+            values, value_end = value
+        else:
+            # Nearest numeric box to the right, not past the next label
+            position = bisect_right(numeric_boxes, box_index)
+            next_label = bisect_right(label_boxes, box_index)
+            limit = label_boxes[next_label] if next_label < len(label_boxes) else len(row)
+            if position == len(numeric_boxes) or numeric_boxes[position] >= limit:
+                continue
+            value_index = numeric_boxes[position]
+            value = matcher.read_value(lab, texts[value_index])
+            if value is None:
+                continue
+            values, value_end = value
+
+        # Unit right after the value, or in the next box
+        unit = read_unit(row[value_index].text, value_end)
+        if unit is None and value_end >= len(texts[value_index].rstrip()) and value_index + 1 < len(row):
+            unit = read_unit(row[value_index + 1].text)
+
+        confidence = min(label_box.confidence, row[value_index].confidence)
+        found.append((label_index, LayoutValue(lab, values, unit, confidence, row_index, row[value_index])))
+    return found
+
+
+def extract_layout_values(
+    boxes: Sequence[TextBox],
+    matcher: LabelMatcher,
+    seen: Optional[Set[str]] = None
+) -> Dict[str, LayoutValue]:
+    """
+    One value per lab from a page's text boxes
+
+    Rows are read top to bottom; for each lab, labels are tried in the
+    matcher's order of preference and the first occurrence that pairs
+    with a valid value wins (a heading like "LIPID PROFILE - HDL" without
+    a number does not block the table row below it).
+
+    Args:
+        boxes: Text boxes of one page
+        matcher: LabelMatcher built from the lab definitions
+        seen: If given, every lab whose label appears on the page is added,
+            with or without a value - a text fallback should not guess
+            values for those
+
+    Returns:
+        {lab: LayoutValue}, in the matcher's lab order
+    """
+    best: Dict[str, Tuple[int, LayoutValue]] = {}
+    for row_index, row in enumerate(group_rows(boxes)):
+        for label_index, value in extract_row_values(row, row_index, matcher, seen):
+            # Strictly better label only - earlier rows win ties
+            if value.lab not in best or label_index < best[value.lab][0]:
+                best[value.lab] = (label_index, value)
+
+    return {lab: best[lab][1] for lab in matcher.labs if lab in best}
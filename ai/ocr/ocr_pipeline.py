@@ -1,9 +1,91 @@
+"""
+OCR pipeline
+Decoding, batched EasyOCR recognition, lab value parsing and
+interpretation for medical reports
+
+Importing does no work: EasyOCR, OpenCV, NumPy and the PDF libraries are
+loaded on first use, and readers are created by the caller.
+
+Usage:
+    reader = create_reader()
+    images = decode_images(content, "image/jpeg")
+    readings = parse_pages([ocr_page(boxes) for boxes in extract_many(images, reader)])
+"""
+
+import io
 import re
-import easyocr
-from pathlib import Path
+from itertools import islice
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from ..lab_labels import LAB_LABELS
+from .label_matcher import LabelMatcher
+from .layout import TextBox, boxes_from_readtext, extract_layout_values, read_unit
+from .two_stage import extract_two_stage
 
 # -------------------- RULES --------------------
 
+# Keys are LabValues field names
+LAB_DEFINITIONS = {
+    "hba1c": {
+        "labels": [r'hb[a-z]*c', r'a1c', r'glycated'],
+        "min_digits": 2
+    },
+    "fasting_glucose": {
+        "labels": [r'fasting[^a-z0-9]*(?:blood|plasma|serum)?[^a-z0-9]*glucose', r'fbg', r'fbs'],
+        "min_digits": 2
+    },
+    "random_glucose": {
+        "labels": [r'random[^a-z0-9]*(?:blood|plasma|serum)?[^a-z0-9]*glucose', r'rbs'],
+        "min_digits": 2
+    },
+    "ldl": {
+        "labels": [r'\bldl'],  # not "vldl"
+        "min_digits": 2
+    },
+    "hdl": {
+        "labels": [r'(?<!non-)(?<!non )\bhdl'],  # not "non-hdl"
+        "min_digits": 2
+    },
+    "triglycerides": {
+        "labels": [r'triglycerides', r'trig'],
+        "min_digits": 2
+    },
+    "total_cholesterol": {
+        "labels": [r'total.*cholesterol', r'cholesterol.*total'],
+        "min_digits": 2
+    },
+    "hemoglobin": {
+        "labels": [r'hemoglobin', r'hb[^a-z]', r'\bhb\b'],
+        "min_digits": 2
+    },
+    "rbc": {
+        "labels": [r'rbc', r'red.*blood.*cell'],
+        "min_digits": 1
+    },
+    "tsh": {
+        "labels": [r'tsh', r'thyroid.*stimulating'],
+        "min_digits": 1
+    },
+    "t4": {
+        "labels": [r't4', r'thyroxine'],
+        "min_digits": 1
+    },
+    "t3": {
+        "labels": [r't3', r'triiodothyronine'],
+        "min_digits": 1
+    }
+}
+
+# Systolic/diastolic pair, e.g. "BP: 130/85"
+BLOOD_PRESSURE = {
+    "labels": [r'(?:blood pressure|bp)'],
+    "value": r'[^0-9]*([1-9]\d{1,2})\s*/\s*([1-9]\d{1,2})'
+}
+
+# Compiled once; also used to re-parse cached OCR text in bulk
+LAB_MATCHER = LabelMatcher({**LAB_DEFINITIONS, "blood_pressure": BLOOD_PRESSURE})
+
 INTERPRETATION_RULES = {
     "hba1c": [
         (0, 5.6, "normal"),
@@ -15,13 +97,13 @@ INTERPRETATION_RULES = {
         (100, 125, "impaired"),
         (126, 500, "diabetes")
     ],
-    "ldl_cholesterol": [
+    "ldl": [
         (0, 99, "optimal"),
         (100, 129, "near_optimal"),
         (130, 159, "borderline_high"),
         (160, 1000, "high")
     ],
-    "hdl_cholesterol": [
+    "hdl": [
         (0, 39, "low"),
         (40, 1000, "normal")
     ],
@@ -32,41 +114,18 @@ INTERPRETATION_RULES = {
     ]
 }
 
-LAB_DEFINITIONS = {
-    "hba1c": {
-        "labels": [r'hb[a-z]*c'],
-        "min_digits": 2
-    },
-    "fasting_glucose": {
-        "labels": [r'fasting.*glucose'],
-        "min_digits": 3
-    },
-    "ldl_cholesterol": {
-        "labels": [r'ldl'],
-        "min_digits": 2
-    },
-    "hdl_cholesterol": {
-        "labels": [r'hdl'],
-        "min_digits": 2
-    },
-    "triglycerides": {
-        "labels": [r'triglycerides'],
-        "min_digits": 2
-    }
-}
-
 NORMALIZATION_RULES = {
     "fasting_glucose": {
         "from": "mg/dL",
         "to": "mmol/L",
         "factor": 0.0555
     },
-    "ldl_cholesterol": {
+    "ldl": {
         "from": "mg/dL",
         "to": "mmol/L",
         "factor": 0.0259
     },
-    "hdl_cholesterol": {
+    "hdl": {
         "from": "mg/dL",
         "to": "mmol/L",
         "factor": 0.0259
@@ -78,51 +137,281 @@ NORMALIZATION_RULES = {
     }
 }
 
+# extract_many() modes: "full" reads every text region, "two_stage" only
+# the rows holding a lab label (see two_stage.py)
+OCR_MODES = ("full", "two_stage")
+
+# A number in a template field region
+NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+# Embedded text needed to skip OCR for a PDF page
+PDF_TEXT_MIN_CHARS = 20
+
+# -------------------- READERS --------------------
+
+def create_reader(languages: Sequence[str] = ('en',)):
+    """Build one EasyOCR reader (seconds to load, hundreds of MB)"""
+    import easyocr
+    return easyocr.Reader(list(languages))
+
+def warm_inference(ocr_reader) -> None:
+    """One inference on a tiny blank image, so the first real request skips lazy setup"""
+    import numpy as np
+    ocr_reader.readtext(np.full((32, 96, 3), 255, dtype=np.uint8))
+
+# -------------------- DECODING --------------------
+
+def decode_images(
+    content: bytes,
+    content_type: str,
+    pages: Optional[List[int]] = None,
+    steps: Iterable[str] = (),
+    max_side: int = 2200,
+    text_height: int = 0,
+    pdf_dpi: int = 200,
+    step_timings: Optional[Dict[str, float]] = None
+) -> Iterator:
+    """
+    Decode a file in memory and preprocess it for OCR, one page at a time
+
+    Yields RGB arrays, or grayscale arrays when the grayscale step is on.
+
+    Args:
+        content: File bytes
+        content_type: "application/pdf" or an image type
+        pages: For PDFs, 1-based page numbers to render (None = all)
+        steps: Preprocessing steps (see preprocessing.STEPS)
+        max_side: Long side cap for downscale / reduced decoding
+        text_height: Target glyph height for downscale (0 = off)
+        pdf_dpi: Render resolution for PDF pages
+        step_timings: If given, preprocessing seconds are summed into it per step
+
+    Raises:
+        ValueError: If the content cannot be decoded
+    """
+    import cv2
+    import numpy as np
+    from .preprocessing import decode_image, preprocess_image
+
+    steps = tuple(steps)
+
+    def prepare(image, decode_seconds):
+        image, timings = preprocess_image(image, steps, max_side=max_side, text_height=text_height)
+        if step_timings is not None:
+            for name, seconds in (("decode", decode_seconds), *timings.items()):
+                step_timings[name] = step_timings.get(name, 0.0) + seconds
+        return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    if content_type == "application/pdf":
+        # Rendered page by page so memory stays flat on long reports
+        from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+        if pages is None:
+            pages = range(1, pdfinfo_from_bytes(content)["Pages"] + 1)
+        for page_number in pages:
+            start = perf_counter()
+            page = convert_from_bytes(content, dpi=pdf_dpi, first_page=page_number, last_page=page_number)[0]
+            image = cv2.cvtColor(np.asarray(page.convert("RGB")), cv2.COLOR_RGB2BGR)
+            yield prepare(image, perf_counter() - start)
+        return
+
+    start = perf_counter()
+    image = decode_image(content, reduced="reduced_decode" in steps, max_side=max_side)
+    yield prepare(image, perf_counter() - start)
+
+# -------------------- RECOGNITION --------------------
+
+def extract_boxes(image, ocr_reader) -> List[list]:
+    """Text boxes of one image as [text, x0, y0, x1, y1, confidence] lists (TextBox field order)"""
+    return [list(box) for box in boxes_from_readtext(ocr_reader.readtext(image))]
+
+def extract_many(
+    images: Iterable,
+    ocr_reader,
+    batch_size: int = 4,
+    mode: str = "full",
+    required: Iterable[str] = ()
+) -> List[List[list]]:
+    """
+    Text boxes per image, recognizing same-sized images in one batch
+
+    Images are taken batch_size at a time (so a long PDF is never fully
+    in memory); within a batch, images of equal shape - pages rendered at
+    the same DPI, photos from the same camera - go through EasyOCR's
+    readtext_batched together. Works across pages and across files.
+
+    In "two_stage" mode each image is detected once and only rows with a
+    lab label are recognized in full (no cross-image batching).
+
+    Args:
+        images: RGB or grayscale arrays, e.g. from decode_images()
+        ocr_reader: EasyOCR reader (anything with readtext; readtext_batched is optional)
+        batch_size: Images held and recognized together
+        mode: One of OCR_MODES
+        required: "two_stage" only - labs that must be found, else the
+            whole page is recognized
+
+    Returns:
+        Boxes per image, in input order
+
+    Raises:
+        ValueError: If mode is unknown
+    """
+    if mode == "two_stage":
+        required = tuple(required)
+        return [extract_two_stage(image, ocr_reader, LAB_MATCHER, required)[0] for image in images]
+    if mode != "full":
+        raise ValueError(f"Unknown OCR mode '{mode}'")
+
+    images = iter(images)
+    results: List[List[list]] = []
+    while True:
+        chunk = list(islice(images, max(1, batch_size)))
+        if not chunk:
+            return results
+
+        by_shape: Dict[Tuple[int, int], List[int]] = {}
+        for position, image in enumerate(chunk):
+            by_shape.setdefault(image.shape[:2], []).append(position)
+
+        chunk_boxes: List[Optional[List[list]]] = [None] * len(chunk)
+        for positions in by_shape.values():
+            if len(positions) == 1 or not hasattr(ocr_reader, "readtext_batched"):
+                for position in positions:
+                    chunk_boxes[position] = extract_boxes(chunk[position], ocr_reader)
+                continue
+            import numpy as np
+            import cv2
+            # One (N, H, W, 3) array; readtext_batched expects colour images
+            batch = np.stack([
+                cv2.cvtColor(chunk[position], cv2.COLOR_GRAY2RGB) if chunk[position].ndim == 2 else chunk[position]
+                for position in positions
+            ])
+            for position, result in zip(positions, ocr_reader.readtext_batched(batch, batch_size=len(positions))):
+                chunk_boxes[position] = [list(box) for box in boxes_from_readtext(result)]
+        results.extend(chunk_boxes)
+
+# -------------------- PDF TEXT LAYER --------------------
+
+def has_usable_text(text: str, min_chars: int = PDF_TEXT_MIN_CHARS) -> bool:
+    """True if an embedded text layer looks like real text (not empty or glyph garbage)"""
+    chars = "".join(text.split())
+    if len(chars) < min_chars:
+        return False
+    return sum(ch.isalnum() for ch in chars) / len(chars) >= 0.5
+
+def read_pdf_text_layer(content: bytes, min_chars: int = PDF_TEXT_MIN_CHARS) -> List[Optional[str]]:
+    """
+    Embedded text per PDF page, None for pages that need OCR (scans)
+
+    Returns an empty list if the PDF cannot be read, so every page is OCR'd.
+    """
+    from PyPDF2 import PdfReader
+    try:
+        reader = PdfReader(io.BytesIO(content))
+        if reader.is_encrypted:
+            reader.decrypt("")
+        pages: List[Optional[str]] = []
+        for page in reader.pages:
+            try:
+                text = page.extract_text() or ""
+            except Exception:
+                text = ""
+            # Same shape as OCR output: words separated by single spaces
+            pages.append(" ".join(text.split()) if has_usable_text(text, min_chars) else None)
+        return pages
+    except Exception as e:
+        print(f"PDF text layer unreadable, falling back to OCR: {str(e)}")
+        return []
+
+# -------------------- PAGES --------------------
+
+def text_page(text: str) -> dict:
+    """Page from an embedded text layer (no boxes)"""
+    return {"text": text, "boxes": None}
+
+def ocr_page(boxes: List[list]) -> dict:
+    """Page from OCR: text in reading order plus the boxes for layout parsing"""
+    return {"text": " ".join(box[0] for box in boxes), "boxes": boxes}
+
+def template_page(template_id: str, fields: Dict[str, list]) -> dict:
+    """Page read by a lab template: {field: [text, confidence, number index, unit]} (see templates.py)"""
+    return {"text": "", "boxes": None, "template": template_id, "fields": fields}
+
+def field_number(text: str, index: int = 0) -> Optional[re.Match]:
+    """The index-th number in a template field's text"""
+    for position, number in enumerate(NUMBER_PATTERN.finditer(text)):
+        if position == index:
+            return number
+    return None
+
 # -------------------- EXTRACTION --------------------
 
 def preprocess(text: str) -> str:
-    return text.lower()
-
-def extract_single_value(text: str, label_patterns: list[str], *, min_digits=1):
-    for label in label_patterns:
-        pattern = rf'{label}[^0-9]{{0,30}}([\d]+\.?\d*)'
-        match = re.search(pattern, text)
-        if match:
-            value = match.group(1)
-            if len(value.replace('.', '')) >= min_digits:
-                return float(value)
-    return None
+    """Preprocess text for easier parsing: noisy lab labels corrected, lower case"""
+    return LAB_LABELS.correct_text(text).lower()
 
-def extract_blood_pressure(text: str):
-    match = re.search(
-        r'(blood pressure|bp)[^0-9]*([1-9]\d{1,2})\s*/\s*([1-9]\d{1,2})',
-        text
-    )
-    if match:
-        return {
-            "systolic": int(match.group(2)),
-            "diastolic": int(match.group(3))
-        }
-    return None
+def correct_boxes(boxes: Iterable[Sequence]) -> List[TextBox]:
+    """TextBoxes with noisy lab labels ("trig1ycerides", "S.Cholestero1") corrected"""
+    return [TextBox(LAB_LABELS.correct_text(box[0]), *box[1:]) for box in boxes]
 
 def parse_lab_values(text: str) -> dict:
+    """Parse lab values from extracted (preprocessed) text: {field: value}"""
     results = {}
 
-    for lab, config in LAB_DEFINITIONS.items():
-        value = extract_single_value(
-            text,
-            config["labels"],
-            min_digits=config["min_digits"]
-        )
-        if value is not None:
-            results[lab] = value
-
-    bp = extract_blood_pressure(text)
-    if bp:
-        results["blood_pressure"] = bp
+    for lab, match in LAB_MATCHER.match(text).items():
+        if lab == "blood_pressure":
+            results["systolic_bp"], results["diastolic_bp"] = (float(value) for value in match.values)
+        else:
+            results[lab] = float(match.values[0])
 
     return results
 
+def add_reading(readings: dict, lab: str, values: Tuple[str, ...], unit: Optional[str],
+                confidence: Optional[float], source: str) -> None:
+    """Store one lab's value(s) under their LabValues field names, first one wins"""
+    fields = ("systolic_bp", "diastolic_bp") if lab == "blood_pressure" else (lab,)
+    for field, value in zip(fields, values):
+        readings.setdefault(field, {
+            "value": float(value), "unit": unit, "confidence": confidence, "source": source
+        })
+
+def parse_pages(pages: List[dict]) -> dict:
+    """
+    Lab readings from OCR/text pages: {field: {value, unit, confidence, source}}
+
+    OCR'd pages are read by layout first (label and value on the same table
+    row); the regex over the page text then fills only labs whose label the
+    layout pass did not see at all. Embedded-text pages use the regex, and
+    template pages their field regions. Earlier pages win.
+    """
+    readings: dict = {}
+    for page in pages:
+        for field, (text, confidence, index, unit) in (page.get("fields") or {}).items():
+            number = field_number(text, index)
+            if number is not None:
+                readings.setdefault(field, {
+                    "value": float(number.group()),
+                    "unit": read_unit(text, number.end()) or unit,
+                    "confidence": round(confidence, 3),
+                    "source": "template"
+                })
+
+        seen: Set[str] = set()
+        if page["boxes"] is not None:
+            boxes = correct_boxes(page["boxes"])
+            for lab, value in extract_layout_values(boxes, LAB_MATCHER, seen).items():
+                add_reading(readings, lab, value.values, value.unit, round(value.confidence, 3), "layout")
+
+        text = preprocess(page["text"])
+        for lab, match in LAB_MATCHER.match(text).items():
+            if lab not in seen:
+                add_reading(readings, lab, match.values, read_unit(text, match.end), None, "text")
+    return readings
+
+def reading_values(readings: dict) -> dict:
+    """{field: value} from parse_pages() readings"""
+    return {field: reading["value"] for field, reading in readings.items()}
+
 # -------------------- INTERPRETATION --------------------
 
 def interpret_value(lab_name: str, value):
@@ -153,13 +442,15 @@ def interpret_blood_pressure(bp: dict):
     return "unknown"
 
 def enrich_with_interpretation(parsed: dict) -> dict:
+    """Status per value; systolic_bp/diastolic_bp are interpreted together as blood_pressure"""
     enriched = {}
 
     for lab, value in parsed.items():
-        if lab == "blood_pressure":
-            enriched[lab] = {
-                "value": value,
-                "status": interpret_blood_pressure(value),
+        if lab in ("systolic_bp", "diastolic_bp"):
+            bp = {"systolic": parsed.get("systolic_bp"), "diastolic": parsed.get("diastolic_bp")}
+            enriched["blood_pressure"] = {
+                "value": bp,
+                "status": interpret_blood_pressure(bp),
                 "confidence": "high"
             }
         else:
@@ -213,22 +504,49 @@ def merge_results(enriched: dict, normalized: dict) -> dict:
 
     return final
 
-# -------------------- RUN --------------------
-
-reader = easyocr.Reader(['en'])
-
-def extract_raw_text(image_path: str) -> str:
-    result = reader.readtext(image_path)
-    text = " ".join([item[1] for item in result])
-    return text
-
-RAW_TEXT = extract_raw_text("IMAGE HERE")
-
-RAW_TEXT = preprocess(RAW_TEXT)
-
-parsed = parse_lab_values(RAW_TEXT)
-enriched = enrich_with_interpretation(parsed)
-normalized = normalize_values(parsed)
-final_result = merge_results(enriched, normalized)
-
-print(final_result)
+def interpret(parsed: dict) -> dict:
+    """Interpreted and unit-normalized results for {field: value}"""
+    return merge_results(enrich_with_interpretation(parsed), normalize_values(parsed))
+
+# -------------------- FILES --------------------
+
+def extract_file(content: bytes, content_type: str, ocr_reader, mode: str = "full", **options: Any) -> dict:
+    """
+    Readings for one file: PDF text layer where present, OCR for the rest
+
+    Args:
+        content: File bytes
+        content_type: "application/pdf" or an image type
+        ocr_reader: EasyOCR reader
+        mode: extract_many() mode
+        **options: decode_images() options (steps, max_side, text_height, pdf_dpi)
+    """
+    def ocr(pages=None):
+        images = decode_images(content, content_type, pages, **options)
+        return extract_many(images, ocr_reader, mode=mode)
+
+    texts = read_pdf_text_layer(content) if content_type == "application/pdf" else []
+    if not texts:
+        return parse_pages([ocr_page(boxes) for boxes in ocr()])
+
+    pages = [text_page(text) if text is not None else None for text in texts]
+    missing = [page_number for page_number, page in enumerate(pages, 1) if page is None]
+    if missing:
+        for page_number, boxes in zip(missing, ocr(missing)):
+            pages[page_number - 1] = ocr_page(boxes)
+    return parse_pages(pages)
+
+if __name__ == "__main__":
+    # python -m ai.ocr.ocr_pipeline [--two-stage] report.jpg [report2.pdf ...]
+    import json
+    import sys
+    from pathlib import Path
+
+    paths = [arg for arg in sys.argv[1:] if arg != "--two-stage"]
+    mode = "two_stage" if "--two-stage" in sys.argv[1:] else "full"
+    reader = create_reader()
+    for path in paths:
+        data = Path(path).read_bytes()
+        kind = "application/pdf" if data.startswith(b"%PDF-") else "image"
+        readings = extract_file(data, kind, reader, mode, steps=("reduced_decode", "grayscale", "downscale", "crop", "deskew"))
+        print(path, json.dumps(interpret(reading_values(readings)), indent=2))
@@ -0,0 +1,232 @@
+"""
+OCR image preprocessing
+Decodes uploads at reduced size and shrinks/cleans them before text
+recognition; every step is timed and can be switched off
+"""
+
+from time import perf_counter
+from typing import Dict, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Applied in this order; "reduced_decode" only affects decode_image()
+STEPS = ('reduced_decode', 'grayscale', 'downscale', 'crop', 'deskew', 'contrast')
+
+DEFAULT_MAX_SIDE = 2200  # ~200 DPI for a letter/A4 page - plenty for printed lab values
+DEFAULT_TEXT_HEIGHT = 0  # target median glyph height in px (0 = only cap the long side)
+
+# Reduced decoding may land this far under max_side (12MP photos decode at 2000px)
+REDUCED_DECODE_SLACK = 0.9
+
+# Deskew only within this range; larger angles are more likely layout than skew
+MIN_SKEW_DEGREES = 0.3
+MAX_SKEW_DEGREES = 15.0
+
+
+# -------------------- DECODING --------------------
+
+def jpeg_size(content: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG's SOF header, without decoding pixels"""
+    if not content.startswith(b'\xff\xd8'):
+        return None
+    i = 2
+    while i + 9 < len(content):
+        if content[i] != 0xFF:
+            i += 1
+            continue
+        marker = content[i + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            i += 1 if marker == 0xFF else 2
+            continue
+        length = int.from_bytes(content[i + 2:i + 4], 'big')
+        # SOF0-SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(content[i + 5:i + 7], 'big')
+            width = int.from_bytes(content[i + 7:i + 9], 'big')
+            return width, height
+        i += 2 + length
+    return None
+
+
+def decode_image(content: bytes, reduced: bool = True, max_side: int = DEFAULT_MAX_SIDE) -> np.ndarray:
+    """
+    Decode image bytes to a BGR array
+
+    With reduced=True, large JPEGs are decoded at 1/2, 1/4 or 1/8 scale by
+    libjpeg itself (much cheaper than a full decode plus resize), choosing
+    the strongest reduction that keeps the long side near max_side.
+
+    Raises:
+        ValueError: If the bytes cannot be decoded
+    """
+    flags = cv2.IMREAD_COLOR
+    size = jpeg_size(content) if reduced else None
+    if size is not None:
+        long_side = max(size)
+        for factor, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                                     (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                     (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if long_side / factor >= max_side * REDUCED_DECODE_SLACK:
+                flags = reduced_flag
+                break
+
+    image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), flags)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+
+# -------------------- STEPS --------------------
+
+def estimate_text_height(gray: np.ndarray) -> Optional[float]:
+    """Median height of glyph-sized connected components, or None if no text is found"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    # Drop specks and lines/boxes
+    glyphs = heights[(heights >= 4) & (heights <= gray.shape[0] / 10) & (widths <= heights * 4)]
+    if len(glyphs) < 10:
+        return None
+    return float(np.median(glyphs))
+
+
+def downscale(image: np.ndarray, max_side: int = DEFAULT_MAX_SIDE, text_height: int = DEFAULT_TEXT_HEIGHT) -> np.ndarray:
+    """Shrink to max_side, then further so glyphs are ~text_height px tall (never upscales)"""
+    scale = min(1.0, max_side / max(image.shape[:2]))
+    if scale < 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    if text_height:
+        measured = estimate_text_height(grayscale(image))
+        if measured and measured > text_height:
+            factor = text_height / measured
+            image = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def grayscale(image: np.ndarray) -> np.ndarray:
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def crop_margins(image: np.ndarray, padding: int = 16) -> np.ndarray:
+    """Crop to the bounding box of the content (ink), keeping a small border"""
+    gray = grayscale(image)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    # Remove isolated specks so dust on the margins does not defeat the crop
+    binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    points = cv2.findNonZero(binary)
+    if points is None:
+        return image
+    x, y, w, h = cv2.boundingRect(points)
+    top, left = max(0, y - padding), max(0, x - padding)
+    bottom = min(image.shape[0], y + h + padding)
+    right = min(image.shape[1], x + w + padding)
+    return image[top:bottom, left:right]
+
+
+def _profile_score(binary: np.ndarray, angle: float) -> float:
+    """Variance of row ink counts after rotating by angle - peaks when text lines are level"""
+    h, w = binary.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    rotated = cv2.warpAffine(binary, matrix, (w, h), flags=cv2.INTER_NEAREST)
+    return float(np.var(rotated.sum(axis=1, dtype=np.float64)))
+
+
+def skew_angle(gray: np.ndarray, work_width: int = 600) -> float:
+    """
+    Text line angle in degrees (positive = rotated counter-clockwise)
+
+    Projection-profile search on a reduced copy: coarse 1 degree steps
+    over +/-MAX_SKEW_DEGREES, then 0.1 degree steps around the best.
+    """
+    scale = min(1.0, work_width / gray.shape[1])
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+
+    coarse = np.arange(-MAX_SKEW_DEGREES, MAX_SKEW_DEGREES + 0.5, 1.0)
+    best = max(coarse, key=lambda angle: _profile_score(binary, angle))
+    fine = np.arange(best - 1.0, best + 1.05, 0.1)
+    # Rotating by -skew levels the lines
+    return -float(max(fine, key=lambda angle: _profile_score(binary, angle)))
+
+
+def deskew(image: np.ndarray) -> np.ndarray:
+    """Rotate small skews (phone photos, crooked scans) back to horizontal"""
+    angle = skew_angle(grayscale(image))
+    if not MIN_SKEW_DEGREES <= abs(angle) <= MAX_SKEW_DEGREES:
+        return image
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), -angle, 1.0)
+    border = 255 if image.ndim == 2 else (255, 255, 255)
+    return cv2.warpAffine(image, matrix, (w, h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=border)
+
+
+def normalize_contrast(image: np.ndarray) -> np.ndarray:
+    """Local contrast equalization (CLAHE) - evens out shadows and faded print"""
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    if image.ndim == 2:
+        return clahe.apply(image)
+    lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+    lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+
+# -------------------- PIPELINE --------------------
+
+def preprocess_image(
+    image: np.ndarray,
+    steps: Iterable[str] = STEPS,
+    max_side: int = DEFAULT_MAX_SIDE,
+    text_height: int = DEFAULT_TEXT_HEIGHT
+) -> Tuple[np.ndarray, Dict[str, float]]:
+    """
+    Run the enabled steps on a decoded BGR image
+
+    Args:
+        image: BGR (or grayscale) array
+        steps: Enabled step names (see STEPS); order is fixed
+        max_side: Long side cap for "downscale"
+        text_height: Target glyph height for "downscale" (0 = off)
+
+    Returns:
+        (image, {step: seconds})
+    """
+    enabled = set(steps)
+    unknown = enabled - set(STEPS)
+    if unknown:
+        raise ValueError(f"Unknown preprocessing steps: {sorted(unknown)}")
+
+    # Grayscale first: every later step then touches one channel instead of three
+    pipeline = (
+        ('grayscale', grayscale),
+        ('downscale', lambda img: downscale(img, max_side, text_height)),
+        ('crop', crop_margins),
+        ('deskew', deskew),
+        ('contrast', normalize_contrast),
+    )
+    timings: Dict[str, float] = {}
+    for name, step in pipeline:
+        if name in enabled:
+            start = perf_counter()
+            image = step(image)
+            timings[name] = perf_counter() - start
+    return image, timings
+
+
+def load_and_preprocess(
+    content: bytes,
+    steps: Iterable[str] = STEPS,
+    max_side: int = DEFAULT_MAX_SIDE,
+    text_height: int = DEFAULT_TEXT_HEIGHT
+) -> Tuple[np.ndarray, Dict[str, float]]:
+    """decode_image + preprocess_image; timings include "decode" """
+    steps = tuple(steps)
+    start = perf_counter()
+    image = decode_image(content, reduced='reduced_decode' in steps, max_side=max_side)
+    decoded = perf_counter() - start
+    image, timings = preprocess_image(image, steps, max_side, text_height)
+    return image, {'decode': decoded, **timings}
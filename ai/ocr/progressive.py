@@ -0,0 +1,207 @@
+"""
+Progressive-resolution OCR
+Reads pages at a fraction of their resolution first, then escalates only
+the pages - or table rows - whose lab markers are missing or unsure,
+within an optional deadline
+"""
+
+import time
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .label_matcher import LabelMatcher
+from .layout import TextBox, extract_row_values, group_rows
+from .ocr_pipeline import LAB_MATCHER, correct_boxes, extract_many
+from .two_stage import Region, recognize_regions
+
+# Fractions of the decoded (already preprocessed) page size, lowest first
+DEFAULT_SCALES = (0.5, 1.0)
+
+# Layout values read with less OCR confidence than this are re-read at the
+# next scale
+MIN_CONFIDENCE = 0.4
+
+
+class PageCheck(NamedTuple):
+    """What one OCR pass recovered from a page"""
+    found: Dict[str, float]  # lab -> best value confidence (0.0 for text-only values)
+    missing: Set[str]  # required labs, or labels seen without a value
+    weak_rows: List[List[TextBox]]  # rows holding a value below MIN_CONFIDENCE
+    legible: bool  # mean box confidence at least MIN_CONFIDENCE
+    score: Tuple[int, float]  # (labs found, summed confidence) - higher is better
+
+    @property
+    def needs_page(self) -> bool:
+        """Nothing usable, markers missing or mostly unsure text: read the whole page again"""
+        return not self.found or bool(self.missing) or not self.legible
+
+
+def check_page(
+    boxes: Sequence[list],
+    matcher: LabelMatcher,
+    required: Iterable[str] = (),
+    min_confidence: float = MIN_CONFIDENCE
+) -> PageCheck:
+    """
+    Lab markers recovered from one page's boxes
+
+    Uses the same layout and text rules as parse_pages. Without required
+    labs, a label that was read without a value counts as missing - and
+    a page read with low mean confidence may hide labels altogether.
+    """
+    text_boxes = correct_boxes(boxes)
+    seen: Set[str] = set()
+    found: Dict[str, float] = {}
+    rows = []
+    for row_index, row in enumerate(group_rows(text_boxes)):
+        values = extract_row_values(row, row_index, matcher, seen)
+        for _, value in values:
+            found[value.lab] = max(found.get(value.lab, 0.0), value.confidence)
+        if values:
+            rows.append((row, [value.lab for _, value in values]))
+
+    text = " ".join(box.text for box in text_boxes).lower()
+    for lab in matcher.match(text):
+        found.setdefault(lab, 0.0)
+
+    required = set(required)
+    missing = (required or seen) - set(found)
+    weak_rows = [row for row, labs in rows if any(0.0 < found[lab] < min_confidence for lab in labs)]
+    legible = sum(box.confidence for box in text_boxes) >= min_confidence * len(text_boxes)
+    return PageCheck(found, missing, weak_rows, legible, (len(found), sum(found.values())))
+
+
+def scale_image(image, scale: float):
+    """Image resized by scale (returned as is for 1.0)"""
+    if scale == 1.0:
+        return image
+    import cv2
+    height, width = image.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC)
+
+
+def scale_boxes(boxes: Iterable[list], factor: float) -> List[list]:
+    """Boxes with their coordinates multiplied by factor"""
+    return [[text, x0 * factor, y0 * factor, x1 * factor, y1 * factor, confidence]
+            for text, x0, y0, x1, y1, confidence in boxes]
+
+
+def reread_rows(image, scale: float, ocr_reader, boxes: List[list], rows: List[List[TextBox]]) -> List[list]:
+    """
+    Page boxes with the given rows recognized again at scale
+
+    The regions found by the earlier pass are reused - nothing is
+    detected again.
+    """
+    targets = list(dict.fromkeys(tuple(box) for row in rows for box in row))
+    height, width = image.shape[:2]
+    regions = [
+        Region([int(x0 * scale), min(width, int(x1 * scale) + 1),
+                int(y0 * scale), min(height, int(y1 * scale) + 1)], True)
+        for _, x0, y0, x1, y1, _ in targets
+    ]
+    replaced = set(targets)
+    kept = [box for box in boxes if tuple(box) not in replaced]
+    for (_, x0, y0, x1, y1, _), read in zip(targets, recognize_regions(image, ocr_reader, regions)):
+        if read is not None:
+            kept.append([read[0], x0, y0, x1, y1, read[1]])
+    return kept
+
+
+def extract_progressive(
+    images: Iterable,
+    ocr_reader,
+    batch_size: int = 4,
+    mode: str = "full",
+    required: Iterable[str] = (),
+    scales: Sequence[float] = DEFAULT_SCALES,
+    min_confidence: float = MIN_CONFIDENCE,
+    deadline: Optional[float] = None,
+    matcher: LabelMatcher = LAB_MATCHER
+) -> Tuple[List[List[list]], bool]:
+    """
+    Text boxes per image, read at the lowest scale that recovers the markers
+
+    Images are taken batch_size at a time. Each batch is read at the first
+    scale (batched, as in extract_many); then, scale by scale, a page is
+    read again in full if markers are missing, or only its weak rows are
+    re-recognized if every marker was found but some with low confidence.
+    A pass that recovers less is discarded, and a page stops escalating
+    as soon as it passes check_page.
+
+    With a deadline, an escalation is only started if the previous pass's
+    time, scaled by the pixel ratio, fits in what is left; once it has
+    passed, further batches are not read at all. The first batch's first
+    pass always runs, so there is always a result.
+
+    Args:
+        images: RGB or grayscale arrays, e.g. from decode_images()
+        ocr_reader: EasyOCR reader
+        batch_size: Images held and read together
+        mode: extract_many() mode for whole-page passes
+        required: Labs every page is expected to hold (default: the labels seen)
+        scales: Fractions of the image size to try, lowest first
+        min_confidence: Values read with less confidence are re-read
+        deadline: time.time() by which to return (None = no limit)
+        matcher: LabelMatcher for check_page
+
+    Returns:
+        (boxes per image in input order, in full-size coordinates;
+        complete - False if the deadline cut any escalation or page)
+    """
+    required = tuple(required)
+    scales = sorted(scales) or [1.0]
+    images = iter(images)
+    results: List[List[list]] = []
+    complete = True
+
+    def remaining() -> float:
+        return float("inf") if deadline is None else deadline - time.time()
+
+    while True:
+        chunk = list(islice(images, max(1, batch_size)))
+        if not chunk:
+            return results, complete
+        if results and remaining() <= 0:
+            results.extend([] for _ in chunk)
+            complete = False
+            continue
+
+        start = time.time()
+        first = extract_many([scale_image(image, scales[0]) for image in chunk], ocr_reader, batch_size, mode, required)
+        boxes = [scale_boxes(page, 1 / scales[0]) for page in first]
+        checks = [check_page(page, matcher, required, min_confidence) for page in boxes]
+        # Seconds for one whole page at the current scale
+        page_seconds = [(time.time() - start) / len(chunk)] * len(chunk)
+
+        for previous, scale in zip(scales, scales[1:]):
+            ratio = (scale / previous) ** 2
+            for i, image in enumerate(chunk):
+                check = checks[i]
+                if not check.needs_page and not check.weak_rows:
+                    continue
+                if check.needs_page:
+                    estimate = page_seconds[i] * ratio
+                else:
+                    rows_width = sum(box.x1 - box.x0 for row in check.weak_rows for box in row)
+                    page_width = sum(box[3] - box[1] for box in boxes[i]) or 1.0
+                    estimate = page_seconds[i] * ratio * rows_width / page_width
+                if estimate > remaining():
+                    complete = False
+                    page_seconds[i] *= ratio
+                    continue
+
+                start = time.time()
+                scaled = scale_image(image, scale)
+                if check.needs_page:
+                    candidate = scale_boxes(extract_many([scaled], ocr_reader, 1, mode, required)[0], 1 / scale)
+                    page_seconds[i] = time.time() - start
+                else:
+                    candidate = reread_rows(scaled, scale, ocr_reader, boxes[i], check.weak_rows)
+                    page_seconds[i] *= ratio
+                candidate_check = check_page(candidate, matcher, required, min_confidence)
+                # A read that recovers less is dropped; the next scale may still help
+                if candidate_check.score >= check.score:
+                    boxes[i], checks[i] = candidate, candidate_check
+        results.extend(boxes)
@@ -0,0 +1,478 @@
+"""
+Lab report templates
+Registry of known lab-vendor layouts: a page that matches a template by
+perceptual hash and anchor text is read by recognizing only its field
+regions - no text detection and no full-page recognition
+
+Templates live in ai/data/lab_templates.json and are created from a
+sample report:
+    python -m ai.ocr.templates create sample.jpg --id city-diagnostics --name "City Diagnostics"
+    python -m ai.ocr.templates match report.jpg
+"""
+
+import difflib
+import hashlib
+import json
+import math
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .layout import TextBox, extract_layout_values
+from .ocr_pipeline import (
+    LAB_DEFINITIONS,
+    LAB_MATCHER,
+    NUMBER_PATTERN,
+    extract_boxes,
+    field_number,
+    ocr_page,
+    template_page
+)
+from .two_stage import Region, recognize_regions
+
+TEMPLATES_PATH = Path(__file__).resolve().parents[1] / "data" / "lab_templates.json"
+
+# LabValues fields a template can map
+FIELDS = (*LAB_DEFINITIONS, "systolic_bp", "diastolic_bp")
+
+# Pages within this many differing bits (of 64) are checked against a template
+MAX_HASH_DISTANCE = 12
+
+# Recognized anchor text must be at least this similar to the template's
+MIN_ANCHOR_SIMILARITY = 0.8
+
+# create_template(): anchors picked from letter-only boxes in the top of the page
+ANCHOR_COUNT = 2
+ANCHOR_AREA = 0.2  # fraction of the page height
+
+
+class TemplateError(ValueError):
+    """Raised when a template is invalid or cannot be created"""
+
+
+class Anchor(NamedTuple):
+    """Fixed text printed on every report of a layout"""
+    text: str  # lower case, single spaces
+    box: Tuple[float, float, float, float]  # x0, y0, x1, y1 as fractions of the page size
+
+
+class TemplateField(NamedTuple):
+    """Where one LabValues field is printed"""
+    box: Tuple[float, float, float, float]  # x0, y0, x1, y1 as fractions of the page size
+    index: int = 0  # which number in the region, e.g. 1 for the diastolic in "130/85"
+    unit: Optional[str] = None  # unit as printed on the sample, if the region has none
+
+
+class LabTemplate(NamedTuple):
+    """One lab vendor's report layout"""
+    id: str
+    name: str
+    phash: int  # phash() of a sample page
+    anchors: Tuple[Anchor, ...]
+    fields: Dict[str, TemplateField]  # LabValues field -> region
+    min_fields: int  # fields that must read a number, else the page falls back to generic OCR
+
+
+# -------------------- HASHING --------------------
+
+def phash(image) -> int:
+    """
+    64-bit DCT perceptual hash of a page
+
+    Reports of one layout differ only in a few values and names, which
+    hardly move the low frequencies; pages are compared after the same
+    preprocessing (crop, deskew), so scale and margins do not matter.
+    """
+    import cv2
+    import numpy as np
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def hash_distance(a: int, b: int) -> int:
+    """Differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def to_region(box: Sequence[float], width: int, height: int) -> Region:
+    """Fractional box as a pixel Region on a width x height page"""
+    x0, y0, x1, y1 = box
+    return Region([int(x0 * width), min(width, math.ceil(x1 * width)),
+                   int(y0 * height), min(height, math.ceil(y1 * height))], True)
+
+
+# -------------------- SERIALIZATION --------------------
+
+def _box(value, where: str) -> Tuple[float, float, float, float]:
+    try:
+        x0, y0, x1, y1 = (float(v) for v in value)
+    except (TypeError, ValueError):
+        raise TemplateError(f"{where}: box must be [x0, y0, x1, y1]")
+    if not (0.0 <= x0 < x1 <= 1.0 and 0.0 <= y0 < y1 <= 1.0):
+        raise TemplateError(f"{where}: box {list(value)} is not inside the page (fractions 0-1)")
+    return x0, y0, x1, y1
+
+
+def template_from_dict(data: dict) -> LabTemplate:
+    """
+    Validated LabTemplate from its JSON form
+
+    Raises:
+        TemplateError: If a key is missing or a box, field or hash is invalid
+    """
+    try:
+        template_id = str(data["id"])
+        where = f"template '{template_id}'"
+        anchors = tuple(
+            Anchor(normalize_text(anchor["text"]), _box(anchor["box"], f"{where} anchor"))
+            for anchor in data["anchors"]
+        )
+        fields = {}
+        for field, config in data["fields"].items():
+            if field not in FIELDS:
+                raise TemplateError(f"{where}: unknown field '{field}' (expected one of {', '.join(FIELDS)})")
+            fields[field] = TemplateField(
+                _box(config["box"], f"{where} field '{field}'"), int(config.get("index", 0)), config.get("unit")
+            )
+        phash_value = int(data["phash"], 16)
+    except KeyError as e:
+        raise TemplateError(f"Template is missing {e}")
+    except ValueError as e:
+        if isinstance(e, TemplateError):
+            raise
+        raise TemplateError(f"{where}: {e}")
+    if not anchors or not fields:
+        raise TemplateError(f"{where}: needs at least one anchor and one field")
+    min_fields = int(data.get("min_fields", math.ceil(len(fields) / 2)))
+    return LabTemplate(template_id, data.get("name", template_id), phash_value, anchors, fields, min_fields)
+
+
+def template_to_dict(template: LabTemplate) -> dict:
+    """JSON form of a LabTemplate (boxes rounded to 4 decimals)"""
+    def box(values):
+        return [round(v, 4) for v in values]
+
+    fields = {}
+    for field, config in template.fields.items():
+        fields[field] = {"box": box(config.box)}
+        if config.index:
+            fields[field]["index"] = config.index
+        if config.unit:
+            fields[field]["unit"] = config.unit
+    return {
+        "id": template.id,
+        "name": template.name,
+        "phash": f"{template.phash:016x}",
+        "anchors": [{"text": anchor.text, "box": box(anchor.box)} for anchor in template.anchors],
+        "fields": fields,
+        "min_fields": template.min_fields
+    }
+
+
+def load_templates(path: Path = TEMPLATES_PATH) -> Tuple[List[LabTemplate], str]:
+    """
+    Templates in a registry file and a short hash of its content
+    ("none" if the file does not exist)
+
+    Raises:
+        TemplateError: If the file is not valid JSON or a template is invalid
+    """
+    path = Path(path)
+    if not path.exists():
+        return [], "none"
+    raw = path.read_bytes()
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise TemplateError(f"{path}: {e}")
+    templates = [template_from_dict(item) for item in data.get("templates", [])]
+    ids = [template.id for template in templates]
+    duplicates = sorted({template_id for template_id in ids if ids.count(template_id) > 1})
+    if duplicates:
+        raise TemplateError(f"{path}: duplicate template ids {', '.join(duplicates)}")
+    return templates, hashlib.sha256(raw).hexdigest()[:12]
+
+
+def save_template(template: LabTemplate, path: Path = TEMPLATES_PATH) -> None:
+    """Add a template to a registry file, replacing one with the same id"""
+    path = Path(path)
+    data = json.loads(path.read_text()) if path.exists() else {"templates": []}
+    templates = [item for item in data.get("templates", []) if item.get("id") != template.id]
+    templates.append(template_to_dict(template))
+    data["templates"] = sorted(templates, key=lambda item: item["id"])
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+# -------------------- REGISTRY --------------------
+
+class TemplateRegistry:
+    """
+    Known layouts, matched by perceptual hash and confirmed by anchor text
+
+    Matching costs one hash and one recognize() call over the anchor
+    regions of the few templates whose hash is close; a matched page is
+    read with one more recognize() call over its field regions.
+
+    Usage:
+        registry = TemplateRegistry.load()
+        page = registry.read_page(image, reader)  # None: use generic OCR
+    """
+
+    def __init__(
+        self,
+        templates: Sequence[LabTemplate] = (),
+        version: str = "none",
+        max_distance: int = MAX_HASH_DISTANCE,
+        min_similarity: float = MIN_ANCHOR_SIMILARITY
+    ):
+        self.templates = list(templates)
+        self.version = version
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+
+    @classmethod
+    def load(cls, path: Path = TEMPLATES_PATH, **options) -> "TemplateRegistry":
+        templates, version = load_templates(path)
+        return cls(templates, version, **options)
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def candidates(self, image) -> List[LabTemplate]:
+        """Templates within max_distance of the page's hash, closest first"""
+        if not self.templates:
+            return []
+        page_hash = phash(image)
+        close = [(hash_distance(page_hash, template.phash), template) for template in self.templates]
+        return [template for distance, template in sorted(close, key=lambda item: item[0])
+                if distance <= self.max_distance]
+
+    def anchors_match(self, image, ocr_reader, template: LabTemplate) -> bool:
+        """True if every anchor's region reads (nearly) the anchor text"""
+        height, width = image.shape[:2]
+        regions = [to_region(anchor.box, width, height) for anchor in template.anchors]
+        for anchor, read in zip(template.anchors, recognize_regions(image, ocr_reader, regions)):
+            if read is None:
+                return False
+            text = normalize_text(read[0])
+            if anchor.text not in text and difflib.SequenceMatcher(None, anchor.text, text).ratio() < self.min_similarity:
+                return False
+        return True
+
+    def match(self, image, ocr_reader) -> Optional[LabTemplate]:
+        """The template this page was printed from, if any"""
+        for template in self.candidates(image):
+            if self.anchors_match(image, ocr_reader, template):
+                return template
+        return None
+
+    def read_fields(self, image, ocr_reader, template: LabTemplate) -> Dict[str, list]:
+        """{field: [text, confidence, index, unit]} for the template's field regions"""
+        height, width = image.shape[:2]
+        regions = [to_region(config.box, width, height) for config in template.fields.values()]
+        fields = {}
+        for (field, config), read in zip(template.fields.items(), recognize_regions(image, ocr_reader, regions)):
+            if read is not None:
+                fields[field] = [read[0], read[1], config.index, config.unit]
+        return fields
+
+    def read_page(self, image, ocr_reader) -> Optional[dict]:
+        """
+        template_page() for a page printed from a known layout, or None
+
+        None too if fewer than min_fields regions hold a number - a
+        misaligned scan or a new revision of the layout.
+        """
+        template = self.match(image, ocr_reader)
+        if template is None:
+            return None
+        fields = self.read_fields(image, ocr_reader, template)
+        readable = sum(1 for text, _, index, _ in fields.values() if field_number(text, index) is not None)
+        if readable < template.min_fields:
+            return None
+        return template_page(template.id, fields)
+
+
+def extract_with_templates(
+    images: Iterable,
+    ocr_reader,
+    registry: TemplateRegistry,
+    extract: Callable[[List], Tuple[List[List[list]], bool]],
+    batch_size: int = 4,
+    deadline: Optional[float] = None
+) -> Tuple[List[dict], bool]:
+    """
+    Pages for images: read by template where one matches, by extract() otherwise
+
+    Args:
+        images: RGB or grayscale arrays, e.g. from decode_images()
+        ocr_reader: EasyOCR reader
+        registry: Known layouts (may be empty)
+        extract: Generic OCR for the misses: images -> (boxes per image,
+            complete), e.g. extract_progressive
+        batch_size: Images held at a time (misses go to extract together)
+        deadline: time.time() after which later misses are not OCR'd
+
+    Returns:
+        (pages in input order, complete - False if extract() was cut
+        short or misses were skipped)
+    """
+    images = iter(images)
+    pages: List[dict] = []
+    complete = True
+    while True:
+        chunk = list(islice(images, max(1, batch_size)))
+        if not chunk:
+            return pages, complete
+        chunk_pages = [registry.read_page(image, ocr_reader) if len(registry) else None for image in chunk]
+        misses = [image for image, page in zip(chunk, chunk_pages) if page is None]
+        if misses:
+            if pages and deadline is not None and time.time() >= deadline:
+                boxes, done = [[] for _ in misses], False
+            else:
+                boxes, done = extract(misses)
+            complete = complete and done
+            read = iter(boxes)
+            chunk_pages = [page if page is not None else ocr_page(next(read)) for page in chunk_pages]
+        pages.extend(chunk_pages)
+
+
+# -------------------- CREATION --------------------
+
+def field_region(box: TextBox, width: int, height: int) -> Tuple[float, float, float, float]:
+    """
+    Fractional region around a value box, with room for longer values
+
+    Widened by half a line height on the left and three to the right
+    ("6.2" on the sample may be "12.4" on the next report).
+    """
+    line = box.y1 - box.y0
+    return (
+        max(0.0, (box.x0 - 0.5 * line) / width),
+        max(0.0, (box.y0 - 0.3 * line) / height),
+        min(1.0, (box.x1 + 3.0 * line) / width),
+        min(1.0, (box.y1 + 0.3 * line) / height)
+    )
+
+
+def value_indexes(text: str, values: Sequence[str]) -> List[int]:
+    """Position of each value among the numbers in a box's text (labels like "hba1c" hold numbers too)"""
+    numbers = [float(number) for number in NUMBER_PATTERN.findall(text)]
+    indexes, start = [], 0
+    for value in values:
+        position = next((i for i in range(start, len(numbers)) if numbers[i] == float(value)), start)
+        indexes.append(position)
+        start = position + 1
+    return indexes
+
+
+def pick_anchors(boxes: Sequence[TextBox], width: int, height: int, texts: Sequence[str] = ()) -> Tuple[Anchor, ...]:
+    """
+    Anchors for a new template
+
+    Boxes containing the given texts, or else the widest letter-only
+    boxes (no lab label, no digits) in the top ANCHOR_AREA of the page -
+    usually the letterhead.
+    """
+    def anchor(box: TextBox) -> Anchor:
+        return Anchor(normalize_text(box.text), (box.x0 / width, box.y0 / height, box.x1 / width, box.y1 / height))
+
+    if texts:
+        anchors = []
+        for wanted in texts:
+            found = next((box for box in boxes if normalize_text(wanted) in normalize_text(box.text)), None)
+            if found is None:
+                raise TemplateError(f"Anchor text '{wanted}' not found on the sample")
+            anchors.append(anchor(found))
+        return tuple(anchors)
+
+    candidates = [
+        box for box in boxes
+        if box.y1 <= ANCHOR_AREA * height
+        and sum(ch.isalpha() for ch in box.text) >= 6
+        and not any(ch.isdigit() for ch in box.text)
+        and not LAB_MATCHER.find_labels(box.text.lower())
+    ]
+    candidates.sort(key=lambda box: box.x1 - box.x0, reverse=True)
+    if not candidates:
+        raise TemplateError("No letterhead text found for anchors - pass anchor texts explicitly")
+    return tuple(anchor(box) for box in candidates[:ANCHOR_COUNT])
+
+
+def create_template(
+    image,
+    ocr_reader,
+    template_id: str,
+    name: str,
+    anchor_texts: Sequence[str] = ()
+) -> LabTemplate:
+    """
+    Template from one sample page (preprocessed like production uploads)
+
+    The page is OCR'd in full; every lab value the layout pass pairs with
+    its label becomes a field region, and anchors are picked with
+    pick_anchors(). Check the result (and edit boxes in the JSON) before
+    relying on it.
+
+    Raises:
+        TemplateError: If no lab values or anchors are found
+    """
+    height, width = image.shape[:2]
+    boxes = [TextBox(*box) for box in extract_boxes(image, ocr_reader)]
+    values = extract_layout_values(boxes, LAB_MATCHER)
+    if not values:
+        raise TemplateError("No lab values found on the sample")
+
+    fields = {}
+    for lab, value in values.items():
+        names = ("systolic_bp", "diastolic_bp") if lab == "blood_pressure" else (lab,)
+        region = field_region(value.box, width, height)
+        for field, index in zip(names, value_indexes(value.box.text, value.values)):
+            fields[field] = TemplateField(region, index, value.unit)
+
+    anchors = pick_anchors(boxes, width, height, anchor_texts)
+    return LabTemplate(template_id, name, phash(image), anchors, fields, math.ceil(len(fields) / 2))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .ocr_pipeline import create_reader, decode_images
+
+    parser = argparse.ArgumentParser(description="Create or test lab report templates")
+    parser.add_argument("command", choices=["create", "match"])
+    parser.add_argument("image", help="Sample report (image or PDF - first page)")
+    parser.add_argument("--id", help="Template id (create)")
+    parser.add_argument("--name", help="Vendor name (create)")
+    parser.add_argument("--anchor", action="append", default=[], help="Text printed on every report (create, repeatable)")
+    parser.add_argument("--path", default=str(TEMPLATES_PATH), help="Registry file")
+    parser.add_argument("--steps", nargs="*", default=["reduced_decode", "grayscale", "downscale", "crop", "deskew"],
+                        help="Preprocessing steps - must match OCR_PREPROCESS_STEPS")
+    args = parser.parse_args()
+
+    content = Path(args.image).read_bytes()
+    kind = "application/pdf" if content.startswith(b"%PDF-") else "image"
+    page = next(iter(decode_images(content, kind, [1] if kind == "application/pdf" else None, steps=args.steps)))
+    reader = create_reader()
+
+    if args.command == "create":
+        if not args.id:
+            parser.error("create needs --id")
+        template = create_template(page, reader, args.id, args.name or args.id, args.anchor)
+        save_template(template, Path(args.path))
+        print(json.dumps(template_to_dict(template), indent=2))
+        print(f"Saved to {args.path}")
+    else:
+        registry = TemplateRegistry.load(Path(args.path))
+        for template in registry.candidates(page):
+            print(f"{template.id}: hash distance {hash_distance(phash(page), template.phash)}, "
+                  f"anchors {'match' if registry.anchors_match(page, reader, template) else 'differ'}")
+        print(json.dumps(registry.read_page(page, reader), indent=2))
@@ -0,0 +1,163 @@
+"""
+Two-stage OCR
+Runs EasyOCR's text detector once, recognizes short crops of every region
+to find lab labels, then recognizes in full only the table rows that hold
+a label - headers, addresses, disclaimers and signatures are never read
+in full
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .label_matcher import LabelMatcher
+from .layout import TextBox, group_rows
+
+# Cheap pass crop width, as a multiple of the region height - about 25
+# characters, enough for "glycated haemoglobin (hba1c)"
+KEYWORD_MAX_ASPECT = 12.0
+
+
+class Region(NamedTuple):
+    """One detected text region"""
+    box: list  # [x_min, x_max, y_min, y_max] if horizontal, else 4 corner points
+    horizontal: bool
+
+    @property
+    def bounds(self) -> Tuple[int, int, int, int]:
+        """(x0, y0, x1, y1)"""
+        if self.horizontal:
+            x_min, x_max, y_min, y_max = self.box
+            return x_min, y_min, x_max, y_max
+        xs = [x for x, _ in self.box]
+        ys = [y for _, y in self.box]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    @property
+    def corner(self) -> Tuple[int, int]:
+        """First corner as EasyOCR reports it in recognize() results"""
+        if self.horizontal:
+            return self.box[0], self.box[2]
+        return tuple(self.box[0])
+
+
+def detect_regions(image, ocr_reader) -> List[Region]:
+    """Text regions of one image from EasyOCR's detector, clipped to the image, in integer pixels"""
+    horizontal, free = ocr_reader.detect(image)
+    height, width = image.shape[:2]
+    regions = []
+    for x_min, x_max, y_min, y_max in horizontal[0]:
+        x_min, x_max = max(0, int(x_min)), min(width, int(x_max))
+        y_min, y_max = max(0, int(y_min)), min(height, int(y_max))
+        if x_max > x_min and y_max > y_min:
+            regions.append(Region([x_min, x_max, y_min, y_max], True))
+    for points in free[0]:
+        regions.append(Region([[int(x), int(y)] for x, y in points], False))
+    return regions
+
+
+def crop_region(region: Region, max_aspect: float) -> Region:
+    """Horizontal region cut to its first max_aspect x height pixels (rotated regions are kept whole)"""
+    if not region.horizontal:
+        return region
+    x_min, x_max, y_min, y_max = region.box
+    return Region([x_min, min(x_max, x_min + int(max_aspect * (y_max - y_min))), y_min, y_max], True)
+
+
+def recognize_regions(image, ocr_reader, regions: Sequence[Region]) -> List[Optional[Tuple[str, float]]]:
+    """
+    (text, confidence) per region, in region order, from one recognize() call
+
+    EasyOCR returns results sorted by position, so they are matched back
+    to the regions by first corner.
+    """
+    if not regions:
+        return []
+    result = ocr_reader.recognize(
+        image,
+        horizontal_list=[region.box for region in regions if region.horizontal],
+        free_list=[region.box for region in regions if not region.horizontal]
+    )
+    by_corner: Dict[Tuple[int, int], List[Tuple[str, float]]] = {}
+    for points, text, confidence in result:
+        corner = (int(round(points[0][0])), int(round(points[0][1])))
+        by_corner.setdefault(corner, []).append((text, float(confidence)))
+    found = []
+    for region in regions:
+        candidates = by_corner.get(region.corner)
+        found.append(candidates.pop(0) if candidates else None)
+    return found
+
+
+def extract_two_stage(
+    image,
+    ocr_reader,
+    matcher: LabelMatcher,
+    required: Iterable[str] = (),
+    max_aspect: float = KEYWORD_MAX_ASPECT
+) -> Tuple[List[list], dict]:
+    """
+    Text boxes of one image, recognizing in full only rows with a lab label
+
+    1. Detect text regions once.
+    2. Cheap pass: recognize every region, long ones cropped to their
+       first max_aspect x height pixels (a label starts its line).
+    3. Find labels in the cheap text, row by row.
+    4. Recognize the cropped regions on label rows in full.
+
+    If no label is found, or a required lab is missing, every cropped
+    region is recognized in full instead - the same boxes full-page OCR
+    gives, without detecting twice.
+
+    Args:
+        image: RGB or grayscale array
+        ocr_reader: EasyOCR reader
+        matcher: LabelMatcher whose labels mark the rows to read
+        required: Labs (matcher keys) that must be found to skip the fallback
+        max_aspect: Cheap pass crop width as a multiple of region height
+
+    Returns:
+        (boxes, stats): boxes are [text, x0, y0, x1, y1, confidence]
+        lists (TextBox field order) for every region read in full; stats
+        has region counts, recognized pixel widths per pass, the labs
+        found and whether the fallback ran
+    """
+    regions = detect_regions(image, ocr_reader)
+    crops = [crop_region(region, max_aspect) for region in regions]
+    cheap = recognize_regions(image, ocr_reader, crops)
+
+    boxes = []
+    for region, read in zip(regions, cheap):
+        x0, y0, x1, y1 = region.bounds
+        text, confidence = read if read is not None else ("", 0.0)
+        boxes.append(TextBox(text, x0, y0, x1, y1, confidence))
+    index = {id(box): i for i, box in enumerate(boxes)}
+
+    labs, label_rows = set(), []
+    for row in group_rows(boxes):
+        found = matcher.find_labels(" ".join(box.text.lower() for box in row))
+        if found:
+            labs.update(lab for lab, _, _, _ in found)
+            label_rows.append(row)
+
+    cropped = {i for i, (region, crop) in enumerate(zip(regions, crops)) if crop.box != region.box}
+    fallback = not labs or not set(required) <= labs
+    if fallback:
+        rerun = sorted(cropped)
+    else:
+        rerun = sorted(index[id(box)] for row in label_rows for box in row if index[id(box)] in cropped)
+    full = dict(zip(rerun, recognize_regions(image, ocr_reader, [regions[i] for i in rerun])))
+
+    read_boxes = []
+    for i, box in enumerate(boxes):
+        read = full.get(i) if i in cropped else cheap[i]
+        if read is not None:
+            read_boxes.append([read[0], box.x0, box.y0, box.x1, box.y1, read[1]])
+
+    stats = {
+        "regions": len(regions),
+        "label_rows": len(label_rows),
+        "cheap_width": sum(crop.bounds[2] - crop.bounds[0] for crop in crops),
+        "full_width": sum(regions[i].bounds[2] - regions[i].bounds[0] for i in rerun),
+        "labs": sorted(labs),
+        "fallback": fallback
+    }
+    return read_boxes, stats
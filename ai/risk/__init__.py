@@ -2,12 +2,15 @@
 Risk prediction and scoring module
 """
 from .risk_model import predict_risks
+from .batch_model import predict_risks_batch, score_records
 from .scoring_rules import calculate_family_score, calculate_lifestyle_score, calculate_lab_score
 from .risk_classes import get_risk_class, get_risk_class_info
 from .explainability import generate_reasons
 
 __all__ = [
     'predict_risks',
+    'predict_risks_batch',
+    'score_records',
     'calculate_family_score',
     'calculate_lifestyle_score', 
     'calculate_lab_score',
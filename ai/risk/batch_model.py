@@ -0,0 +1,609 @@
+"""
+Vectorized batch risk engine
+Scores N patients x D diseases with NumPy: predict_risks_batch(records) -> list of results
+
+Mirrors risk_model.predict_risks step for step (same operation order, so
+float results are bit-identical) but replaces the per-disease Python loops
+with array operations over the whole cohort.
+"""
+
+from itertools import chain, repeat
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+import numpy as np
+
+from .risk_model import calculate_bmi, get_prevention_for_disease, get_tests_for_disease
+from .scoring_rules import (
+    CONSTANT_FACTORS, LIFESTYLE_CHOICES, OBESE_BMI, OVERWEIGHT_BMI, choice_points, normalize_lab_key
+)
+from .explainability import generate_reasons
+from ..coaching.consult_logic import get_consult_urgency
+from ..knowledge_base import KnowledgeBase, get_knowledge_base
+
+# -------------------- LIFESTYLE ENCODING --------------------
+
+# Column order of the per-patient factor matrix, from the scoring_rules
+# tables; last column is "unknown factor" (always 0)
+LIFESTYLE_FACTORS = ['obesity', 'smoking'] + list(LIFESTYLE_CHOICES) + list(CONSTANT_FACTORS)
+FACTOR_INDEX = {factor: i for i, factor in enumerate(LIFESTYLE_FACTORS)}
+UNKNOWN_FACTOR = len(LIFESTYLE_FACTORS)
+
+# Stands in for unhashable answers (they score 0, like any unlisted answer)
+UNHASHABLE_ANSWER = object()
+
+# family_counts slot per relative generation; any other generation counts as 2+
+GENERATION_SLOTS = {-1: 0, 0: 1, 1: 2}
+
+FEMALE_GENDERS = ('F', 'female', 'Female')
+# Shared stand-ins for a missing patient / lifestyle / lab dict (never mutated)
+NO_PATIENT: Dict[str, Any] = {}
+NO_ANSWERS: Dict[str, Any] = {}
+NO_LABS: Dict[str, Any] = {}
+AGE_BOOST_DISEASES = ('type2_diabetes', 'cad', 'hypertension')
+
+
+class CompiledRules:
+    """
+    Per-snapshot disease tables in array form
+
+    Attributes:
+        disease_ids: Disease ids in knowledge base order (D)
+        disease_index: Disease id -> column
+        id_array, name_array: (D,) disease ids / names as object arrays
+        lab_markers: Union of all lab markers (M), column order of lab arrays
+        factor_matrix: (D, K) factor column per disease position, padded with UNKNOWN_FACTOR
+        factor_counts: (D,) number of lifestyle factors per disease
+        family_weight: (D,) disease family_weight
+        heritable: (D,) family_weight >= 0.45
+    """
+
+    def __init__(self, kb: KnowledgeBase):
+        self.kb = kb
+        diseases = kb.diseases
+        self.diseases = diseases
+        self.disease_ids = [d['id'] for d in diseases]
+        self.disease_index = {disease_id: j for j, disease_id in enumerate(self.disease_ids)}
+        self.id_array = np.array(self.disease_ids, dtype=object)
+        self.name_array = np.array([d['name'] for d in diseases], dtype=object)
+
+        markers = []
+        for disease in diseases:
+            for marker in disease.get('lab_markers', []):
+                if marker not in markers:
+                    markers.append(marker)
+        self.lab_markers = markers
+        self.lab_index = {marker: m for m, marker in enumerate(markers)}
+
+        max_factors = max([len(d.get('lifestyle_factors', [])) for d in diseases] + [1])
+        self.factor_matrix = np.full((len(diseases), max_factors), UNKNOWN_FACTOR, dtype=np.intp)
+        for j, disease in enumerate(diseases):
+            for k, factor in enumerate(disease.get('lifestyle_factors', [])):
+                self.factor_matrix[j, k] = FACTOR_INDEX.get(factor, UNKNOWN_FACTOR)
+        self.factor_counts = np.array(
+            [len(d.get('lifestyle_factors', [])) for d in diseases], dtype=np.float64
+        )
+
+        self.family_weight = np.array([d.get('family_weight', 0.30) for d in diseases])
+        self.heritable = self.family_weight >= 0.45
+        self.has_markers = np.array([bool(d.get('lab_markers')) for d in diseases])
+        self.age_boost = np.array([d['id'] in AGE_BOOST_DISEASES for d in diseases])
+
+        self.pcos_column = self.disease_index.get('pcos')
+
+        thresholds = kb.thresholds
+        self.class_bounds = np.array([
+            thresholds['II']['min'], thresholds['III']['min'], thresholds['IV']['min']
+        ])
+
+
+_compiled: Optional[CompiledRules] = None
+
+
+def compile_rules(kb: KnowledgeBase) -> CompiledRules:
+    """Compiled tables for kb (cached for the most recent snapshot)"""
+    global _compiled
+    compiled = _compiled
+    if compiled is None or compiled.kb is not kb:
+        compiled = CompiledRules(kb)
+        _compiled = compiled
+    return compiled
+
+
+# -------------------- ENCODING --------------------
+
+class PatientBatch:
+    """
+    Columnar encoding of N patient records
+
+    Attributes:
+        age, bmi: (N,) floats
+        female: (N,) gender counts as female for PCOS
+        has_lifestyle, has_family, has_labs: (N,) flags
+        factors: (N, K+1) lifestyle factor score per patient (last column 0)
+        short_sleep: (N,) sleep_hours < 6
+        family_counts: (N, D, 4) affected relatives per generation (-1, 0, 1, 2+)
+        labs: (M, N) lab values, NaN where missing (marker-major, so each
+            marker's column is contiguous for the per-marker scoring loop)
+        lab_present: (M, N) lab value present and numeric
+    """
+
+    def __init__(self, records: Sequence[Dict[str, Any]], rules: CompiledRules):
+        n = len(records)
+        n_diseases = len(rules.disease_ids)
+        n_markers = len(rules.lab_markers)
+
+        self.records = records
+
+        # Column-at-a-time passes; converted to arrays once at the end
+        patients = _column(records, 'patient', NO_PATIENT)
+        lifestyles = [record.get('lifestyle') or NO_ANSWERS for record in records]
+
+        self.age = np.array(_column(patients, 'age', 30), dtype=np.float64)
+        self.bmi = batch_bmi(patients, _column(patients, 'weight', 70), _column(patients, 'height', 170))
+        self.female = np.array(
+            [gender in FEMALE_GENDERS for gender in _column(patients, 'gender', 'unknown')], dtype=bool
+        )
+
+        self.has_lifestyle = np.fromiter(map(bool, lifestyles), dtype=bool, count=n)
+        answers = {}  # (field, default) -> (codes, distinct answers), shared by the diet factors
+        for field, default, _ in LIFESTYLE_CHOICES.values():
+            if (field, default) not in answers:
+                answers[field, default] = _distinct_answers(_column(lifestyles, field, default))
+        smoking = np.fromiter(map(bool, _column(lifestyles, 'smoking', False)), dtype=bool, count=n)
+        self.short_sleep = np.array([ls.get('sleep_hours', 7) < 6 for ls in lifestyles], dtype=bool)
+
+        # Family: flattened to one entry per relative, then one per (relative,
+        # disease) pair; per-record Python loops are the slow part of encoding
+        families = [record.get('family') or () for record in records]
+        family_sizes = np.fromiter(map(len, families), dtype=np.intp, count=n)
+        self.has_family = family_sizes > 0
+        members = list(chain.from_iterable(families))
+        member_rows = np.repeat(np.arange(n), family_sizes)
+        member_slots = _lookup(_column(members, 'generation', 2), GENERATION_SLOTS, 3)
+
+        issues = [member.get('known_issues') or () for member in members]
+        issue_counts = np.fromiter(map(len, issues), dtype=np.intp, count=len(issues))
+        pair_members = np.repeat(np.arange(len(members)), issue_counts)
+        pair_columns = _lookup(list(chain.from_iterable(issues)), rules.disease_index, -1)
+        known = pair_columns >= 0
+        # A member counts once per disease even if listed twice
+        affected = np.zeros(len(members) * n_diseases, dtype=bool)
+        affected[pair_members[known] * n_diseases + pair_columns[known]] = True
+        member, column = np.divmod(np.flatnonzero(affected), n_diseases)
+        family_hits = (member_rows[member] * n_diseases + column) * 4 + member_slots[member]
+        self.family_counts = np.bincount(family_hits, minlength=n * n_diseases * 4).reshape(n, n_diseases, 4)
+
+        # Labs: flattened the same way; the last given value per normalized
+        # key wins, as in calculate_lab_score
+        lab_dicts = [record.get('lab_values') or NO_LABS for record in records]
+        lab_counts = np.fromiter(map(len, lab_dicts), dtype=np.intp, count=n)
+        self.has_labs = lab_counts > 0
+        keys = list(chain.from_iterable(lab_dicts))
+        key_columns = {key: rules.lab_index.get(normalize_lab_key(key), -1) for key in set(keys)}
+        columns = _lookup(keys, key_columns, -1)
+        values, numeric, given = _lab_floats(list(chain.from_iterable(map(dict.values, lab_dicts))))
+        entries = (columns >= 0) & given
+        cells = (columns * n + np.repeat(np.arange(n), lab_counts))[entries]
+        values, numeric = values[entries], numeric[entries]
+
+        # Keep the last occurrence of each cell (aliases like 'ldl' + 'LDL');
+        # a non-numeric value still shadows an earlier alias
+        aliased = np.bincount(cells, minlength=n * n_markers)[cells] > 1
+        keep = np.flatnonzero(~aliased)
+        if aliased.any():
+            aliased = np.flatnonzero(aliased)
+            _, last_from_end = np.unique(cells[aliased][::-1], return_index=True)
+            keep = np.concatenate([keep, aliased[len(aliased) - 1 - last_from_end]])
+        keep = keep[numeric[keep]]
+        self.labs = np.full((n_markers, n), np.nan)
+        self.lab_present = np.zeros((n_markers, n), dtype=bool)
+        self.labs.flat[cells[keep]] = values[keep]
+        self.lab_present.flat[cells[keep]] = True
+
+        self.factors = np.zeros((n, len(LIFESTYLE_FACTORS) + 1))
+        factors = self.factors
+        factors[:, FACTOR_INDEX['obesity']] = np.where(
+            self.bmi >= OBESE_BMI, 1.0, np.where(self.bmi >= OVERWEIGHT_BMI, 0.5, 0.0)
+        )
+        factors[:, FACTOR_INDEX['smoking']] = np.where(smoking, 1.0, 0.0)
+        # Score each distinct answer with the scalar rule, then spread to patients
+        for factor, (field, default, points) in LIFESTYLE_CHOICES.items():
+            codes, distinct = answers[field, default]
+            scores = np.array([choice_points(points, answer) for answer in distinct], dtype=np.float64)
+            factors[:, FACTOR_INDEX[factor]] = scores[codes]
+        for factor, value in CONSTANT_FACTORS.items():
+            factors[:, FACTOR_INDEX[factor]] = value
+
+
+def batch_bmi(patients: List[Dict[str, Any]], weights: List, heights: List) -> np.ndarray:
+    """(N,) BMI - vectorized calculate_bmi, per-patient fallback for odd inputs"""
+    if not set(map(type, weights)) | set(map(type, heights)) <= {int, float}:
+        return np.array([calculate_bmi(p) for p in patients], dtype=np.float64)
+
+    weight = np.array(weights, dtype=np.float64)
+    height = np.array(heights, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        height_m = height / 100
+        bmi = round_like_python(weight / (height_m ** 2), 1)
+    return np.where(height > 0, bmi, 22.0)
+
+
+def _column(dicts: List[Dict[str, Any]], key: str, default: Any) -> List[Any]:
+    """[d.get(key, default) for d in dicts], in one C-level pass"""
+    return list(map(dict.get, dicts, repeat(key), repeat(default)))
+
+
+def _lookup(values: List[Any], table: Dict[Any, int], default: int) -> np.ndarray:
+    """(L,) table.get(value, default) for each value; unhashable values get default"""
+    try:
+        # One C-level pass - a Python loop per value would cost more than the scoring
+        return np.fromiter(map(table.get, values, repeat(default)), dtype=np.intp, count=len(values))
+    except TypeError:
+        return np.array([table.get(_hashable(value), default) for value in values], dtype=np.intp)
+
+
+def _lab_floats(values: List[Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (L,) values as floats, whether float() accepted each one, and whether
+    each one was given at all (not None)
+    """
+    if set(map(type, values)) <= {int, float, type(None)}:
+        floats = np.array(values, dtype=np.float64)
+        given = np.ones(len(values), dtype=bool)
+        # None became NaN; a NaN the client sent is still a given value
+        for k in np.flatnonzero(np.isnan(floats)).tolist():
+            given[k] = values[k] is not None
+        return floats, given.copy(), given
+
+    floats = np.zeros(len(values))
+    numeric = np.ones(len(values), dtype=bool)
+    given = np.ones(len(values), dtype=bool)
+    for k, value in enumerate(values):
+        if value is None:
+            given[k] = numeric[k] = False
+            continue
+        try:
+            floats[k] = float(value)
+        except (TypeError, ValueError):
+            numeric[k] = False
+    return floats, numeric, given
+
+
+def _distinct_answers(values: List[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """(N,) index of each value into the distinct values, and the distinct values"""
+    try:
+        code_of = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    except TypeError:
+        # Unhashable value somewhere in the column
+        values = [_hashable(value) for value in values]
+        code_of = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    codes = np.fromiter(map(code_of.__getitem__, values), dtype=np.intp, count=len(values))
+    return codes, list(code_of)
+
+
+def _hashable(value: Any) -> Any:
+    """value itself, or UNHASHABLE_ANSWER if it cannot be a dict key"""
+    try:
+        hash(value)
+    except TypeError:
+        return UNHASHABLE_ANSWER
+    return value
+
+
+# -------------------- SCORING --------------------
+
+def batch_family_scores(batch: PatientBatch, rules: CompiledRules) -> np.ndarray:
+    """(N, D) family scores - vectorized calculate_family_score"""
+    counts = batch.family_counts
+    score = 0.0 + np.minimum(counts[:, :, 0] * 0.25, 0.50)
+    score = score + np.minimum(counts[:, :, 1] * 0.25, 0.50)
+    score = score + np.minimum(counts[:, :, 2] * 0.30, 0.60)
+    score = score + np.minimum(counts[:, :, 3] * 0.10, 0.30)
+
+    score = np.where(rules.heritable, np.minimum(1.0, score * 1.4), score)
+    score = np.minimum(0.95, np.maximum(0.1, score + 0.05))
+    return np.where(batch.has_family[:, None], score, 0.1)
+
+
+def batch_lifestyle_scores(batch: PatientBatch, rules: CompiledRules) -> np.ndarray:
+    """(N, D) lifestyle scores - vectorized calculate_lifestyle_score"""
+    # Accumulate factor scores in each disease's own order so sums match exactly
+    score = np.zeros((len(batch.records), len(rules.disease_ids)))
+    for k in range(rules.factor_matrix.shape[1]):
+        score += np.take(batch.factors, rules.factor_matrix[:, k], axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalized = score / rules.factor_counts
+    normalized = np.where(batch.short_sleep[:, None], normalized + 0.08, normalized)
+    normalized = np.minimum(0.90, np.maximum(0.1, normalized))
+
+    normalized = np.where(rules.factor_counts > 0, normalized, 0.15)
+    return np.where(batch.has_lifestyle[:, None], normalized, 0.2)
+
+
+def _marker_points(marker: str, values: np.ndarray, thresholds: Dict) -> np.ndarray:
+    """Points per patient for one marker - same branches as calculate_lab_score"""
+    def tiers(first, first_points, second, second_points):
+        return np.where(first, first_points, np.where(second, second_points, 0.0))
+
+    if marker == 'hba1c':
+        return tiers(values >= thresholds.get('hba1c_diabetic', 6.5), 1.0,
+                     values >= thresholds.get('hba1c_prediabetic', 5.7), 0.6)
+    if marker == 'fasting_glucose':
+        return tiers(values >= thresholds.get('fasting_glucose_diabetic', 126), 1.0,
+                     values >= thresholds.get('fasting_glucose_prediabetic', 100), 0.6)
+    if marker == 'ldl':
+        return tiers(values >= thresholds.get('ldl_very_high', 190), 1.0,
+                     values >= thresholds.get('ldl_high', 130), 0.7)
+    if marker == 'hdl':
+        return tiers(values < thresholds.get('hdl_low', 40), 0.8, values < 50, 0.4)
+    if marker == 'triglycerides':
+        return tiers(values >= 200, 1.0, values >= thresholds.get('triglycerides_high', 150), 0.6)
+    if marker == 'systolic_bp':
+        return tiers(values >= 140, 1.0, values >= thresholds.get('systolic_elevated', 130), 0.6)
+    if marker == 'diastolic_bp':
+        return tiers(values >= 90, 1.0, values >= thresholds.get('diastolic_elevated', 80), 0.6)
+    if marker == 'tsh':
+        return np.where(values >= thresholds.get('tsh_high', 4.5), 0.8, 0.0)
+    if marker == 'hemoglobin':
+        return np.where(values < thresholds.get('hemoglobin_low', 12.0), 0.7, 0.0)
+
+    # Generic threshold check for other markers
+    high_key = f"{marker}_high"
+    low_key = f"{marker}_low"
+    high = values >= thresholds[high_key] if high_key in thresholds else np.zeros(values.shape, dtype=bool)
+    low = values <= thresholds[low_key] if low_key in thresholds else np.zeros(values.shape, dtype=bool)
+    return tiers(high, 0.6, low, 0.6)
+
+
+def batch_lab_scores(batch: PatientBatch, rules: CompiledRules) -> np.ndarray:
+    """(N, D) lab scores - vectorized calculate_lab_score"""
+    n = len(batch.records)
+    scores = np.empty((n, len(rules.diseases)))
+
+    for j, disease in enumerate(rules.diseases):
+        thresholds = disease.get('thresholds', {})
+        markers = disease.get('lab_markers', [])
+
+        if not thresholds:
+            scores[:, j] = 0.15
+            continue
+        if not markers:
+            scores[:, j] = 0.1
+            continue
+
+        score = np.zeros(n)
+        checked = np.zeros(n)
+        for marker in markers:
+            m = rules.lab_index[marker]
+            # Missing and non-numeric values are NaN, which no tier matches
+            with np.errstate(invalid='ignore'):
+                score += _marker_points(marker, batch.labs[m], thresholds)
+            checked += batch.lab_present[m]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = np.where(checked > 0, score / checked, 0.15)
+        scores[:, j] = np.minimum(0.95, np.maximum(0.1, normalized))
+
+    # Empty lab dict short-circuits to 0.15 for every disease
+    return np.where(batch.has_labs[:, None], scores, 0.15)
+
+
+def score_batch(batch: PatientBatch, rules: CompiledRules) -> Dict[str, np.ndarray]:
+    """
+    Component scores, final probability and risk class for every patient x disease
+
+    Returns:
+        Dict of (N, D) arrays: family, lifestyle, lab, probability and
+        risk_class (index into ['I', 'II', 'III', 'IV'])
+    """
+    family = batch_family_scores(batch, rules)
+    lifestyle = batch_lifestyle_scores(batch, rules)
+    lab = batch_lab_scores(batch, rules)
+
+    # Adjust weights based on data completeness
+    full_weights = batch.has_labs[:, None] & rules.has_markers[None, :]
+    family_weight = np.where(full_weights, 0.40, 0.50)
+    lifestyle_weight = np.where(full_weights, 0.35, 0.40)
+    lab_weight = np.where(full_weights, 0.25, 0.10)
+
+    base = family * family_weight + lifestyle * lifestyle_weight + lab * lab_weight
+
+    # Boost if strong family history / very abnormal labs
+    base = np.where(family > 0.6, np.minimum(1.0, base + rules.family_weight * 0.15), base)
+    base = np.where(lab > 0.7, np.minimum(1.0, base + 0.12), base)
+
+    # Gender-specific adjustment for PCOS
+    if rules.pcos_column is not None:
+        base[~batch.female, rules.pcos_column] = 0.0
+
+    # Age adjustments for certain diseases
+    older = (batch.age > 45)[:, None] & rules.age_boost[None, :]
+    base = np.where(older, np.minimum(1.0, base + 0.08), base)
+
+    probability = np.minimum(0.99, np.maximum(0.0, base))
+    # Number of class bounds reached (searchsorted side='right', without the binary search)
+    risk_class = (probability >= rules.class_bounds[0]).astype(np.intp)
+    for bound in rules.class_bounds[1:]:
+        risk_class += probability >= bound
+
+    return {
+        'family': family,
+        'lifestyle': lifestyle,
+        'lab': lab,
+        'probability': probability,
+        'risk_class': risk_class
+    }
+
+
+# -------------------- PUBLIC API --------------------
+
+RISK_CLASS_NAMES = ['I', 'II', 'III', 'IV']
+RISK_CLASS_ARRAY = np.array(RISK_CLASS_NAMES, dtype=object)
+
+
+def score_records(
+    records: Sequence[Dict[str, Any]],
+    kb: Optional[KnowledgeBase] = None
+) -> Dict[str, Any]:
+    """
+    Columnar scoring without per-result dicts - the fastest bulk path
+
+    Args:
+        records: user_data dicts in the predict_risks input format
+        kb: Knowledge base snapshot (defaults to the active one)
+
+    Returns:
+        Dict with:
+            - disease_ids: column order (D) of every array below
+            - probability: (N, D) rounded exactly as predict_risks rounds
+            - risk_class: (N, D) index into RISK_CLASS_NAMES
+            - raw_probability, family, lifestyle, lab: (N, D) unrounded scores
+            - bmi: (N,) BMI used for lifestyle scoring
+            - kb_version: Snapshot the scores were computed against
+    """
+    kb = kb or get_knowledge_base()
+    rules = compile_rules(kb)
+    batch = PatientBatch(records, rules)
+    scores = score_batch(batch, rules)
+
+    return {
+        'disease_ids': rules.disease_ids,
+        'probability': round_like_python(scores['probability'], 2),
+        'risk_class': scores['risk_class'],
+        'raw_probability': scores['probability'],
+        'family': scores['family'],
+        'lifestyle': scores['lifestyle'],
+        'lab': scores['lab'],
+        'bmi': batch.bmi,
+        'kb_version': kb.version
+    }
+
+
+def predict_risks_batch(
+    records: Sequence[Dict[str, Any]],
+    kb: Optional[KnowledgeBase] = None,
+    details: bool = False
+) -> List[List[Dict[str, Any]]]:
+    """
+    Score many patients at once
+
+    Args:
+        records: user_data dicts in the predict_risks input format
+        kb: Knowledge base snapshot (defaults to the active one)
+        details: Also build reasons, prevention, tests and consult guidance.
+            With details=True each entry equals predict_risks(record);
+            without, only disease_name, disease_id, probability and
+            risk_class are returned (the fast path for bulk re-scoring).
+
+    Returns:
+        One result list per record, each sorted by probability descending
+    """
+    kb = kb or get_knowledge_base()
+    if not records:
+        return []
+
+    rules = compile_rules(kb)
+    scores = score_records(records, kb)
+
+    rounded = scores['probability']
+    # Stable descending order == list.sort(key=probability, reverse=True)
+    order = np.argsort(-rounded, axis=1, kind='stable')
+    names = [d['name'] for d in rules.diseases]
+    ids = rules.disease_ids
+
+    if not details:
+        # Reorder every column at once, then build all N x D dicts in one pass
+        n_diseases = len(ids)
+        cells = [
+            {'disease_name': name, 'disease_id': disease_id, 'probability': probability, 'risk_class': risk_class}
+            for name, disease_id, probability, risk_class in zip(
+                rules.name_array[order].ravel().tolist(),
+                rules.id_array[order].ravel().tolist(),
+                np.take_along_axis(rounded, order, axis=1).ravel().tolist(),
+                RISK_CLASS_ARRAY[np.take_along_axis(scores['risk_class'], order, axis=1)].ravel().tolist()
+            )
+        ]
+        return [cells[start:start + n_diseases] for start in range(0, len(cells), n_diseases)]
+
+    order = order.tolist()
+    rounded = rounded.tolist()
+    risk_classes = scores['risk_class'].tolist()
+    probabilities = scores['raw_probability'].tolist()
+    families = scores['family'].tolist()
+    lifestyles = scores['lifestyle'].tolist()
+    labs = scores['lab'].tolist()
+    bmis = scores['bmi'].tolist()
+
+    output = []
+    for i, record in enumerate(records):
+        patient = record.get('patient', {})
+        basic_info = {
+            'age': patient.get('age', 30),
+            'gender': patient.get('gender', 'unknown'),
+            'bmi': bmis[i]
+        }
+        user_data_with_basic = {**record, 'basic_info': basic_info}
+
+        results = []
+        for j in order[i]:
+            disease_id = ids[j]
+            probability = probabilities[i][j]
+            risk_class = RISK_CLASS_NAMES[risk_classes[i][j]]
+            tests_simple, tests_detail = get_tests_for_disease(disease_id, risk_class, kb)
+            consult_info = get_consult_urgency(disease_id, risk_class, probability, user_data_with_basic)
+
+            results.append({
+                'disease_name': names[j],
+                'disease_id': disease_id,
+                'probability': rounded[i][j],
+                'risk_class': risk_class,
+                'reasons': generate_reasons(
+                    rules.diseases[j], user_data_with_basic,
+                    families[i][j], lifestyles[i][j], labs[i][j]
+                ),
+                'prevention': get_prevention_for_disease(disease_id, risk_class, kb),
+                'recommended_tests': tests_simple,
+                'recommended_tests_detail': tests_detail,
+                'consult': consult_info['level'],
+                'consult_detail': consult_info
+            })
+
+        output.append(results)
+
+    return output
+
+
+def round_like_python(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    Round exactly like the builtin round(x, digits)
+
+    np.round computes rint(x * 10**digits), which can resolve a tie the
+    wrong way when x * 10**digits lands exactly on .5 after floating-point
+    rounding. For those cells the exact product error (Dekker's TwoProduct)
+    tells which side of the tie the true value is on.
+    """
+    scale = 10.0 ** digits
+    scaled = values * scale
+    rounded = np.rint(scaled)
+
+    ties = scaled - np.floor(scaled) == 0.5
+    if ties.any():
+        error = _product_error(values[ties], scale)
+        lower = np.floor(scaled[ties])
+        rounded[ties] = np.where(error > 0, lower + 1, np.where(error < 0, lower, rounded[ties]))
+
+    return rounded / scale
+
+
+def _product_error(a: np.ndarray, b: float) -> np.ndarray:
+    """Exact rounding error of a * b (Dekker TwoProduct, no FMA needed)"""
+    def split(x):
+        c = 134217729.0 * x  # 2**27 + 1
+        high = c - (c - x)
+        return high, x - high
+
+    a_high, a_low = split(a)
+    b_high, b_low = split(np.float64(b))
+    product = a * b
+    return ((a_high * b_high - product) + a_high * b_low + a_low * b_high) + a_low * b_low
@@ -4,43 +4,27 @@ Converts probability scores to Risk Class I, II, III, or IV
 Thresholds defined in diseases_config.json for single source of truth
 """
 
-import json
-from pathlib import Path
-
-# Module-relative paths
-BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
-DISEASES_PATH = DATA_DIR / "diseases_config.json"
+from typing import Dict, Optional
+from ..knowledge_base import DEFAULT_THRESHOLDS, get_knowledge_base
 
 
 def load_thresholds():
-    """Load risk class thresholds from config"""
+    """Risk class thresholds from the compiled knowledge base"""
     try:
-        with open(DISEASES_PATH, 'r') as f:
-            config = json.load(f)
-            return config.get('risk_class_thresholds', {
-                'I': {'min': 0.0, 'max': 0.30},
-                'II': {'min': 0.30, 'max': 0.55},
-                'III': {'min': 0.55, 'max': 0.75},
-                'IV': {'min': 0.75, 'max': 1.0}
-            })
+        return get_knowledge_base().thresholds
     except Exception as e:
         print(f"Error loading thresholds: {e}")
         # Fallback to hardcoded
-        return {
-            'I': {'min': 0.0, 'max': 0.30},
-            'II': {'min': 0.30, 'max': 0.55},
-            'III': {'min': 0.55, 'max': 0.75},
-            'IV': {'min': 0.75, 'max': 1.0}
-        }
+        return DEFAULT_THRESHOLDS
 
 
-def get_risk_class(probability: float) -> str:
+def get_risk_class(probability: float, thresholds: Optional[Dict] = None) -> str:
     """
     Assign risk class based on probability
     
     Args:
         probability: Risk probability (0.0 to 1.0)
+        thresholds: Class thresholds to use (defaults to the knowledge base)
     
     Returns:
         Risk class: 'I', 'II', 'III', or 'IV'
@@ -52,7 +36,8 @@ def get_risk_class(probability: float) -> str:
         IV:  0.75 - 1.00 (Very High)
     """
     
-    thresholds = load_thresholds()
+    if thresholds is None:
+        thresholds = load_thresholds()
     
     if probability < thresholds['II']['min']:
         return 'I'
@@ -76,10 +61,7 @@ def get_risk_class_info(risk_class: str) -> dict:
     """
     
     try:
-        guidelines_path = DATA_DIR / "guidelines.json"
-        with open(guidelines_path, 'r') as f:
-            guidelines = json.load(f)
-            return guidelines.get('risk_classes', {}).get(risk_class, {})
+        return get_knowledge_base().get_risk_class_info(risk_class)
     except Exception as e:
         print(f"Error loading risk class info: {e}")
         # Fallback
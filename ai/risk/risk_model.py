@@ -3,30 +3,21 @@ Main risk prediction engine
 Callable by FastAPI: predict_risks(user_data) -> list of disease risk objects
 """
 
-import json
-from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from .scoring_rules import calculate_family_score, calculate_lifestyle_score, calculate_lab_score
 from .risk_classes import get_risk_class
 from .explainability import generate_reasons
 from ..coaching.consult_logic import get_consult_urgency
+from ..knowledge_base import KnowledgeBase, get_knowledge_base
+from ..instrumentation import ENGINE_TIMINGS, perf_counter
 
-# Module-relative paths
-BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
 
-DISEASES_PATH = DATA_DIR / "diseases_config.json"
-GUIDELINES_PATH = DATA_DIR / "guidelines.json"
-TESTS_PATH = DATA_DIR / "tests_map.json"
+def load_diseases_config(kb: Optional[KnowledgeBase] = None):
+    """Disease configuration from the compiled knowledge base"""
+    return (kb or get_knowledge_base()).diseases
 
 
-def load_diseases_config():
-    """Load disease configuration from JSON"""
-    with open(DISEASES_PATH, 'r') as f:
-        return json.load(f)['diseases']
-
-
-def predict_risks(user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+def predict_risks(user_data: Dict[str, Any], kb: Optional[KnowledgeBase] = None) -> List[Dict[str, Any]]:
     """
     Main prediction function
     
@@ -36,12 +27,19 @@ def predict_risks(user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
             - lifestyle: {smoking, alcohol, exercise, diet, stress_level, sleep_hours}
             - family: [{role, generation, known_issues}, ...]
             - lab_values: {hba1c, fasting_glucose, ldl, hdl, etc.}
+        kb: Knowledge base snapshot to score against (defaults to the active one)
     
     Returns:
         List of disease risk predictions, sorted by probability descending
     """
     
-    diseases = load_diseases_config()
+    # Stage timing (None when disabled - one truthiness check per stage)
+    timings = ENGINE_TIMINGS if ENGINE_TIMINGS.active() else None
+    call_start = lap = perf_counter() if timings else 0.0
+    
+    # One snapshot for the whole call, so every disease sees the same data
+    kb = kb or get_knowledge_base()
+    diseases = kb.diseases
     results = []
     
     # Extract patient info for use in scoring
@@ -123,7 +121,9 @@ def predict_risks(user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         probability = min(0.99, max(0.0, base_probability))
         
         # Determine risk class
-        risk_class = get_risk_class(probability)
+        risk_class = get_risk_class(probability, kb.thresholds)
+        if timings:
+            lap = timings.lap('score', disease_id, lap)
         
         # Generate explanations - pass basic_info for compatibility
         user_data_with_basic = {
@@ -138,15 +138,23 @@ def predict_risks(user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
             lifestyle_score,
             lab_score
         )
+        if timings:
+            lap = timings.lap('reasons', disease_id, lap)
         
         # Get prevention recommendations
-        prevention = get_prevention_for_disease(disease_id, risk_class)
+        prevention = get_prevention_for_disease(disease_id, risk_class, kb)
+        if timings:
+            lap = timings.lap('prevention', disease_id, lap)
         
         # Get recommended tests (both simple and detailed)
-        tests_simple, tests_detail = get_tests_for_disease(disease_id, risk_class)
+        tests_simple, tests_detail = get_tests_for_disease(disease_id, risk_class, kb)
+        if timings:
+            lap = timings.lap('tests', disease_id, lap)
         
         # Determine consult urgency using dedicated module
         consult_info = get_consult_urgency(disease_id, risk_class, probability, user_data_with_basic)
+        if timings:
+            lap = timings.lap('consult', disease_id, lap)
         
         results.append({
             'disease_name': disease_name,
@@ -164,6 +172,9 @@ def predict_risks(user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     # Sort by probability descending
     results.sort(key=lambda x: x['probability'], reverse=True)
     
+    if timings:
+        timings.finish_call(perf_counter() - call_start)
+    
     return results
 
 
@@ -182,64 +193,30 @@ def calculate_bmi(patient_info: Dict) -> float:
         return 22.0
 
 
-def get_prevention_for_disease(disease_id: str, risk_class: str) -> List[str]:
+def get_prevention_for_disease(disease_id: str, risk_class: str, kb: Optional[KnowledgeBase] = None) -> List[str]:
     """Get prevention recommendations based on disease and risk class"""
     try:
-        with open(GUIDELINES_PATH, 'r') as f:
-            guidelines = json.load(f)
-        
-        # Get risk class general prevention
-        general_prevention = guidelines['risk_classes'].get(risk_class, {}).get('prevention', [])
-        
-        # Get disease-specific prevention
-        disease_prevention = guidelines.get('disease_specific_prevention', {}).get(disease_id, {})
-        
-        combined = []
-        
-        # Add top items from disease-specific categories
-        if 'diet' in disease_prevention:
-            combined.extend(disease_prevention['diet'][:2])
-        if 'exercise' in disease_prevention:
-            combined.extend(disease_prevention['exercise'][:1])
-        if 'lifestyle' in disease_prevention:
-            combined.extend(disease_prevention['lifestyle'][:2])
-        
-        # Add general prevention if high risk
-        if risk_class in ['III', 'IV']:
-            combined.extend(general_prevention[:2])
-        
-        # Deduplicate while preserving order
-        seen = set()
-        deduped = []
-        for item in combined:
-            if item not in seen:
-                seen.add(item)
-                deduped.append(item)
-        
-        return deduped[:5]  # Return top 5 recommendations
+        return (kb or get_knowledge_base()).get_prevention(disease_id, risk_class)
     
     except Exception as e:
         print(f"Error loading prevention guidelines: {e}")
         return ["Maintain healthy lifestyle", "Regular health checkups"]
 
 
-def get_tests_for_disease(disease_id: str, risk_class: str) -> tuple:
+def get_tests_for_disease(disease_id: str, risk_class: str, kb: Optional[KnowledgeBase] = None) -> tuple:
     """
     Get recommended screening tests for a disease
     Returns: (simple_list, detailed_list)
     """
     try:
-        with open(TESTS_PATH, 'r') as f:
-            tests_data = json.load(f)
-        
-        disease_tests = tests_data.get('disease_tests', {}).get(disease_id, [])
+        disease_tests = (kb or get_knowledge_base()).get_tests(disease_id)
         
         # Return simplified test list for FE + full details
         simple = [test['name'] for test in disease_tests[:4]]  # Top 4 tests
-        detail = disease_tests[:4]
+        detail = [dict(test) for test in disease_tests[:4]]
         
         return simple, detail
     
     except Exception as e:
         print(f"Error loading tests: {e}")
-        return ["Consult doctor for appropriate screening"], []
\ No newline at end of file
+        return ["Consult doctor for appropriate screening"], []
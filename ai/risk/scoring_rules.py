@@ -6,32 +6,59 @@ Returns normalized scores (0.0 - 1.0) for each component
 from typing import Dict, Any, List
 import logging
 
+from ..lab_labels import LAB_LABELS
+
 logger = logging.getLogger(__name__)
 
+# -------------------- LIFESTYLE FACTORS --------------------
+# Shared with the vectorized engine (batch_model.py), which encodes the
+# same tables - change scoring here and both engines follow
+
+# Factor -> (lifestyle field, default answer, points per answer); any other
+# answer scores 0
+LIFESTYLE_CHOICES = {
+    'sedentary': ('exercise', 'regular', {'sedentary': 1.0, 'none': 1.0, 'rare': 1.0, 'occasional': 0.5}),
+    'alcohol': ('alcohol', 'none', {'heavy': 1.0, 'frequent': 1.0, 'daily': 1.0, 'moderate': 0.4, 'occasional': 0.4}),
+    # Diet factors match diseases_config.json lifestyle_factors
+    'high_sugar': ('diet', 'balanced', {'high_sugar': 1.0}),
+    'high_fat_diet': ('diet', 'balanced', {'high_fat_diet': 1.0}),
+    'high_salt': ('diet', 'balanced', {'high_salt': 1.0}),
+    'stress': ('stress_level', 'low', {'high': 1.0, 'severe': 1.0, 'moderate': 0.5}),
+}
+
+# Factors that need no user input: fixed default risk
+CONSTANT_FACTORS = {
+    'air_pollution': 0.3,      # Assume urban = pollution
+    'allergen_exposure': 0.3,
+    'iodine_deficiency': 0.2,  # Would need specific input - assume low baseline
+    'hormone_therapy': 0.2,    # Would need specific input
+}
+
+# BMI at or above which 'obesity' scores 1.0 / 0.5
+OBESE_BMI = 30
+OVERWEIGHT_BMI = 25
+
+
+def choice_points(points: Dict[Any, float], answer: Any) -> float:
+    """Points for a categorical lifestyle answer (0.0 for unlisted or unhashable answers)"""
+    try:
+        return points.get(answer, 0.0)
+    except TypeError:
+        return 0.0
+
 
 def normalize_lab_key(key: str) -> str:
-    """Normalize lab keys to handle variations from OCR"""
-    key_lower = key.lower().replace(' ', '_').replace('-', '_')
-    
-    # Common variations mapping
-    mappings = {
-        'hba1c': ['hba1c', 'hemoglobin_a1c', 'glycated_hemoglobin'],
-        'fasting_glucose': ['fasting_glucose', 'fasting_blood_sugar', 'fbs'],
-        'ldl': ['ldl', 'ldl_cholesterol', 'low_density_lipoprotein'],
-        'hdl': ['hdl', 'hdl_cholesterol', 'high_density_lipoprotein'],
-        'triglycerides': ['triglycerides', 'tg'],
-        'total_cholesterol': ['total_cholesterol', 'cholesterol'],
-        'systolic_bp': ['systolic_bp', 'systolic', 'sbp'],
-        'diastolic_bp': ['diastolic_bp', 'diastolic', 'dbp'],
-        'tsh': ['tsh', 'thyroid_stimulating_hormone'],
-        'hemoglobin': ['hemoglobin', 'hgb', 'hb']
-    }
-    
-    for canonical, variants in mappings.items():
-        if key_lower in variants:
-            return canonical
+    """
+    Normalize lab keys to handle variations from OCR
     
-    return key_lower
+    Aliases and misspellings ("LDL-C", "trig1ycerides", "S.Cholesterol")
+    resolve through the shared label index (ai/lab_labels.py); unknown
+    keys are returned lower case with '_' for spaces and dashes.
+    """
+    found = LAB_LABELS.resolve(key)
+    if found is not None:
+        return found.marker
+    return key.lower().replace(' ', '_').replace('-', '_')
 
 
 def calculate_family_score(disease: Dict, family: List[Dict]) -> float:
@@ -126,72 +153,25 @@ def calculate_lifestyle_score(disease: Dict, lifestyle: Dict, basic_info: Dict)
     score = 0.0
     max_possible = len(disease_factors)
     
-    # Normalize diet value from lifestyle
-    diet = lifestyle.get('diet', 'balanced')
-    
     # Check each relevant lifestyle factor
     for factor in disease_factors:
         if factor == 'obesity':
             bmi = basic_info.get('bmi', 22)
-            if bmi >= 30:
-                score += 1.0
-            elif bmi >= 25:
-                score += 0.5
-        
-        elif factor == 'sedentary':
-            exercise = lifestyle.get('exercise', 'regular')
-            if exercise in ['sedentary', 'none', 'rare']:
+            if bmi >= OBESE_BMI:
                 score += 1.0
-            elif exercise == 'occasional':
+            elif bmi >= OVERWEIGHT_BMI:
                 score += 0.5
         
         elif factor == 'smoking':
             if lifestyle.get('smoking', False):
                 score += 1.0
         
-        elif factor == 'alcohol':
-            alcohol = lifestyle.get('alcohol', 'none')
-            if alcohol in ['heavy', 'frequent', 'daily']:
-                score += 1.0
-            elif alcohol in ['moderate', 'occasional']:
-                score += 0.4
-        
-        elif factor == 'high_sugar':
-            # Match with diseases_config.json lifestyle_factors
-            if diet == 'high_sugar':
-                score += 1.0
-        
-        elif factor == 'high_fat_diet':
-            # Match with diseases_config.json lifestyle_factors
-            if diet == 'high_fat_diet':
-                score += 1.0
-        
-        elif factor == 'high_salt':
-            # Match with diseases_config.json lifestyle_factors
-            if diet == 'high_salt':
-                score += 1.0
-        
-        elif factor == 'stress':
-            stress = lifestyle.get('stress_level', 'low')
-            if stress in ['high', 'severe']:
-                score += 1.0
-            elif stress == 'moderate':
-                score += 0.5
-        
-        elif factor == 'air_pollution':
-            # Assume urban = pollution
-            score += 0.3  # Default moderate risk
-        
-        elif factor == 'allergen_exposure':
-            score += 0.3  # Default moderate risk
-        
-        elif factor == 'iodine_deficiency':
-            # Would need specific input - assume low baseline
-            score += 0.2
+        elif factor in LIFESTYLE_CHOICES:
+            field, default, points = LIFESTYLE_CHOICES[factor]
+            score += choice_points(points, lifestyle.get(field, default))
         
-        elif factor == 'hormone_therapy':
-            # Would need specific input
-            score += 0.2
+        elif factor in CONSTANT_FACTORS:
+            score += CONSTANT_FACTORS[factor]
     
     # Normalize
     if max_possible > 0:
@@ -3,6 +3,8 @@ Configuration Management
 Handles environment variables and application settings
 """
 
+import tempfile
+from pathlib import Path
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -38,6 +40,69 @@ class Settings(BaseSettings):
     # AI Module Configuration
     AI_MODULE_PATH: str = "../ai"
     
+    # Batch prediction (POST /api/predict-risk/batch)
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_MAX_BODY_BYTES: int = 5 * 1024 * 1024  # 5MB
+    
+    # Render prediction responses straight from engine output to JSON bytes
+    # (orjson if installed) instead of building and re-validating models
+    FAST_SERIALIZATION: bool = True
+    
+    # OCR (POST /api/ocr) - easyocr is imported on first use
+    OCR_ENABLED: bool = True  # False: prediction-only process, /api/ocr not mounted
+    OCR_WARMUP: bool = False  # load the OCR model in the background at startup
+    OCR_READERS_PER_PROCESS: int = 1  # EasyOCR readers per OCR worker (match thread concurrency)
+    OCR_READER_IDLE_TIMEOUT: float = 600.0  # seconds before an unused reader is freed (0 = never)
+    OCR_PDF_DPI: int = 200  # render resolution for PDF pages
+    OCR_BATCH_PAGES: int = 4  # same-sized PDF pages recognized in one EasyOCR batch (1 = page by page)
+    OCR_MODE: str = "full"  # "full" or "two_stage" (recognize only rows holding a lab label)
+    OCR_REQUIRED_MARKERS: List[str] = []  # labs every page should hold (two_stage fallback, progressive escalation)
+    OCR_PROGRESSIVE_SCALES: List[float] = [0.5, 1.0]  # page scales tried lowest first ([1.0] = single pass)
+    OCR_MIN_CONFIDENCE: float = 0.4  # values read with less OCR confidence are re-read at the next scale
+    OCR_TIME_BUDGET: float = 0.0  # seconds per POST /api/ocr upload (0 = none); ?budget_ms= can lower it
+    OCR_TEMPLATES_ENABLED: bool = True  # read known lab layouts from their field regions only
+    OCR_TEMPLATE_PATH: str = ""  # template registry file ("" = ai/data/lab_templates.json)
+    OCR_TEMPLATE_MAX_DISTANCE: int = 12  # perceptual hash bits (of 64) a page may differ by
+    PDF_TEXT_MIN_CHARS: int = 20  # embedded text needed to skip OCR for a PDF page
+    # Image preprocessing before OCR (see ai/ocr/preprocessing.py); order is fixed
+    OCR_PREPROCESS_STEPS: List[str] = ["reduced_decode", "grayscale", "downscale", "crop", "deskew"]
+    OCR_MAX_SIDE: int = 2200  # long side cap in px - phone photos are decoded/resized down to this
+    OCR_TARGET_TEXT_HEIGHT: int = 0  # shrink further until glyphs are this tall in px (0 = off)
+    
+    # OCR result cache, keyed by upload hash (raw text + parsed values)
+    OCR_CACHE_BACKEND: str = "sqlite"  # "sqlite" (shared by workers), "memory" or "none"
+    OCR_CACHE_PATH: str = str(Path(tempfile.gettempdir()) / "genetic_risk_ocr_cache.sqlite3")
+    OCR_CACHE_TTL: float = 30 * 24 * 3600.0  # seconds (30 days)
+    OCR_CACHE_MAX_ENTRIES: int = 20000
+    OCR_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 64MB of text and parsed values
+
+    # Asynchronous OCR jobs (POST /api/ocr/jobs)
+    OCR_JOB_STORE: str = "sqlite"  # "sqlite" (any worker can answer polls) or "memory"
+    OCR_JOB_PATH: str = str(Path(tempfile.gettempdir()) / "genetic_risk_ocr_jobs.sqlite3")
+    OCR_JOB_TTL: float = 3600.0  # seconds a job is kept after its last update
+    OCR_JOB_WORKERS: int = 1  # jobs processed at once per process (keep <= OCR_MAX_CONCURRENCY)
+    OCR_JOB_MAX_QUEUE: int = 32  # queued uploads held in memory; beyond this 503
+    OCR_JOB_BUSY_TIMEOUT: float = 300.0  # seconds a job waits for an OCR slot before it fails
+    
+    # Execution limits - requests beyond concurrency + queue get 503
+    PREDICT_MAX_CONCURRENCY: int = 4  # rule engine threads
+    PREDICT_MAX_QUEUE: int = 64
+    OCR_EXECUTOR: str = "process"  # "process" or "thread"
+    OCR_MAX_CONCURRENCY: int = 1  # OCR workers (each loads its own model)
+    OCR_MAX_QUEUE: int = 8
+    BUSY_RETRY_AFTER: int = 5  # seconds, sent as Retry-After
+    
+    # Prediction result cache
+    PREDICT_CACHE_BACKEND: str = "memory"  # "memory", "sqlite" (shared by workers) or "none"
+    PREDICT_CACHE_TTL: float = 600.0  # seconds
+    PREDICT_CACHE_MAX_ENTRIES: int = 2048
+    PREDICT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # 32MB of serialized responses
+    PREDICT_CACHE_PATH: str = str(Path(tempfile.gettempdir()) / "genetic_risk_predict_cache.sqlite3")
+    
+    # Knowledge base hot-reload (polls ai/data for edits)
+    KB_RELOAD_ENABLED: bool = True
+    KB_RELOAD_INTERVAL: float = 5.0  # seconds between mtime checks
+    
     # Optional: Database Configuration
     # DATABASE_URL: str = "sqlite:///./genetic_risk.db"
     # Uncomment for PostgreSQL:
@@ -48,6 +113,16 @@ class Settings(BaseSettings):
     # ALGORITHM: str = "HS256"
     # ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Observability
+    METRICS_ENABLED: bool = True  # route latency middleware + /metrics
+    ENGINE_TIMING_ENABLED: bool = True  # per-stage predict_risks histograms
+    SERVER_TIMING_ENABLED: bool = True  # Server-Timing response header
+    PROFILING_ENABLED: bool = False  # admin-only: allow per-request cProfile runs
+    PROFILING_HEADER: str = "X-Profile"  # request header that triggers profiling
+    PROFILING_TOKEN: str = ""  # if set, the header value must match it
+    PROFILING_TOP_N: int = 30  # functions kept in the text report
+    PROFILING_DIR: str = str(Path(tempfile.gettempdir()) / "genetic_risk_profiles")
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
@@ -3,9 +3,24 @@ FastAPI Main Application
 Gen Counselling AI for Good - Genetic Risk Assessment Platform
 """
 
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import predict, ocr, diseases
+from fastapi.responses import PlainTextResponse
+from app.config import settings
+from app.routers import predict, diseases
+from app.services.knowledge_base_service import (
+    start_knowledge_base,
+    stop_knowledge_base,
+    get_knowledge_base_status
+)
+from app.services.execution_service import get_executor_status, shutdown_executors
+from app.services.cache_service import get_cache_status
+from app.services.coalescing_service import get_coalescing_status
+from app.services.metrics_service import MetricsMiddleware, render_metrics, CONTENT_TYPE
+from app.services.timing_service import ServerTimingMiddleware, read_profile
+from app.services.upload_service import UploadLimitMiddleware, MULTIPART_OVERHEAD
+from ai.instrumentation import enable_engine_timing
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -16,6 +31,18 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# ==========================================
+# Upload Limits
+# ==========================================
+# Oversized OCR uploads are refused before the body is read/spooled;
+# added before CORS (the last middleware added runs outermost) so the
+# 413 responses still carry CORS headers
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_body=settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+    path_prefix="/api/ocr"
+)
+
 # ==========================================
 # CORS Configuration
 # ==========================================
@@ -35,13 +62,36 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# ==========================================
+# Metrics
+# ==========================================
+# Per-route latency and in-flight requests, served at /metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# ==========================================
+# Server-Timing / Profiling
+# ==========================================
+# Stage durations in a Server-Timing header; with PROFILING_ENABLED a
+# request carrying the X-Profile header is profiled (see /debug/profiles)
+if settings.SERVER_TIMING_ENABLED or settings.PROFILING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
 # ==========================================
 # Include Routers
 # ==========================================
 app.include_router(predict.router, prefix="/api")
-app.include_router(ocr.router, prefix="/api")
 app.include_router(diseases.router, prefix="/api")
 
+# OCR router only in processes that serve OCR (prediction-only pools set
+# OCR_ENABLED=false); the OCR services, job store and result cache are
+# then never imported or created
+if settings.OCR_ENABLED:
+    from app.routers import ocr
+    from app.services.ocr_service import get_ocr_cache_status, get_reader_pool_status
+    from app.services.ocr_job_service import get_ocr_job_status, stop_ocr_jobs
+    app.include_router(ocr.router, prefix="/api")
+
 # ==========================================
 # Health Check Endpoint
 # ==========================================
@@ -50,11 +100,38 @@ def health_check():
     """
     Health check endpoint to verify API is running
     """
-    return {
+    health = {
         "status": "healthy",
         "service": "Genetic Risk Coach API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "knowledge_base": get_knowledge_base_status(),
+        "ocr_enabled": settings.OCR_ENABLED
     }
+    if settings.OCR_ENABLED:
+        health["ocr_readers"] = get_reader_pool_status()
+        health["ocr_cache"] = get_ocr_cache_status()
+        health["ocr_jobs"] = get_ocr_job_status()
+    health["executors"] = get_executor_status()
+    health["prediction_cache"] = get_cache_status()
+    health["coalescing"] = get_coalescing_status()
+    return health
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    """
+    Prometheus metrics for this worker process
+    """
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/debug/profiles/{profile_id}", tags=["Health"], include_in_schema=False)
+def get_profile(profile_id: str):
+    """
+    Top functions by cumulative time for a profiled request (X-Profile-Id)
+    """
+    report = read_profile(profile_id) if settings.PROFILING_ENABLED else None
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(report)
 
 @app.get("/", tags=["Root"])
 def root():
@@ -65,7 +142,8 @@ def root():
         "message": "Genetic Risk Coach API",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics"
     }
 
 # ==========================================
@@ -77,6 +155,13 @@ async def startup_event():
     Run on application startup
     """
     print("🚀 Genetic Risk Coach API starting up...")
+    kb = start_knowledge_base()
+    print(f"🧠 Knowledge base loaded: version {kb.version}")
+    enable_engine_timing(settings.ENGINE_TIMING_ENABLED)
+    if settings.OCR_ENABLED and settings.OCR_WARMUP:
+        # Load easyocr + model in the OCR pool without delaying startup
+        from app.services.ocr_service import warmup_ocr
+        asyncio.ensure_future(warmup_ocr())
     print("📚 API documentation available at: http://localhost:8000/docs")
     print("❤️  Health check available at: http://localhost:8000/health")
 
@@ -88,6 +173,10 @@ async def shutdown_event():
     """
     Run on application shutdown
     """
+    stop_knowledge_base()
+    if settings.OCR_ENABLED:
+        await stop_ocr_jobs()
+    shutdown_executors()
     print("👋 Genetic Risk Coach API shutting down...")
 
 # ==========================================
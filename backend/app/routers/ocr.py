@@ -1,15 +1,56 @@
-from fastapi import APIRouter, UploadFile, File
-from app.schemas.lab_values import LabValues
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request, Response
+from app.schemas.lab_values import LabValuesWithReadings
+from app.schemas.ocr_job import OCRJob
 from app.services.ocr_service import extract_lab_values_from_file
+from app.services.ocr_job_service import get_ocr_jobs
+from app.services.upload_service import read_upload
+from app.services.timing_service import mark_timing
 
 router = APIRouter(prefix="/ocr", tags=["OCR"])
 
-@router.post("/", response_model=LabValues)
-async def extract_lab_values(file: UploadFile = File(...)):
+@router.post("/", response_model=LabValuesWithReadings)
+async def extract_lab_values(
+    file: UploadFile = File(...),
+    budget_ms: Optional[int] = Query(None, gt=0, description="Return the best values found within this time"),
+    include_readings: bool = Query(False, description="Also return unit, confidence and source per value")
+):
     """
     Extract lab values from uploaded medical report image/PDF
     
     Accepts: PDF, PNG, JPG, JPEG files
-    Returns: Extracted lab values
+    Returns: Extracted lab values; with include_readings=true also
+    "readings" (unit, OCR confidence and source per value, as OCR jobs
+    return them) - otherwise readings is null
     """
-    return await extract_lab_values_from_file(file)
+    mark_timing("handler_start")
+    budget = budget_ms / 1000 if budget_ms is not None else None
+    lab_values = await extract_lab_values_from_file(file, budget, include_readings)
+    mark_timing("handler_end")
+    return lab_values
+
+
+@router.post("/jobs", response_model=OCRJob, status_code=202)
+async def create_ocr_job(request: Request, response: Response, file: UploadFile = File(...)):
+    """
+    Queue a medical report for OCR and return a job at once
+    
+    Poll GET /api/ocr/jobs/{job_id} until status is "done" (lab_values
+    set) or "failed" (error set). Returns 413/415 for oversized or
+    unsupported files and 503 when the job queue is full.
+    """
+    content, content_type = await read_upload(file)
+    job = await get_ocr_jobs().submit(content, content_type)
+    response.headers["Location"] = str(request.url_for("get_ocr_job", job_id=job.job_id).path)
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=OCRJob)
+async def get_ocr_job(job_id: str):
+    """
+    Status of an OCR job, with the extracted lab values once done
+    """
+    job = await get_ocr_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"OCR job '{job_id}' not found or expired")
+    return job
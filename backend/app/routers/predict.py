@@ -1,9 +1,63 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from app.config import settings
 from app.schemas.prediction import RiskRequest, RiskResponse
-from app.services.prediction_service import predict_risk
+from app.services.prediction_service import (
+    predict_risk_async, predict_risk_batch, read_batch_body, get_knowledge_base
+)
+from app.services.execution_service import prediction_executor
+from app.services.serialization_service import JSON_MEDIA_TYPE
+from app.services.timing_service import mark_timing
 
 router = APIRouter(prefix="/predict-risk", tags=["Prediction"])
 
 @router.post("/", response_model=RiskResponse)
-def predict_risk_api(payload: RiskRequest):
-    return predict_risk(payload)
+async def predict_risk_api(payload: RiskRequest):
+    # Rule engine runs on the bounded prediction pool (503 when saturated);
+    # identical in-flight requests share one computation
+    mark_timing("handler_start")
+    if settings.FAST_SERIALIZATION:
+        # Engine output rendered to bytes in the worker - skips response_model re-validation
+        content = await predict_risk_async(payload, render=True)
+        mark_timing("handler_end")
+        return Response(content=content, media_type=JSON_MEDIA_TYPE)
+    response = await predict_risk_async(payload)
+    mark_timing("handler_end")
+    return response
+
+
+@router.post("/batch")
+async def predict_risk_batch_api(request: Request):
+    """
+    Score many patients in one call
+
+    Body is a JSON array of RiskRequest objects, or NDJSON (one per line,
+    Content-Type: application/x-ndjson). Responds with NDJSON in input
+    order: a RiskResponse plus "index" per item, or
+    {"index", "success": false, "error"} for items that failed.
+    413 past BATCH_MAX_BODY_BYTES or BATCH_MAX_ITEMS - NDJSON bodies are
+    read line by line and refused at the first item over the limit.
+    """
+    mark_timing("handler_start")
+    try:
+        items = await read_batch_body(request.stream(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+
+    # One snapshot for the whole batch, even if the knowledge base reloads mid-stream
+    kb = get_knowledge_base()
+
+    def stream():
+        for result in predict_risk_batch(items, kb, render=settings.FAST_SERIALIZATION):
+            line = result if isinstance(result, bytes) else result.json().encode("utf-8")
+            yield line + b"\n"
+
+    # Admitted as one task up front so a full queue still gets a clean 503
+    return StreamingResponse(
+        prediction_executor.iterate(stream()),
+        media_type="application/x-ndjson",
+        headers={"X-KB-Version": kb.version}
+    )
@@ -1,5 +1,13 @@
-from pydantic import BaseModel
-from typing import Optional
+import sys
+from pathlib import Path
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, Optional
+
+# Repository root, so the shared ai package is importable
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(BASE_DIR))
+
+from ai.risk.scoring_rules import normalize_lab_key
 
 class LabValues(BaseModel):
     hba1c: Optional[float] = None
@@ -17,4 +25,27 @@ class LabValues(BaseModel):
     hemoglobin: Optional[float] = None
     rbc: Optional[float] = None
     mcv: Optional[float] = None
-    mch: Optional[float] = None
\ No newline at end of file
+    mch: Optional[float] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def canonical_keys(cls, data):
+        """Accept lab name variants ("LDL-C", "fasting_blood_sugar") as field names; exact names win"""
+        if not isinstance(data, dict):
+            return data
+        fields = {key: value for key, value in data.items() if key in cls.model_fields}
+        for key, value in data.items():
+            if key not in cls.model_fields:
+                fields.setdefault(normalize_lab_key(key), value)
+        return fields
+
+class LabReading(BaseModel):
+    """One lab value as read from a report"""
+    value: float
+    unit: Optional[str] = None  # As printed, e.g. "mg/dL"
+    confidence: Optional[float] = None  # OCR confidence 0-1 (None for embedded PDF text)
+    source: str = Field(..., description="layout (paired on a table row) or text (regex over the page text)")
+
+class LabValuesWithReadings(LabValues):
+    """LabValues plus, when requested, the unit and confidence behind each value"""
+    readings: Optional[Dict[str, LabReading]] = None  # Per extracted lab_values field
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from app.schemas.lab_values import LabReading, LabValues
+
+
+class OCRJob(BaseModel):
+    """Status of an asynchronous OCR job (POST /api/ocr/jobs)"""
+    job_id: str
+    status: str = Field(..., description="queued, running, done or failed")
+    created_at: float  # Unix time
+    updated_at: float  # Unix time
+    lab_values: Optional[LabValues] = None  # Set once status is "done"
+    readings: Optional[Dict[str, LabReading]] = None  # Unit/confidence per lab_values field, once "done"
+    error: Optional[str] = None  # Set once status is "failed"
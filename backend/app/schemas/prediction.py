@@ -41,4 +41,17 @@ class DiseaseRiskResult(BaseModel):
 class RiskResponse(BaseModel):
     """Response from prediction endpoint"""
     success: bool = True
-    results: List[DiseaseRiskResult]
\ No newline at end of file
+    results: List[DiseaseRiskResult]
+    kb_version: Optional[str] = None  # Knowledge base snapshot that produced the results
+
+
+class BatchRiskItem(RiskResponse):
+    """One scored item in a batch response (NDJSON line)"""
+    index: int  # Position of the item in the request batch
+
+
+class BatchRiskError(BaseModel):
+    """One failed item in a batch response (NDJSON line)"""
+    index: int
+    success: bool = False
+    error: str
@@ -0,0 +1,312 @@
+"""
+Prediction result cache
+Canonical request hashing plus pluggable LRU/TTL backends (in-process or
+SQLite shared by every worker on the host)
+"""
+
+import hashlib
+import json
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+import sys
+from typing import Any, Dict, Optional, Type, Union
+
+from pydantic import BaseModel
+
+# Repository root, so the shared ai package is importable
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(BASE_DIR))
+
+from ai.risk.scoring_rules import normalize_lab_key
+from app.config import settings
+from app.schemas.prediction import RiskResponse
+
+# Seconds between accessed_at updates for the same SQLite entry
+ACCESS_RESOLUTION = 1.0
+
+# -------------------- CANONICAL KEYS --------------------
+
+def _drop_none(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in data.items() if v is not None}
+
+
+def canonicalize_request(payload) -> Dict[str, Any]:
+    """
+    Reduce a RiskRequest to a canonical dict for hashing
+
+    None fields are dropped, lab keys normalized, issue lists and family
+    members sorted. lab_values stays None vs {} because the engine weighs
+    "labs submitted" differently from "no labs". Requests that differ only
+    in family order share an entry, so a hit may name relatives in the
+    order of the first request.
+    """
+    patient = _drop_none(payload.patient.dict())
+    if patient.get("known_issues"):
+        patient["known_issues"] = sorted(patient["known_issues"])
+
+    family = []
+    for member in payload.family:
+        member = _drop_none(member.dict())
+        member["known_issues"] = sorted(member.get("known_issues", []))
+        family.append(member)
+    family.sort(key=lambda m: json.dumps(m, sort_keys=True))
+
+    lab_values = None
+    if payload.lab_values is not None:
+        lab_values = {
+            normalize_lab_key(k): v for k, v in payload.lab_values.dict().items() if v is not None
+        }
+
+    return {
+        "patient": patient,
+        "lifestyle": _drop_none(payload.lifestyle.dict()),
+        "family": family,
+        "lab_values": lab_values
+    }
+
+
+def request_cache_key(payload, kb_version: str) -> str:
+    """sha256 of the canonical request plus the knowledge base version"""
+    canonical = json.dumps(canonicalize_request(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{kb_version}\n{canonical}".encode()).hexdigest()
+
+
+# -------------------- BACKENDS --------------------
+
+CacheValue = Union[BaseModel, bytes]
+
+
+def _serialize(value: CacheValue) -> Union[str, bytes]:
+    return value if isinstance(value, bytes) else value.json()
+
+
+class CacheBackend(ABC):
+    """
+    Interface for result caches
+
+    Values are Pydantic models of the given type, or rendered JSON bytes
+    when model is None (FAST_SERIALIZATION). Entries expire after ttl
+    seconds; the least recently used entries are evicted once max_entries
+    or max_bytes (of serialized JSON) is exceeded.
+    """
+
+    def __init__(self, model: Optional[Type[BaseModel]], ttl: float, max_entries: int, max_bytes: int):
+        self.model = model
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheValue]:
+        """Stored value, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: CacheValue) -> None:
+        """Store value, evicting least recently used entries past the limits"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry"""
+
+    @abstractmethod
+    def size(self) -> Dict[str, int]:
+        """{'entries': n, 'bytes': n} currently stored"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters (since this process started) plus current size"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            **self.size()
+        }
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU (per uvicorn worker)
+
+    Stores the model objects themselves, so a hit costs no parsing.
+    Callers must treat returned objects as read-only.
+    """
+
+    def __init__(self, model: Optional[Type[BaseModel]], ttl: float, max_entries: int, max_bytes: int):
+        super().__init__(model, ttl, max_entries, max_bytes)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: CacheValue) -> None:
+        size = len(_serialize(value))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key)[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class SQLiteCache(CacheBackend):
+    """
+    LRU in a SQLite file, shared by all worker processes on the host
+
+    Uses WAL mode and one connection per thread. Hit/miss/eviction
+    counters are per process.
+    """
+
+    def __init__(self, path: str, model: Optional[Type[BaseModel]], ttl: float, max_entries: int, max_bytes: int):
+        super().__init__(model, ttl, max_entries, max_bytes)
+        self.path = str(path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, accessed_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # LRU order only needs coarse timestamps - skip the write for hot keys
+        if now - row[1] > ACCESS_RESOLUTION:
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        if self.model is None:
+            return row[0] if isinstance(row[0], bytes) else row[0].encode("utf-8")
+        return self.model.model_validate_json(row[0])
+
+    def set(self, key: str, value: CacheValue) -> None:
+        data = _serialize(value)
+        if len(data) > self.max_bytes:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now + self.ttl, now)
+            )
+            evicted = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+            evicted += self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.evictions += evicted
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Delete least recently used rows until both caps hold"""
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        evicted = 0
+        while entries > self.max_entries or total > self.max_bytes:
+            batch = max(entries - self.max_entries, 1)
+            rows = conn.execute(
+                "SELECT key, size FROM cache ORDER BY accessed_at LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k, _ in rows])
+            entries -= len(rows)
+            total -= sum(size for _, size in rows)
+            evicted += len(rows)
+        return evicted
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM cache")
+
+    def size(self) -> Dict[str, int]:
+        entries, total = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+        return {"entries": entries, "bytes": total}
+
+
+# -------------------- SHARED INSTANCE --------------------
+
+def create_cache(backend: str, model: Optional[Type[BaseModel]]) -> Optional[CacheBackend]:
+    """Build the configured backend ('memory', 'sqlite' or 'none'); model None caches JSON bytes"""
+    limits = dict(
+        model=model,
+        ttl=settings.PREDICT_CACHE_TTL,
+        max_entries=settings.PREDICT_CACHE_MAX_ENTRIES,
+        max_bytes=settings.PREDICT_CACHE_MAX_BYTES
+    )
+    if backend == "memory":
+        return MemoryCache(**limits)
+    if backend == "sqlite":
+        return SQLiteCache(settings.PREDICT_CACHE_PATH, **limits)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown PREDICT_CACHE_BACKEND '{backend}'")
+
+
+prediction_cache: Optional[CacheBackend] = create_cache(
+    settings.PREDICT_CACHE_BACKEND,
+    None if settings.FAST_SERIALIZATION else RiskResponse
+)
+
+
+def get_cache_status() -> Dict[str, Any]:
+    """Prediction cache counters for health checks / metrics"""
+    if prediction_cache is None:
+        return {"backend": None}
+    return prediction_cache.stats()
@@ -0,0 +1,76 @@
+"""
+Request coalescing (single-flight)
+Identical concurrent requests share one computation instead of each
+doing the full prediction or OCR work
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent async work by key
+
+    The first caller for a key (the leader) starts the work; callers that
+    arrive while it is running (followers) await the same result. The
+    work runs as its own task, so a leader whose client disconnects does
+    not cancel it for the followers. Errors propagate to every waiter.
+
+    Usage:
+        flights = SingleFlight("ocr")
+        text = await flights.do(content_hash, lambda: run_ocr(content))
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run work() once per key at a time and share its result
+
+        Args:
+            key: Canonical request or content hash
+            work: Zero-argument callable returning an awaitable
+        """
+        with self._lock:
+            task = self._inflight.get(key)
+            if task is None or task.get_loop() is not asyncio.get_running_loop():
+                task = asyncio.ensure_future(work())
+                self._inflight[key] = task
+                task.add_done_callback(lambda t, key=key: self._forget(key, t))
+                self.leaders += 1
+            else:
+                self.followers += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved when every waiter has gone away
+            task.exception()
+
+    def status(self) -> Dict[str, int]:
+        """In-flight keys and leader/follower counters"""
+        with self._lock:
+            return {
+                "inflight": len(self._inflight),
+                "leaders": self.leaders,
+                "coalesced": self.followers
+            }
+
+
+prediction_flights = SingleFlight("predict")
+ocr_flights = SingleFlight("ocr")
+
+
+def get_coalescing_status() -> Dict[str, Dict[str, int]]:
+    """Status of every shared single-flight group"""
+    return {flights.name: flights.status() for flights in (prediction_flights, ocr_flights)}
@@ -1,7 +1,11 @@
-import json
 from pathlib import Path
+import sys
 
-DISEASE_FILE = Path(__file__).resolve().parents[3] / "ai" / "data" / "diseases_config.json"
+# Repository root, so the shared ai package is importable
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(BASE_DIR))
+
+from ai.knowledge_base import get_knowledge_base
 
 
 def get_disease_list():
@@ -14,11 +18,8 @@ def get_disease_list():
         ...
     ]
     """
-    with open(DISEASE_FILE, "r") as f:
-        data = json.load(f)
-    
-    diseases = data.get("diseases", [])
-    result = [{"id": d["id"], "name": d["name"]} for d in diseases if "id" in d and "name" in d]
+    diseases = get_knowledge_base().diseases
+    result = [{"id": d["id"], "name": d["name"]} for d in diseases]
     return result
 
 
@@ -33,13 +34,4 @@ def get_disease_by_id(disease_id: str):
     Returns:
         Disease dict or None if not found
     """
-    with open(DISEASE_FILE, "r") as f:
-        data = json.load(f)
-    
-    diseases = data.get("diseases", [])
-    
-    for disease in diseases:
-        if disease.get("id") == disease_id:
-            return disease
-    
-    return None
\ No newline at end of file
+    return get_knowledge_base().get_disease(disease_id)
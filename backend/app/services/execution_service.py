@@ -0,0 +1,259 @@
+"""
+Bounded execution layer
+Runs CPU-bound work (rule engine, OCR) off the event loop with a cap on
+concurrency and queue length, and fails fast with 503 when saturated
+"""
+
+import asyncio
+import cProfile
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.timing_service import current_request_timings
+
+
+class ServiceBusyError(HTTPException):
+    """Raised when an executor's wait queue is full (503 + Retry-After)"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"Server busy ({name}), retry in {retry_after}s",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with admission control
+
+    At most max_concurrency tasks run at once and at most max_queue more
+    wait for a slot. Anything beyond that is rejected immediately with
+    ServiceBusyError instead of piling up behind slow work.
+
+    Usage:
+        executor = BoundedExecutor("predict", max_concurrency=4, max_queue=64)
+        result = await executor.run(predict_risk, payload)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        kind: str = "thread",
+        retry_after: int = 5
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}'")
+        self.name = name
+        self.kind = kind
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._pool: Optional[Executor] = None
+
+    # -------------------- ADMISSION --------------------
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._admitted >= self.max_concurrency + self.max_queue:
+                self._rejected += 1
+                raise ServiceBusyError(self.name, self.retry_after)
+            self._admitted += 1
+
+    def saturated(self) -> bool:
+        """Whether run() would be refused with ServiceBusyError right now"""
+        with self._lock:
+            return self._admitted >= self.max_concurrency + self.max_queue
+
+    def _release(self, _future: Any = None) -> None:
+        with self._lock:
+            self._admitted -= 1
+            self._completed += 1
+
+    # -------------------- EXECUTION --------------------
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._create_pool()
+        return self._pool
+
+    def _create_pool(self) -> Executor:
+        if self.kind == "process":
+            # spawn: forking a process that already holds torch/threads is unsafe
+            return ProcessPoolExecutor(
+                max_workers=self.max_concurrency,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=self.name)
+
+    def _submit(self, fn: Callable, *args: Any) -> Future:
+        try:
+            if self.kind == "thread":
+                # Carry the request context (Server-Timing, profiling) into the worker thread
+                return self._get_pool().submit(contextvars.copy_context().run, self._track(fn), *args)
+            return self._get_pool().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM in OCR) - replace the pool once and retry
+            with self._lock:
+                self._pool = self._create_pool()
+            return self._pool.submit(fn, *args)
+
+    def _track(self, fn: Callable) -> Callable:
+        """Wrap a thread task so `running` reflects tasks actually executing"""
+        def tracked(*args: Any) -> Any:
+            with self._lock:
+                self._running += 1
+            try:
+                timings = current_request_timings()
+                if timings is None or not timings.profile:
+                    return fn(*args)
+                # cProfile only sees its own thread - profile here and hand it back
+                profiler = cProfile.Profile()
+                try:
+                    return profiler.runcall(fn, *args)
+                finally:
+                    timings.profiles.append(profiler)
+            finally:
+                with self._lock:
+                    self._running -= 1
+        return tracked
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """
+        Run fn(*args) in the pool and await the result
+
+        Raises:
+            ServiceBusyError: If the wait queue is full
+        """
+        self._acquire()
+        try:
+            future = self._submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def iterate(self, iterator: Iterator) -> AsyncIterator:
+        """
+        Admit a long-running iteration as one task and step it in the pool
+
+        Admission is checked here, before the caller starts responding,
+        so a full queue still turns into a clean 503. Thread pools only.
+
+        Raises:
+            ServiceBusyError: If the wait queue is full
+        """
+        if self.kind != "thread":
+            raise ValueError("iterate() needs a thread executor")
+        self._acquire()
+        return _SteppedIterator(self, iterator)
+
+    # -------------------- LIFECYCLE --------------------
+
+    def status(self) -> Dict[str, Any]:
+        """Queue depth and counters for health checks / metrics"""
+        with self._lock:
+            running = self._running if self.kind == "thread" else min(self._admitted, self.max_concurrency)
+            return {
+                "kind": self.kind,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "running": running,
+                "queued": self._admitted - running,
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self) -> None:
+        """Stop the pool, cancelling work that has not started"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _SteppedIterator:
+    """Async view of a sync iterator; releases its executor slot exactly once"""
+
+    _DONE = object()
+
+    def __init__(self, executor: BoundedExecutor, iterator: Iterator):
+        self._executor = executor
+        self._iterator = iterator
+        self._released = False
+
+    def __aiter__(self) -> "_SteppedIterator":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._released:
+            raise StopAsyncIteration
+        try:
+            item = await asyncio.wrap_future(self._executor._submit(next, self._iterator, self._DONE))
+        except BaseException:
+            self._release()
+            raise
+        if item is self._DONE:
+            self._release()
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._executor._release()
+
+    def __del__(self) -> None:
+        # Response never iterated (client gone before streaming started)
+        self._release()
+
+
+# -------------------- SHARED EXECUTORS --------------------
+
+prediction_executor = BoundedExecutor(
+    "predict",
+    max_concurrency=settings.PREDICT_MAX_CONCURRENCY,
+    max_queue=settings.PREDICT_MAX_QUEUE,
+    kind="thread",
+    retry_after=settings.BUSY_RETRY_AFTER
+)
+
+ocr_executor = BoundedExecutor(
+    "ocr",
+    max_concurrency=settings.OCR_MAX_CONCURRENCY,
+    max_queue=settings.OCR_MAX_QUEUE,
+    kind=settings.OCR_EXECUTOR,
+    retry_after=settings.BUSY_RETRY_AFTER
+)
+
+
+def get_executor_status() -> Dict[str, Dict[str, Any]]:
+    """Status of every shared executor"""
+    return {executor.name: executor.status() for executor in (prediction_executor, ocr_executor)}
+
+
+def shutdown_executors() -> None:
+    """Stop all shared executors (application shutdown)"""
+    prediction_executor.shutdown()
+    ocr_executor.shutdown()
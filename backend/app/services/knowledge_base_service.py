@@ -0,0 +1,46 @@
+"""
+Knowledge base lifecycle for the API process
+Starts/stops the hot-reload watcher and reports the active version
+"""
+
+from pathlib import Path
+import sys
+from typing import Optional
+
+# Repository root, so the shared ai package is importable
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(BASE_DIR))
+
+from ai.knowledge_base import KnowledgeBaseWatcher, get_knowledge_base
+from app.config import settings
+
+_watcher: Optional[KnowledgeBaseWatcher] = None
+
+
+def start_knowledge_base():
+    """Load the knowledge base and, if enabled, start watching ai/data"""
+    global _watcher
+    kb = get_knowledge_base()
+    
+    if settings.KB_RELOAD_ENABLED and _watcher is None:
+        _watcher = KnowledgeBaseWatcher(interval=settings.KB_RELOAD_INTERVAL)
+        _watcher.start()
+    
+    return kb
+
+
+def stop_knowledge_base():
+    """Stop the hot-reload watcher"""
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
+
+
+def get_knowledge_base_status() -> dict:
+    """Active version plus the last reload error (if any)"""
+    return {
+        "version": get_knowledge_base().version,
+        "hot_reload": _watcher is not None,
+        "last_reload_error": _watcher.last_error if _watcher else None
+    }
@@ -0,0 +1,204 @@
+"""
+Prometheus metrics
+Route latency middleware plus a text-format renderer for engine stage
+timings, executors, the prediction and OCR caches, coalescing counters
+and OCR reader pools
+"""
+
+import threading
+from pathlib import Path
+import sys
+from time import perf_counter
+from typing import Dict, Iterable, List, Tuple
+
+# Repository root, so the shared ai package is importable
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(BASE_DIR))
+
+from ai.instrumentation import ENGINE_TIMINGS, Histogram
+from ai.knowledge_base import get_knowledge_base
+from app.services.cache_service import get_cache_status
+from app.services.coalescing_service import get_coalescing_status
+from app.config import settings
+from app.services.execution_service import get_executor_status
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds for HTTP latency (OCR can take several seconds)
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class RouteMetrics:
+    """Latency histograms per (method, route, status) and an in-flight gauge"""
+
+    def __init__(self, buckets: Iterable[float] = HTTP_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, str(status))
+        histogram = self.latency.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.latency.setdefault(key, Histogram(self.buckets))
+        histogram.observe(seconds)
+
+
+ROUTE_METRICS = RouteMetrics()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and in-flight requests
+
+    Routes are labelled by their template (e.g. /api/disease-info/{disease_id})
+    so label cardinality stays bounded; unmatched paths share one label.
+    Streaming responses are timed until the last chunk is sent.
+    """
+
+    def __init__(self, app, metrics: RouteMetrics = ROUTE_METRICS):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with self.metrics._lock:
+            self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            with self.metrics._lock:
+                self.metrics.in_flight -= 1
+            self.metrics.observe(scope["method"], route_label(scope), status, perf_counter() - start)
+
+
+def route_label(scope) -> str:
+    """
+    Route template for a handled request, e.g. /api/disease-info/{disease_id}
+
+    Newer FastAPI versions report included routes without the include
+    prefix, so the prefix is rebuilt from the request path (each template
+    segment matches exactly one path segment).
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    parts = scope["path"].rstrip("/").split("/")
+    depth = template.rstrip("/").count("/")
+    prefix = "/".join(parts[:len(parts) - depth]) if len(parts) > depth else ""
+    return prefix + template
+
+
+# -------------------- EXPOSITION --------------------
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+def _header(lines: List[str], name: str, kind: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram(lines: List[str], name: str, labels: Dict[str, str], histogram: Histogram) -> None:
+    buckets, total, count = histogram.snapshot()
+    for bound, cumulative in buckets:
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': _bound(bound)})} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labels)} {total!r}")
+    lines.append(f"{name}_count{_labels(labels)} {count}")
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format (this worker only)"""
+    lines: List[str] = []
+
+    _header(lines, "http_request_duration_seconds", "histogram", "HTTP request latency by route")
+    for (method, route, status), histogram in sorted(ROUTE_METRICS.latency.items()):
+        _histogram(lines, "http_request_duration_seconds",
+                   {"method": method, "route": route, "status": status}, histogram)
+
+    _header(lines, "http_requests_in_flight", "gauge", "Requests currently being served")
+    lines.append(f"http_requests_in_flight {ROUTE_METRICS.in_flight}")
+
+    _header(lines, "risk_engine_predict_seconds", "histogram", "predict_risks wall time per call")
+    _histogram(lines, "risk_engine_predict_seconds", {}, ENGINE_TIMINGS.calls)
+
+    _header(lines, "risk_engine_stage_seconds", "histogram", "predict_risks time per stage and disease")
+    for (stage, disease), histogram in sorted(ENGINE_TIMINGS.stages.items()):
+        _histogram(lines, "risk_engine_stage_seconds", {"stage": stage, "disease": disease}, histogram)
+
+    executors = get_executor_status()
+    for field, kind, help_text in (
+        ("running", "gauge", "Tasks executing in the pool"),
+        ("queued", "gauge", "Tasks waiting for a pool slot (queue depth)"),
+        ("completed", "counter", "Tasks finished"),
+        ("rejected", "counter", "Tasks rejected with 503 because the queue was full"),
+    ):
+        name = f"executor_{field}" + ("_total" if kind == "counter" else "")
+        _header(lines, name, kind, help_text)
+        for executor, status in executors.items():
+            lines.append(f"{name}{_labels({'executor': executor})} {status[field]}")
+
+    caches = [("prediction_cache", "Prediction cache", get_cache_status())]
+    readers: Dict[str, dict] = {}
+    if settings.OCR_ENABLED:
+        # Imported here so prediction-only processes never load the OCR services
+        from app.services.ocr_service import get_ocr_cache_status, get_reader_pool_status
+        caches.append(("ocr_cache", "OCR result cache", get_ocr_cache_status()))
+        readers = get_reader_pool_status()
+
+    for prefix, title, cache in caches:
+        if not cache.get("backend"):
+            continue
+        for field, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                            ("entries", "gauge"), ("bytes", "gauge")):
+            name = f"{prefix}_{field}" + ("_total" if kind == "counter" else "")
+            _header(lines, name, kind, f"{title} {field}")
+            lines.append(f"{name}{_labels({'backend': cache['backend']})} {cache[field]}")
+
+    coalescing = get_coalescing_status()
+    for field, name, kind in (("inflight", "coalescing_inflight", "gauge"),
+                              ("leaders", "coalescing_leaders_total", "counter"),
+                              ("coalesced", "coalescing_followers_total", "counter")):
+        _header(lines, name, kind, f"Single-flight {field} per group")
+        for group, status in coalescing.items():
+            lines.append(f"{name}{_labels({'group': group})} {status[field]}")
+
+    for field, name, kind in (("readers", "ocr_readers", "gauge"),
+                              ("in_use", "ocr_readers_in_use", "gauge"),
+                              ("loads", "ocr_reader_loads_total", "counter"),
+                              ("evictions", "ocr_reader_evictions_total", "counter"),
+                              ("waits", "ocr_reader_waits_total", "counter"),
+                              ("wait_seconds", "ocr_reader_wait_seconds_total", "counter")):
+        _header(lines, name, kind, f"OCR reader pool {field} per worker process (as of its last task)")
+        for pid, status in readers.items():
+            lines.append(f"{name}{_labels({'pid': pid})} {status[field]}")
+
+    _header(lines, "knowledge_base_info", "gauge", "Active knowledge base version")
+    lines.append(f"knowledge_base_info{_labels({'version': get_knowledge_base().version})} 1")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,334 @@
+"""
+Asynchronous OCR jobs
+Uploads are queued and processed in the background; clients poll the
+job for status and the extracted lab values
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.schemas.ocr_job import OCRJob
+from app.schemas.lab_values import LabValues
+from app.services.execution_service import ServiceBusyError, ocr_executor
+from app.services.ocr_service import process_upload, to_lab_values
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# -------------------- JOB STORES --------------------
+
+class JobStore(ABC):
+    """
+    Interface for OCR job stores
+
+    A job expires ttl seconds after its last update; expired jobs are
+    purged whenever a new job is created.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    @abstractmethod
+    def create(self) -> OCRJob:
+        """Store and return a new queued job"""
+
+    @abstractmethod
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        lab_values: Optional[LabValues] = None,
+        error: Optional[str] = None,
+        readings: Optional[dict] = None
+    ) -> None:
+        """Replace a job's status and result (unknown ids are ignored)"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        """The job, or None if it is unknown or expired"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Unexpired jobs per status"""
+
+
+class MemoryJobStore(JobStore):
+    """In-process store (jobs are only visible to the worker that accepted them)"""
+
+    def __init__(self, ttl: float):
+        super().__init__(ttl)
+        self._jobs: Dict[str, OCRJob] = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> OCRJob:
+        now = time.time()
+        job = OCRJob(job_id=uuid.uuid4().hex, status=QUEUED, created_at=now, updated_at=now)
+        with self._lock:
+            self._jobs = {k: v for k, v in self._jobs.items() if v.updated_at + self.ttl > now}
+            self._jobs[job.job_id] = job
+        return job
+
+    def update(self, job_id, status, lab_values=None, error=None, readings=None) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs[job_id] = job.model_validate({
+                    **job.model_dump(), "status": status, "updated_at": time.time(),
+                    "lab_values": lab_values, "error": error, "readings": readings
+                })
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.updated_at + self.ttl <= time.time():
+            return None
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        now = time.time()
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for job in self._jobs.values():
+                if job.updated_at + self.ttl > now:
+                    counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Jobs in a SQLite file, so any worker process on the host can answer polls
+
+    Uses WAL mode and one connection per thread. A job is processed by the
+    process that accepted it; if that process dies, the job stays in its
+    last state until it expires.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        super().__init__(ttl)
+        self.path = str(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL, expires_at REAL NOT NULL, lab_values TEXT, error TEXT, readings TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ocr_jobs)")}
+            if "readings" not in columns:
+                # Job file created before readings were stored
+                conn.execute("ALTER TABLE ocr_jobs ADD COLUMN readings TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS ocr_jobs_expires ON ocr_jobs (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self) -> OCRJob:
+        now = time.time()
+        job = OCRJob(job_id=uuid.uuid4().hex, status=QUEUED, created_at=now, updated_at=now)
+        conn = self._connect()
+        conn.execute("DELETE FROM ocr_jobs WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "INSERT INTO ocr_jobs (job_id, status, created_at, updated_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (job.job_id, job.status, now, now, now + self.ttl)
+        )
+        return job
+
+    def update(self, job_id, status, lab_values=None, error=None, readings=None) -> None:
+        now = time.time()
+        self._connect().execute(
+            "UPDATE ocr_jobs SET status = ?, updated_at = ?, expires_at = ?, lab_values = ?, error = ?, "
+            "readings = ? WHERE job_id = ?",
+            (status, now, now + self.ttl, lab_values.json() if lab_values else None, error,
+             json.dumps(readings) if readings is not None else None, job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        row = self._connect().execute(
+            "SELECT job_id, status, created_at, updated_at, lab_values, error, readings FROM ocr_jobs "
+            "WHERE job_id = ? AND expires_at > ?", (job_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return OCRJob(
+            job_id=row[0], status=row[1], created_at=row[2], updated_at=row[3],
+            lab_values=LabValues.model_validate_json(row[4]) if row[4] else None,
+            error=row[5],
+            readings=json.loads(row[6]) if row[6] else None
+        )
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) FROM ocr_jobs WHERE expires_at > ? GROUP BY status", (time.time(),)
+        ).fetchall()
+        return dict(rows)
+
+
+def create_job_store(backend: str) -> JobStore:
+    """Build the configured store ('sqlite' or 'memory')"""
+    if backend == "sqlite":
+        return SQLiteJobStore(settings.OCR_JOB_PATH, settings.OCR_JOB_TTL)
+    if backend == "memory":
+        return MemoryJobStore(settings.OCR_JOB_TTL)
+    raise ValueError(f"Unknown OCR_JOB_STORE '{backend}'")
+
+
+# -------------------- QUEUE --------------------
+
+class OCRJobQueue:
+    """
+    Bounded in-process queue drained by a few background tasks
+
+    Each task runs one job at a time through the OCR pool, so a burst of
+    uploads waits in the queue instead of holding connections open. While
+    the OCR pool is saturated (synchronous /api/ocr traffic) the job stays
+    queued and retries; after OCR_JOB_BUSY_TIMEOUT seconds without a slot
+    it fails. A full queue rejects new jobs with 503.
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_queue: int):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First job on this event loop - start the background tasks
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [loop.create_task(self._run()) for _ in range(self.workers)]
+        return self._queue
+
+    async def submit(self, content: bytes, content_type: str) -> OCRJob:
+        """
+        Store a queued job and enqueue the upload
+
+        Raises:
+            ServiceBusyError: If the job queue is full
+        """
+        queue = self._ensure_started()
+        if queue.full():
+            self.rejected += 1
+            raise ServiceBusyError("ocr-jobs", settings.BUSY_RETRY_AFTER)
+        job = await asyncio.to_thread(self.store.create)
+        queue.put_nowait((job.job_id, content, content_type))
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[OCRJob]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _run(self) -> None:
+        while True:
+            job_id, content, content_type = await self._queue.get()
+            try:
+                await self._process(job_id, content, content_type)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str, content: bytes, content_type: str) -> None:
+        give_up_at = time.monotonic() + settings.OCR_JOB_BUSY_TIMEOUT
+        status = QUEUED
+        while True:
+            if not ocr_executor.saturated():
+                if status != RUNNING:
+                    status = RUNNING
+                    await asyncio.to_thread(self.store.update, job_id, RUNNING)
+                try:
+                    readings = await process_upload(content, content_type)
+                    break
+                except ServiceBusyError:
+                    pass  # lost the free slot to another request
+                except Exception as e:
+                    await self._fail(job_id, str(e) or type(e).__name__)
+                    return
+            # OCR pool saturated by synchronous requests - stay queued and retry
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                await self._fail(job_id, f"OCR busy for {settings.OCR_JOB_BUSY_TIMEOUT:g}s")
+                return
+            if status != QUEUED:
+                status = QUEUED
+                await asyncio.to_thread(self.store.update, job_id, QUEUED)
+            await asyncio.sleep(min(settings.BUSY_RETRY_AFTER, remaining))
+        self.completed += 1
+        await asyncio.to_thread(self.store.update, job_id, DONE, to_lab_values(readings), None, readings)
+
+    async def _fail(self, job_id: str, error: str) -> None:
+        print(f"OCR job {job_id} failed: {error}")
+        self.failed += 1
+        await asyncio.to_thread(self.store.update, job_id, FAILED, None, error)
+
+    async def stop(self) -> None:
+        """Cancel the background tasks (queued jobs stay queued until they expire)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def status(self) -> Dict[str, Any]:
+        """Queue depth, counters and stored jobs per status"""
+        return {
+            "store": type(self.store).__name__,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "jobs": self.store.counts()
+        }
+
+
+# Created on first use, so importing this module opens no job store
+_ocr_jobs: Optional[OCRJobQueue] = None
+_ocr_jobs_lock = threading.Lock()
+
+
+def get_ocr_jobs() -> OCRJobQueue:
+    """The process's OCR job queue, on the OCR_JOB_STORE store"""
+    global _ocr_jobs
+    if _ocr_jobs is None:
+        with _ocr_jobs_lock:
+            if _ocr_jobs is None:
+                _ocr_jobs = OCRJobQueue(
+                    create_job_store(settings.OCR_JOB_STORE),
+                    workers=settings.OCR_JOB_WORKERS,
+                    max_queue=settings.OCR_JOB_MAX_QUEUE
+                )
+    return _ocr_jobs
+
+
+def get_ocr_job_status() -> Dict[str, Any]:
+    """OCR job queue status for health checks"""
+    return get_ocr_jobs().status()
+
+
+async def stop_ocr_jobs() -> None:
+    """Stop the job queue's background tasks, if the queue was ever used"""
+    if _ocr_jobs is not None:
+        await _ocr_jobs.stop()
@@ -1,191 +1,405 @@
-import tempfile
-import shutil
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Optional
-from fastapi import UploadFile
-import easyocr
-import re
-from app.schemas.lab_values import LabValues
-
-# Initialize EasyOCR reader once (expensive operation)
-reader = None
-
-def get_reader():
-    """Lazy load the OCR reader"""
-    global reader
-    if reader is None:
-        reader = easyocr.Reader(['en'])
-    return reader
-
-# -------------------- RULES --------------------
-
-LAB_DEFINITIONS = {
-    "hba1c": {
-        "labels": [r'hb[a-z]*c', r'a1c', r'glycated'],
-        "min_digits": 2
-    },
-    "fasting_glucose": {
-        "labels": [r'fasting.*glucose', r'fbg', r'fbs'],
-        "min_digits": 2
-    },
-    "random_glucose": {
-        "labels": [r'random.*glucose', r'rbs'],
-        "min_digits": 2
-    },
-    "ldl": {
-        "labels": [r'ldl'],
-        "min_digits": 2
-    },
-    "hdl": {
-        "labels": [r'hdl'],
-        "min_digits": 2
-    },
-    "triglycerides": {
-        "labels": [r'triglycerides', r'trig'],
-        "min_digits": 2
-    },
-    "total_cholesterol": {
-        "labels": [r'total.*cholesterol', r'cholesterol.*total'],
-        "min_digits": 2
-    },
-    "hemoglobin": {
-        "labels": [r'hemoglobin', r'hb[^a-z]', r'\bhb\b'],
-        "min_digits": 2
-    },
-    "rbc": {
-        "labels": [r'rbc', r'red.*blood.*cell'],
-        "min_digits": 1
-    },
-    "tsh": {
-        "labels": [r'tsh', r'thyroid.*stimulating'],
-        "min_digits": 1
-    },
-    "t4": {
-        "labels": [r't4', r'thyroxine'],
-        "min_digits": 1
-    },
-    "t3": {
-        "labels": [r't3', r'triiodothyronine'],
-        "min_digits": 1
-    }
-}
-
-# -------------------- EXTRACTION --------------------
-
-def preprocess(text: str) -> str:
-    """Preprocess text for easier parsing"""
-    return text.lower()
-
-def extract_single_value(text: str, label_patterns: list[str], *, min_digits=1) -> Optional[float]:
-    """Extract a single numeric value associated with a label"""
-    for label in label_patterns:
-        # Look for label followed by value (with some characters in between)
-        pattern = rf'{label}[^0-9]{{0,30}}([\d]+\.?\d*)'
-        match = re.search(pattern, text)
-        if match:
-            value = match.group(1)
-            if len(value.replace('.', '')) >= min_digits:
-                try:
-                    return float(value)
-                except ValueError:
-                    continue
-    return None
-
-def extract_blood_pressure(text: str) -> tuple[Optional[float], Optional[float]]:
-    """Extract blood pressure values (systolic/diastolic)"""
-    match = re.search(
-        r'(blood pressure|bp)[^0-9]*([1-9]\d{1,2})\s*/\s*([1-9]\d{1,2})',
-        text
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from ai.ocr import ocr_pipeline
+from ai.ocr.progressive import extract_progressive
+from ai.ocr.templates import TEMPLATES_PATH, TemplateError, TemplateRegistry, extract_with_templates
+from ai.ocr.ocr_pipeline import (
+    create_reader,
+    reading_values,
+    text_page,
+    warm_inference
+)
+from app.config import settings
+from app.schemas.lab_values import LabValues, LabValuesWithReadings
+from app.services.cache_service import CacheBackend, MemoryCache, SQLiteCache
+from app.services.execution_service import ocr_executor
+from app.services.coalescing_service import ocr_flights
+from app.services.reader_pool_service import ReaderPool
+from app.services.timing_service import record_timing, timed
+from app.services.upload_service import read_upload
+
+# Thin wrapper around ai.ocr.ocr_pipeline: decoding, recognition and
+# parsing live there; this module adds the reader pool, the OCR worker
+# pool, the result cache and request timings.
+#
+# EasyOCR readers are expensive (seconds to load, hundreds of MB each), so
+# each process keeps a small pool. easyocr pulls in torch and OpenCV and
+# is only imported when the first reader is built - in the OCR worker
+# process, not in the API process
+
+reader_pool = ReaderPool(
+    "easyocr",
+    create_reader,
+    size=settings.OCR_READERS_PER_PROCESS,
+    idle_timeout=settings.OCR_READER_IDLE_TIMEOUT,
+    warm=warm_inference
+)
+
+# Latest reader pool status reported by each OCR worker process (by pid)
+_worker_pool_status: Dict[int, dict] = {}
+
+def warm_reader() -> dict:
+    """Load the OCR readers ahead of the first request (runs on the OCR pool)"""
+    reader_pool.warmup()
+    return reader_pool.status()
+
+def get_reader_pool_status() -> Dict[str, dict]:
+    """Reader pools of the OCR workers, as of their last task"""
+    return {str(pid): status for pid, status in sorted(_worker_pool_status.items())}
+
+# -------------------- RESULT CACHE --------------------
+
+# Bump when ai.ocr LAB_DEFINITIONS or the parsing code changes - cached parse
+# results are dropped, cached OCR pages are re-parsed
+PARSER_VERSION = "3"
+
+# Bump when the OCR output for the same image would change (reader
+# languages, image preprocessing, PDF text layer) - forces a re-OCR
+OCR_VERSION = "easyocr-en-3"
+
+def create_ocr_cache(backend: str) -> Optional[CacheBackend]:
+    """
+    Content-addressed cache of OCR text and parsed values ('sqlite', 'memory' or 'none')
+    
+    Values are UTF-8 bytes; least recently used entries go first once
+    OCR_CACHE_MAX_BYTES or OCR_CACHE_MAX_ENTRIES is exceeded.
+    """
+    limits = dict(
+        model=None,
+        ttl=settings.OCR_CACHE_TTL,
+        max_entries=settings.OCR_CACHE_MAX_ENTRIES,
+        max_bytes=settings.OCR_CACHE_MAX_BYTES
     )
-    if match:
-        return float(match.group(2)), float(match.group(3))
-    return None, None
-
-def parse_lab_values(text: str) -> dict:
-    """Parse lab values from extracted text"""
-    results = {}
-
-    for lab, config in LAB_DEFINITIONS.items():
-        value = extract_single_value(
-            text,
-            config["labels"],
-            min_digits=config["min_digits"]
-        )
-        if value is not None:
-            results[lab] = value
+    if backend == "sqlite":
+        return SQLiteCache(settings.OCR_CACHE_PATH, **limits)
+    if backend == "memory":
+        return MemoryCache(**limits)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown OCR_CACHE_BACKEND '{backend}'")
 
-    systolic, diastolic = extract_blood_pressure(text)
-    if systolic is not None:
-        results["systolic_bp"] = systolic
-    if diastolic is not None:
-        results["diastolic_bp"] = diastolic
+# Created on first use, so importing this module opens no cache file
+_ocr_cache: Optional[CacheBackend] = None
+_ocr_cache_created = False
+_ocr_cache_lock = threading.Lock()
 
-    return results
+def get_ocr_cache() -> Optional[CacheBackend]:
+    """The OCR result cache for OCR_CACHE_BACKEND (None if 'none')"""
+    global _ocr_cache, _ocr_cache_created
+    if not _ocr_cache_created:
+        with _ocr_cache_lock:
+            if not _ocr_cache_created:
+                _ocr_cache = create_ocr_cache(settings.OCR_CACHE_BACKEND)
+                _ocr_cache_created = True
+    return _ocr_cache
+
+def get_ocr_cache_status() -> dict:
+    """OCR result cache counters for health checks / metrics"""
+    ocr_cache = get_ocr_cache()
+    if ocr_cache is None:
+        return {"backend": None}
+    return ocr_cache.stats()
 
 # -------------------- OCR PROCESSING --------------------
 
-def extract_raw_text(image_path: str) -> str:
-    """Extract text from image using EasyOCR"""
-    ocr_reader = get_reader()
-    result = ocr_reader.readtext(image_path)
-    text = " ".join([item[1] for item in result])
-    return text
+def decode_images(
+    content: bytes,
+    content_type: str,
+    pages: Optional[List[int]] = None,
+    step_timings: Optional[Dict[str, float]] = None
+) -> Iterator:
+    """ocr_pipeline.decode_images with the configured preprocessing"""
+    return ocr_pipeline.decode_images(
+        content,
+        content_type,
+        pages,
+        steps=settings.OCR_PREPROCESS_STEPS,
+        max_side=settings.OCR_MAX_SIDE,
+        text_height=settings.OCR_TARGET_TEXT_HEIGHT,
+        pdf_dpi=settings.OCR_PDF_DPI,
+        step_timings=step_timings
+    )
+
+def extract_ocr_pages(
+    content: bytes,
+    content_type: str,
+    pages: Optional[List[int]] = None,
+    step_timings: Optional[Dict[str, float]] = None,
+    deadline: Optional[float] = None
+) -> Tuple[List[dict], bool]:
+    """
+    OCR'd pages of an image/PDF (no temp file), and whether the deadline
+    left them complete
+    
+    Pages printed from a known lab template are read from its field
+    regions. The rest become ocr_page()s: boxes are [text, x0, y0, x1,
+    y1, confidence] lists (TextBox field order), so they pickle and
+    JSON-encode cheaply. They are read at the lowest of
+    OCR_PROGRESSIVE_SCALES that recovers their markers, OCR_BATCH_PAGES at
+    a time, or row by row in two_stage mode.
+    """
+    def generic(images):
+        return extract_progressive(
+            images,
+            ocr_reader,
+            settings.OCR_BATCH_PAGES,
+            mode=settings.OCR_MODE,
+            required=settings.OCR_REQUIRED_MARKERS,
+            scales=settings.OCR_PROGRESSIVE_SCALES,
+            min_confidence=settings.OCR_MIN_CONFIDENCE,
+            deadline=deadline
+        )
+    
+    with reader_pool.acquire() as ocr_reader:
+        images = decode_images(content, content_type, pages, step_timings)
+        return extract_with_templates(
+            images, ocr_reader, template_registry(), generic, settings.OCR_BATCH_PAGES, deadline
+        )
+
+def extract_raw_text_task(
+    content: bytes,
+    content_type: str,
+    pages: Optional[List[int]] = None,
+    deadline: Optional[float] = None
+) -> Tuple[List[dict], bool, dict, Dict[str, float]]:
+    """
+    extract_ocr_pages plus the worker's reader pool status and
+    preprocessing seconds per step (runs on the OCR pool)
+    """
+    step_timings: Dict[str, float] = {}
+    ocr_pages, complete = extract_ocr_pages(content, content_type, pages, step_timings, deadline)
+    return ocr_pages, complete, reader_pool.status(), step_timings
+
+# -------------------- LAB TEMPLATES --------------------
 
-async def process_image_file(file: UploadFile) -> dict:
+# (path, mtime) the registry was loaded from, and the registry
+_templates: Tuple[Optional[Tuple[str, Optional[float]]], TemplateRegistry] = (None, TemplateRegistry())
+
+def template_registry() -> TemplateRegistry:
+    """
+    Lab templates from OCR_TEMPLATE_PATH, reloaded when the file changes
+    (empty if disabled, missing or invalid)
+    """
+    global _templates
+    if not settings.OCR_TEMPLATES_ENABLED:
+        return TemplateRegistry()
+    path = settings.OCR_TEMPLATE_PATH or str(TEMPLATES_PATH)
+    try:
+        stamp = (path, os.stat(path).st_mtime)
+    except OSError:
+        stamp = (path, None)
+    if _templates[0] != stamp:
+        try:
+            registry = TemplateRegistry.load(Path(path), max_distance=settings.OCR_TEMPLATE_MAX_DISTANCE)
+        except TemplateError as e:
+            print(f"Lab templates not loaded: {str(e)}")
+            registry = TemplateRegistry()
+        _templates = (stamp, registry)
+    return _templates[1]
+
+# -------------------- PDF TEXT LAYER --------------------
+
+def read_pdf_text_layer(content: bytes) -> List[Optional[str]]:
+    """ocr_pipeline.read_pdf_text_layer with the configured PDF_TEXT_MIN_CHARS"""
+    return ocr_pipeline.read_pdf_text_layer(content, settings.PDF_TEXT_MIN_CHARS)
+
+def ocr_deadline(budget: Optional[float] = None) -> Optional[float]:
+    """
+    time.time() by which OCR should return, from a caller's budget in
+    seconds and OCR_TIME_BUDGET (the lower one wins; None = no limit)
+    """
+    budgets = [b for b in (budget, settings.OCR_TIME_BUDGET) if b is not None and b > 0]
+    return time.time() + min(budgets) if budgets else None
+
+def ocr_variant() -> str:
+    """Settings that change OCR output, as part of the cache keys"""
+    scales = ",".join(f"{scale:g}" for scale in settings.OCR_PROGRESSIVE_SCALES)
+    markers = "+".join(settings.OCR_REQUIRED_MARKERS)
+    return f"{settings.OCR_MODE}:{scales}:{markers}:{template_registry().version}"
+
+async def process_image_file(file: UploadFile, budget: Optional[float] = None) -> dict:
     """Process uploaded image file and extract lab values"""
-    # Save uploaded file to temporary location
-    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp_file:
-        shutil.copyfileobj(file.file, tmp_file)
-        tmp_path = tmp_file.name
+    content, content_type = await read_upload(file)
+    return await process_upload(content, content_type, ocr_deadline(budget))
+
+async def process_upload(content: bytes, content_type: str, deadline: Optional[float] = None) -> dict:
+    """
+    OCR and parse an upload; identical uploads in flight at the same time
+    share one OCR run (deadline-bound runs only with each other)
+    """
+    content_hash = hashlib.sha256(content).hexdigest()
+    flight = content_hash if deadline is None else f"{content_hash}:deadline"
+    return await ocr_flights.do(flight, lambda: process_cached(content, content_type, content_hash, deadline))
+
+async def process_cached(
+    content: bytes,
+    content_type: str,
+    content_hash: str,
+    deadline: Optional[float] = None
+) -> dict:
+    """
+    process_image_bytes through the OCR result cache
     
+    Parsed readings are keyed by PARSER_VERSION and OCR pages by
+    OCR_VERSION and ocr_variant(), so a parser change re-parses the cached
+    pages without re-running OCR. Results the deadline cut short are
+    returned but not cached.
+    """
+    ocr_cache = get_ocr_cache()
+    if ocr_cache is None:
+        return await process_image_bytes(content, content_type, deadline)
+    
+    parsed_key = f"parsed:{PARSER_VERSION}:{ocr_variant()}:{content_hash}"
+    pages_key = f"pages:{OCR_VERSION}:{ocr_variant()}:{content_hash}"
+    with timed("ocr-cache"):
+        cached = await asyncio.to_thread(ocr_cache.get, parsed_key)
+    if cached is not None:
+        return json.loads(cached)
+    
+    with timed("ocr-cache"):
+        cached = await asyncio.to_thread(ocr_cache.get, pages_key)
+    if cached is not None:
+        pages, complete = json.loads(cached), True
+    else:
+        pages, complete = await extract_pages_from_bytes(content, content_type, deadline)
+        if complete:
+            await asyncio.to_thread(ocr_cache.set, pages_key, json.dumps(pages).encode("utf-8"))
+    
+    readings = parse_pages(pages)
+    if complete:
+        await asyncio.to_thread(ocr_cache.set, parsed_key, json.dumps(readings).encode("utf-8"))
+    return readings
+
+async def process_image_bytes(content: bytes, content_type: str, deadline: Optional[float] = None) -> dict:
+    """OCR and parse one uploaded file's content"""
+    pages, _ = await extract_pages_from_bytes(content, content_type, deadline)
+    return parse_pages(pages)
+
+async def extract_pages_from_bytes(
+    content: bytes,
+    content_type: str,
+    deadline: Optional[float] = None
+) -> Tuple[List[dict], bool]:
+    """
+    Pages of one uploaded file - PDF text layer where present, OCR
+    otherwise - and whether the deadline left them complete
+    """
+    if content_type == "application/pdf":
+        return await extract_pdf_pages(content, deadline)
+    return await run_ocr(content, content_type, deadline=deadline)
+
+async def extract_pdf_pages(content: bytes, deadline: Optional[float] = None) -> Tuple[List[dict], bool]:
+    """
+    Embedded text for pages that have it; only the remaining pages are
+    rasterized and OCR'd (most lab PDFs are machine-generated)
+    """
+    with timed("pdf-text"):
+        texts = await asyncio.to_thread(read_pdf_text_layer, content)
+    if not texts:
+        return await run_ocr(content, "application/pdf", deadline=deadline)
+    
+    pages = [text_page(text) if text is not None else None for text in texts]
+    missing = [page_number for page_number, page in enumerate(pages, 1) if page is None]
+    complete = True
+    if missing:
+        ocr_pages, complete = await run_ocr(content, "application/pdf", missing, deadline)
+        for page_number, page in zip(missing, ocr_pages):
+            pages[page_number - 1] = page
+    return pages, complete
+
+async def run_ocr(
+    content: bytes,
+    content_type: str,
+    pages: Optional[List[int]] = None,
+    deadline: Optional[float] = None
+) -> Tuple[List[dict], bool]:
+    """
+    OCR'd pages of an image/PDF on the bounded OCR pool, off the event
+    loop, and whether the deadline left them complete
+    """
+    with timed("ocr"):
+        ocr_pages, complete, pool_status, step_timings = await ocr_executor.run(
+            extract_raw_text_task, content, content_type, pages, deadline
+        )
+    _worker_pool_status[pool_status["pid"]] = pool_status
+    # Measured in the OCR worker; reported as part of this request's timings
+    for name, seconds in step_timings.items():
+        record_timing(f"preprocess-{name}", seconds)
+    return ocr_pages, complete
+
+def parse_pages(pages: List[dict]) -> dict:
+    """ocr_pipeline.parse_pages, reported as the "parse" timing"""
+    with timed("parse"):
+        return ocr_pipeline.parse_pages(pages)
+
+async def warmup_ocr() -> None:
+    """Background warmup: load easyocr and the model in an OCR worker"""
     try:
-        # Extract text using OCR
-        raw_text = extract_raw_text(tmp_path)
-        
-        # Preprocess and parse
-        processed_text = preprocess(raw_text)
-        parsed_values = parse_lab_values(processed_text)
-        
-        return parsed_values
-    finally:
-        # Clean up temporary file
-        Path(tmp_path).unlink(missing_ok=True)
+        pool_status = await ocr_executor.run(warm_reader)
+        _worker_pool_status[pool_status["pid"]] = pool_status
+        print(f"🔍 OCR model loaded ({pool_status['load_seconds']}s)")
+    except Exception as e:
+        print(f"OCR warmup failed: {str(e)}")
 
 # -------------------- SERVICE FUNCTION --------------------
 
-async def extract_lab_values_from_file(file: UploadFile) -> LabValues:
+def to_lab_values(readings: dict) -> LabValues:
+    """LabValues from parsed OCR readings - labels that were not found stay None"""
+    values = reading_values(readings)
+    return LabValues(
+        hba1c=values.get('hba1c'),
+        fasting_glucose=values.get('fasting_glucose'),
+        random_glucose=values.get('random_glucose'),
+        ldl=values.get('ldl'),
+        hdl=values.get('hdl'),
+        triglycerides=values.get('triglycerides'),
+        total_cholesterol=values.get('total_cholesterol'),
+        systolic_bp=values.get('systolic_bp'),
+        diastolic_bp=values.get('diastolic_bp'),
+        hemoglobin=values.get('hemoglobin'),
+        rbc=values.get('rbc'),
+        tsh=values.get('tsh'),
+        t4=values.get('t4'),
+        t3=values.get('t3')
+    )
+
+async def extract_lab_values_from_file(
+    file: UploadFile,
+    budget: Optional[float] = None,
+    include_readings: bool = False
+) -> LabValuesWithReadings:
     """
     Main service function to extract lab values from uploaded file
-    Returns LabValues schema with extracted values
+    Returns LabValuesWithReadings with extracted values - the best found
+    within budget seconds, if given - and, with include_readings, the
+    unit, confidence and source of each value
     """
     try:
         # Process the file and extract values
-        extracted_values = await process_image_file(file)
+        extracted_values = await process_image_file(file, budget)
         
         # Create LabValues object with extracted values
         # If a value is not found, it will be None
-        lab_values = LabValues(
-            hba1c=extracted_values.get('hba1c'),
-            fasting_glucose=extracted_values.get('fasting_glucose'),
-            random_glucose=extracted_values.get('random_glucose'),
-            ldl=extracted_values.get('ldl'),
-            hdl=extracted_values.get('hdl'),
-            triglycerides=extracted_values.get('triglycerides'),
-            total_cholesterol=extracted_values.get('total_cholesterol'),
-            systolic_bp=extracted_values.get('systolic_bp'),
-            diastolic_bp=extracted_values.get('diastolic_bp'),
-            hemoglobin=extracted_values.get('hemoglobin'),
-            rbc=extracted_values.get('rbc'),
-            tsh=extracted_values.get('tsh'),
-            t4=extracted_values.get('t4'),
-            t3=extracted_values.get('t3')
-        )
+        lab_values = to_lab_values(extracted_values)
         
-        return lab_values
+        return LabValuesWithReadings(
+            **lab_values.model_dump(),
+            readings=extracted_values if include_readings else None
+        )
         
+    except HTTPException:
+        # Surface backpressure (503) and rejected uploads (413/415) instead of an empty result
+        raise
     except Exception as e:
         # Log the error and return empty LabValues
         print(f"Error processing OCR: {str(e)}")
         # Return with None values if extraction fails
-        return LabValues()
+        return LabValuesWithReadings(readings={} if include_readings else None)
 
@@ -6,35 +6,170 @@ Generates personalized prevention plans based on disease, risk class, and user p
 import json
 from pathlib import Path
 import sys
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterator, Iterator, Optional, Union
 
-# FIXED: Module-relative paths - points to ai/data directory
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+# FIXED: Module-relative paths - points to repository root
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
-DATA_DIR = BASE_DIR / "ai" / "data"
-GUIDELINES_PATH = DATA_DIR / "guidelines.json"
 
 # Add parent to path
 sys.path.insert(0, str(BASE_DIR))
 
+from ai.knowledge_base import KnowledgeBase, get_knowledge_base
 from ai.risk.risk_model import predict_risks
-from app.schemas.prediction import RiskRequest, RiskResponse, DiseaseRiskResult, ConsultDetail
+from ai.risk.batch_model import predict_risks_batch
+from app.schemas.prediction import (
+    RiskRequest, RiskResponse, DiseaseRiskResult, ConsultDetail, BatchRiskItem, BatchRiskError
+)
+from app.config import settings
+from app.services import cache_service
+from app.services.coalescing_service import prediction_flights
+from app.services.execution_service import prediction_executor
+from app.services.serialization_service import render_risk_response
+from app.services.timing_service import timed
+
+# Records per vectorized scoring call in a batch request - small enough
+# that the first results stream back quickly
+BATCH_CHUNK_SIZE = 50
 
 
-def predict_risk(payload: RiskRequest) -> RiskResponse:
-    """Main prediction function - connects backend to AI"""
+def predict_risk(
+    payload: RiskRequest,
+    kb: Optional[KnowledgeBase] = None,
+    cache_key: Optional[str] = None,
+    render: bool = False
+) -> Union[RiskResponse, bytes]:
+    """
+    Main prediction function - connects backend to AI
+    
+    Args:
+        payload: Validated request
+        kb: Snapshot to score against (defaults to the active one)
+        cache_key: Precomputed request_cache_key, if the caller has one
+        render: Return RiskResponse JSON bytes built directly from the
+            engine output (FAST_SERIALIZATION) instead of the model
+    """
     
-    # Convert Pydantic to dict
-    user_data = {
+    # Pin one knowledge base snapshot for the whole request
+    kb = kb or get_knowledge_base()
+    
+    # Identical requests against the same knowledge base give identical results
+    cache = cache_service.prediction_cache
+    if cache is not None:
+        key = cache_key or cache_service.request_cache_key(payload, kb.version)
+        with timed("cache"):
+            cached = cache.get(key)
+        if cached is not None:
+            if isinstance(cached, bytes):
+                return cached if render else RiskResponse.model_validate_json(cached)
+            return cached.json().encode("utf-8") if render else cached
+    
+    # Call AI module
+    ai_results = predict_risks(to_user_data(payload), kb)
+    if render:
+        response = render_risk_response(ai_results, kb.version)
+    else:
+        response = to_risk_response(ai_results, kb)
+    
+    if cache is not None:
+        cache.set(key, response)
+    
+    return response
+
+
+async def predict_risk_async(payload: RiskRequest, render: bool = False) -> Union[RiskResponse, bytes]:
+    """
+    predict_risk on the bounded prediction pool, with in-flight dedup
+    
+    Concurrent identical requests (same canonical request and knowledge
+    base version) share one computation.
+    
+    Raises:
+        ServiceBusyError: If the prediction pool is saturated
+    """
+    kb = get_knowledge_base()
+    key = cache_service.request_cache_key(payload, kb.version)
+    return await prediction_flights.do(
+        f"{key}:json" if render else key,
+        lambda: prediction_executor.run(predict_risk, payload, kb, key, render)
+    )
+
+
+def predict_risk_batch(
+    items: List[Any],
+    kb: Optional[KnowledgeBase] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    render: bool = False
+) -> Iterator[Union[BatchRiskItem, BatchRiskError, bytes]]:
+    """
+    Score many requests against one knowledge base snapshot
+    
+    Items are validated one by one; invalid items yield a BatchRiskError
+    instead of failing the batch. Valid items are scored in small chunks
+    through the vectorized engine and yielded in input order as each
+    chunk completes.
+    
+    Args:
+        items: Raw request dicts (or JSON decode errors as Exception objects)
+        kb: Snapshot to score against (defaults to the active one)
+        chunk_size: Records per vectorized scoring call
+        render: Yield scored items as BatchRiskItem JSON bytes built
+            directly from the engine output (FAST_SERIALIZATION)
+    
+    Yields:
+        BatchRiskItem (or its JSON bytes) or BatchRiskError per input
+        item, in order
+    """
+    kb = kb or get_knowledge_base()
+    
+    for start in range(0, len(items), chunk_size):
+        outcomes: List[Union[Dict[str, Any], BatchRiskError]] = []
+        for index, item in enumerate(items[start:start + chunk_size], start):
+            try:
+                if isinstance(item, Exception):
+                    raise item
+                payload = RiskRequest(**item) if isinstance(item, dict) else None
+                if payload is None:
+                    raise ValueError("item must be a JSON object")
+                outcomes.append(to_user_data(payload))
+            except (ValueError, TypeError) as e:
+                outcomes.append(BatchRiskError(index=index, error=_error_message(e)))
+        
+        valid = [o for o in outcomes if isinstance(o, dict)]
+        try:
+            scored = iter(predict_risks_batch(valid, kb, details=True))
+        except Exception:
+            # Fall back to the scalar engine so one bad record only fails itself
+            scored = None
+        
+        for index, outcome in enumerate(outcomes, start):
+            if isinstance(outcome, BatchRiskError):
+                yield outcome
+                continue
+            try:
+                ai_results = next(scored) if scored is not None else predict_risks(outcome, kb)
+                if render:
+                    yield render_risk_response(ai_results, kb.version, index)
+                    continue
+                yield BatchRiskItem(index=index, **to_risk_response(ai_results, kb).dict())
+            except Exception as e:
+                yield BatchRiskError(index=index, error=_error_message(e))
+
+
+def to_user_data(payload: RiskRequest) -> Dict[str, Any]:
+    """Convert a validated request to the dict shape the AI module expects"""
+    return {
         "patient": payload.patient.dict(),
         "lifestyle": payload.lifestyle.dict(),
         "family": [m.dict() for m in payload.family],
         "lab_values": payload.lab_values.dict() if payload.lab_values else {}
     }
-    
-    # Call AI module
-    ai_results = predict_risks(user_data)
-    
-    # Convert back to Pydantic
+
+
+def to_risk_response(ai_results: List[Dict[str, Any]], kb: KnowledgeBase) -> RiskResponse:
+    """Convert AI results back to the Pydantic response"""
     disease_results = [
         DiseaseRiskResult(
             disease_name=r["disease_name"],
@@ -51,14 +186,108 @@ def predict_risk(payload: RiskRequest) -> RiskResponse:
         for r in ai_results
     ]
     
-    return RiskResponse(success=True, results=disease_results)
+    return RiskResponse(success=True, results=disease_results, kb_version=kb.version)
+
+
+async def read_batch_body(
+    chunks: AsyncIterator[bytes],
+    content_type: str = "",
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None
+) -> List[Any]:
+    """
+    Read a batch request body into items as it arrives
+    
+    Accepts a JSON array, or NDJSON (one object per line) when the content
+    type says so or the body does not start with '['. NDJSON is parsed line
+    by line while the body streams in, so a batch is refused as soon as its
+    first item past max_items arrives; a JSON array is parsed once
+    complete. A malformed NDJSON line becomes an Exception item so it is
+    reported in place.
+    
+    Args:
+        chunks: Request body chunks (request.stream())
+        content_type: Request Content-Type
+        max_items: Item limit (default BATCH_MAX_ITEMS)
+        max_bytes: Body size limit (default BATCH_MAX_BODY_BYTES)
+    
+    Raises:
+        ValueError: If a JSON array body cannot be parsed
+        HTTPException: 413 past max_bytes or max_items
+    """
+    max_items = settings.BATCH_MAX_ITEMS if max_items is None else max_items
+    max_bytes = settings.BATCH_MAX_BODY_BYTES if max_bytes is None else max_bytes
+    
+    # None until the first non-blank byte shows whether the body is an array
+    is_ndjson = True if "ndjson" in content_type or "jsonl" in content_type else None
+    items: List[Any] = []
+    array_chunks: List[bytes] = []
+    pending = b""  # NDJSON: start of a line not terminated yet
+    size = 0
+    
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch body exceeds the {max_bytes // (1024 * 1024)}MB limit"
+            )
+        if is_ndjson is None:
+            head = (pending + chunk).lstrip()
+            if not head:
+                pending += chunk
+                continue
+            is_ndjson = not head.startswith(b"[")
+        if not is_ndjson:
+            array_chunks.append(pending + chunk)
+            pending = b""
+            continue
+        
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            _add_ndjson_item(items, line, max_items)
+    
+    if is_ndjson is False:
+        items = json.loads(b"".join(array_chunks))
+        if not isinstance(items, list):
+            raise ValueError("Body must be a JSON array of risk requests")
+        if len(items) > max_items:
+            raise _too_many_items(max_items)
+        return items
+    
+    _add_ndjson_item(items, pending, max_items)
+    return items
+
+
+def _add_ndjson_item(items: List[Any], line: bytes, max_items: int) -> None:
+    """Parse one NDJSON line onto items (blank lines are skipped)"""
+    if not line.strip():
+        return
+    if len(items) >= max_items:
+        raise _too_many_items(max_items)
+    try:
+        items.append(json.loads(line))
+    except ValueError as e:
+        items.append(ValueError(f"Invalid JSON: {e}"))
+
+
+def _too_many_items(max_items: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Batch exceeds the limit of {max_items} items")
+
+
+def _error_message(error: Exception) -> str:
+    """Readable one-line message for a per-item failure"""
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
 
 
 def load_guidelines():
-    """Load prevention guidelines from JSON"""
+    """Load prevention guidelines from the compiled knowledge base"""
     try:
-        with open(GUIDELINES_PATH, 'r') as f:
-            return json.load(f)
+        return get_knowledge_base().guidelines
     except Exception as e:
         print(f"Error loading guidelines: {e}")
         return {}
@@ -0,0 +1,193 @@
+"""
+OCR reader pool
+Lock-guarded, bounded pool of expensive OCR readers per process, with
+optional warmup and idle eviction
+"""
+
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class ReaderPool:
+    """
+    At most `size` readers per process, created on demand
+
+    Concurrent first requests wait for the reader being loaded instead of
+    each building their own. Readers idle for longer than idle_timeout
+    seconds are dropped by a background thread, so workers that stop
+    receiving OCR traffic give the memory back; the next request reloads.
+
+    Usage:
+        pool = ReaderPool("easyocr", lambda: easyocr.Reader(['en']))
+        with pool.acquire() as reader:
+            reader.readtext(image)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        size: int = 1,
+        idle_timeout: float = 600.0,
+        warm: Optional[Callable[[Any], None]] = None
+    ):
+        """
+        Args:
+            name: Label for status output
+            factory: Builds one reader (may take seconds and hundreds of MB)
+            size: Maximum readers in this process
+            idle_timeout: Seconds before an unused reader is dropped (0 keeps them)
+            warm: Runs one tiny inference on a reader during warmup()
+        """
+        self.name = name
+        self.factory = factory
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self.warm = warm
+        self._idle: List[Tuple[Any, float]] = []  # (reader, last used), most recent last
+        self._total = 0  # readers created or being created
+        self._in_use = 0
+        self._loading = 0
+        self._cond = threading.Condition()
+        self._reaper: Optional[threading.Thread] = None
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.evictions = 0
+        self.acquisitions = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """Borrow a reader, creating one if the pool is below size"""
+        reader = self._checkout()
+        try:
+            yield reader
+        finally:
+            self._checkin(reader)
+
+    def _checkout(self) -> Any:
+        start = perf_counter()
+        reader = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    reader = self._idle.pop()[0]
+                    break
+                if self._total < self.size:
+                    self._total += 1
+                    self._loading += 1
+                    break
+                self._cond.wait()
+            self._in_use += 1
+            waited = perf_counter() - start
+            self.acquisitions += 1
+            if waited > 0.001:
+                self.waits += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        if reader is not None:
+            return reader
+
+        load_start = perf_counter()
+        try:
+            reader = self.factory()
+        except BaseException:
+            with self._cond:
+                self._total -= 1
+                self._in_use -= 1
+                self._loading -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._loading -= 1
+            self.loads += 1
+            self.load_seconds += perf_counter() - load_start
+        return reader
+
+    def _checkin(self, reader: Any) -> None:
+        with self._cond:
+            self._idle.append((reader, time.monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+            if self.idle_timeout > 0 and self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._reap, name=f"{self.name}-reader-reaper", daemon=True
+                )
+                self._reaper.start()
+
+    def warmup(self) -> None:
+        """Load every reader now and run one tiny inference on each"""
+        readers = []
+        try:
+            for _ in range(self.size):
+                readers.append(self._checkout())
+            if self.warm is not None:
+                for reader in readers:
+                    self.warm(reader)
+        finally:
+            for reader in readers:
+                self._checkin(reader)
+
+    # -------------------- IDLE EVICTION --------------------
+
+    def evict_idle(self, max_idle: Optional[float] = None) -> int:
+        """Drop readers unused for max_idle seconds (default idle_timeout); returns count"""
+        max_idle = self.idle_timeout if max_idle is None else max_idle
+        cutoff = time.monotonic() - max_idle
+        with self._cond:
+            evicted = [entry for entry in self._idle if entry[1] <= cutoff]
+            self._idle = [entry for entry in self._idle if entry[1] > cutoff]
+            self._total -= len(evicted)
+            self.evictions += len(evicted)
+        count = len(evicted)
+        if count:
+            # Release the models now rather than at some later collection
+            del evicted
+            gc.collect()
+        return count
+
+    def _reap(self) -> None:
+        interval = max(1.0, self.idle_timeout / 4)
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+            with self._cond:
+                if self._total == 0:
+                    # Nothing left to watch - the next checkin starts a new reaper
+                    self._reaper = None
+                    return
+
+    # -------------------- STATUS --------------------
+
+    def status(self) -> Dict[str, Any]:
+        """Pool size, warm/cold state and wait times for this process"""
+        with self._cond:
+            if self._loading:
+                state = "warming"
+            elif self._total:
+                state = "warm"
+            else:
+                state = "cold"
+            return {
+                "pid": os.getpid(),
+                "state": state,
+                "size": self.size,
+                "readers": self._total,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "loads": self.loads,
+                "load_seconds": round(self.load_seconds, 3),
+                "evictions": self.evictions,
+                "acquisitions": self.acquisitions,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3)
+            }
@@ -0,0 +1,73 @@
+"""
+Fast response serialization
+Renders risk engine output straight to JSON bytes in the RiskResponse
+shape, without building and re-validating Pydantic models
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional - the stdlib encoder is used instead
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dumps(data: Any) -> bytes:
+    """Compact JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def risk_response_content(
+    ai_results: List[Dict[str, Any]],
+    kb_version: str,
+    index: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    RiskResponse (or BatchRiskItem when index is given) as plain dicts
+
+    Field order and defaults follow the schemas in app.schemas.prediction;
+    backend/tests/test_serialization.py checks the output against them.
+    """
+    content = {
+        "success": True,
+        "results": [
+            {
+                "disease_name": r["disease_name"],
+                "disease_id": r["disease_id"],
+                "probability": float(r["probability"]),
+                "risk_class": r["risk_class"],
+                "reasons": r["reasons"],
+                "prevention": r["prevention"],
+                "recommended_tests": r["recommended_tests"],
+                "recommended_tests_detail": r.get("recommended_tests_detail", []),
+                "consult": r["consult"],
+                "consult_detail": {
+                    "level": r["consult_detail"]["level"],
+                    "timeframe": r["consult_detail"]["timeframe"],
+                    "message": r["consult_detail"]["message"],
+                    "specialist": r["consult_detail"]["specialist"],
+                    "what_to_discuss": r["consult_detail"]["what_to_discuss"],
+                    "preparation": r["consult_detail"]["preparation"]
+                }
+            }
+            for r in ai_results
+        ],
+        "kb_version": kb_version
+    }
+    if index is not None:
+        content["index"] = index
+    return content
+
+
+def render_risk_response(
+    ai_results: List[Dict[str, Any]],
+    kb_version: str,
+    index: Optional[int] = None
+) -> bytes:
+    """JSON bytes for risk_response_content()"""
+    return dumps(risk_response_content(ai_results, kb_version, index))
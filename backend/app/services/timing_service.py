@@ -0,0 +1,150 @@
+"""
+Request timing and profiling
+Server-Timing header middleware and opt-in per-request cProfile runs
+"""
+
+import cProfile
+import io
+import pstats
+import re
+import threading
+import uuid
+from pathlib import Path
+import sys
+from time import perf_counter
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+# Repository root, so the shared ai package is importable
+BASE_DIR = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(BASE_DIR))
+
+from ai.instrumentation import (
+    RequestTimings,
+    begin_request_timings,
+    end_request_timings,
+    current_request_timings,
+    mark_timing,
+    record_timing,
+    timed
+)
+from app.config import settings
+
+__all__ = [
+    "ServerTimingMiddleware",
+    "current_request_timings",
+    "mark_timing",
+    "record_timing",
+    "timed",
+    "read_profile"
+]
+
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# cProfile cannot run two profilers on one thread - profile one request at a time
+_profile_lock = threading.Lock()
+
+
+def server_timing_header(timings: RequestTimings, now: float) -> str:
+    """
+    Build the Server-Timing value (milliseconds)
+
+    validation = request start -> handler entry (body read + parsing),
+    serialization = handler return -> response start, plus every stage
+    recorded during the request and the total.
+    """
+    entries = []
+    handler_start = timings.marks.get("handler_start")
+    if handler_start is not None:
+        entries.append(("validation", handler_start - timings.start))
+    entries.extend(sorted(timings.durations.items()))
+    handler_end = timings.marks.get("handler_end")
+    if handler_end is not None:
+        entries.append(("serialization", now - handler_end))
+    entries.append(("total", now - timings.start))
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in entries)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding Server-Timing and handling profile requests
+
+    When PROFILING_ENABLED is set, a request carrying PROFILING_HEADER
+    (matching PROFILING_TOKEN if one is configured) is run under cProfile
+    in the event loop thread and in the prediction worker thread. The
+    merged stats are saved under PROFILING_DIR, and the response carries
+    X-Profile-Id for GET /debug/profiles/{id}. Other requests handled on
+    the loop at the same time appear in the loop-thread profile. OCR runs
+    in worker processes and is not profiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = self._wants_profile(scope) and _profile_lock.acquire(blocking=False)
+        timings, token = begin_request_timings(profile)
+        profile_id = uuid.uuid4().hex if profile else None
+        profiler = cProfile.Profile() if profile else None
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if settings.SERVER_TIMING_ENABLED:
+                    headers.append("Server-Timing", server_timing_header(timings, perf_counter()))
+                if profile_id:
+                    headers.append("X-Profile-Id", profile_id)
+            await send(message)
+
+        try:
+            if profiler:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler:
+                profiler.disable()
+                try:
+                    save_profile(profile_id, [profiler] + timings.profiles)
+                finally:
+                    _profile_lock.release()
+            end_request_timings(token)
+
+    def _wants_profile(self, scope) -> bool:
+        if not settings.PROFILING_ENABLED:
+            return False
+        value = Headers(scope=scope).get(settings.PROFILING_HEADER)
+        if value is None:
+            return False
+        return not settings.PROFILING_TOKEN or value == settings.PROFILING_TOKEN
+
+
+# -------------------- PROFILE STORAGE --------------------
+
+def save_profile(profile_id: str, profilers: List[cProfile.Profile]) -> Path:
+    """Merge profiles; write <id>.prof (pstats) and <id>.txt (top-N by cumulative time)"""
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    stats = pstats.Stats(profilers[0])
+    for profiler in profilers[1:]:
+        stats.add(profiler)
+    stats.dump_stats(str(directory / f"{profile_id}.prof"))
+
+    text = io.StringIO()
+    stats.stream = text
+    stats.sort_stats("cumulative").print_stats(settings.PROFILING_TOP_N)
+    (directory / f"{profile_id}.txt").write_text(text.getvalue())
+    return directory / f"{profile_id}.prof"
+
+
+def read_profile(profile_id: str) -> Optional[str]:
+    """Top-N report for a stored profile, or None"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = Path(settings.PROFILING_DIR) / f"{profile_id}.txt"
+    return path.read_text() if path.exists() else None
@@ -0,0 +1,146 @@
+"""
+Upload handling
+Size-limited chunked reads, magic-byte type sniffing and an ASGI guard
+that stops oversized request bodies before they are spooled
+"""
+
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+# Room for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Leading bytes -> content type; the client's declared type is not trusted
+MAGIC_BYTES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"%PDF-", "application/pdf"),
+)
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Content type from the file signature, or None if unrecognized"""
+    for magic, content_type in MAGIC_BYTES:
+        if head.startswith(magic):
+            return content_type
+    return None
+
+
+async def read_upload(file: UploadFile, max_size: Optional[int] = None) -> Tuple[bytes, str]:
+    """
+    Read an upload in chunks, enforcing the size limit and allowed types
+
+    Args:
+        file: Uploaded file
+        max_size: Byte limit (default MAX_UPLOAD_SIZE)
+
+    Returns:
+        (content, sniffed content type)
+
+    Raises:
+        HTTPException: 400 if empty, 413 past the size limit, 415 if the
+            content is not an allowed type
+    """
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    chunks = []
+    size = 0
+    content_type = None
+
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if content_type is None:
+            # Reject non-images before reading the rest
+            content_type = sniff_content_type(chunk)
+            if content_type not in settings.ALLOWED_FILE_TYPES:
+                raise HTTPException(
+                    status_code=415,
+                    detail="Unsupported file type - upload a PNG, JPEG or PDF report"
+                )
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {max_size // (1024 * 1024)}MB upload limit"
+            )
+        chunks.append(chunk)
+
+    if not size:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+    return b"".join(chunks), content_type
+
+
+class UploadTooLarge(Exception):
+    """Raised from receive() once a request body passes the limit"""
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies over max_body bytes with 413
+
+    A Content-Length over the limit is refused before any body is read;
+    chunked bodies are cut off as soon as the running total passes it, so
+    oversized uploads never reach the multipart parser's spool file.
+    """
+
+    def __init__(self, app, max_body: int, path_prefix: str = "/"):
+        self.app = app
+        self.max_body = max_body
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    exceeded = True
+                    raise UploadTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded:
+                # The app's own error response for the aborted body is replaced by 413
+                return
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            pass
+        if exceeded and not started:
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(
+            {"detail": f"Request body exceeds the {self.max_body // (1024 * 1024)}MB upload limit"},
+            status_code=413,
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)
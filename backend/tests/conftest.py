@@ -0,0 +1,34 @@
+"""
+Shared test setup
+Puts the backend (for `app`) and the repository root (for `ai`) on the
+import path, so `cd backend && pytest` works without installing either,
+and provides the random patient cohort from benchmarks/cohort.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+BASE_DIR = BACKEND_DIR.parent
+for path in (BACKEND_DIR, BASE_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from ai.knowledge_base import get_knowledge_base
+from benchmarks.cohort import random_patients
+
+
+@pytest.fixture(scope="session")
+def kb():
+    """The active knowledge base snapshot"""
+    return get_knowledge_base()
+
+
+@pytest.fixture(scope="session")
+def cohort(kb):
+    """The demo cases plus 1000 random patients"""
+    disease_ids = [d['id'] for d in kb.diseases]
+    demo_cases = list(kb.sample_inputs.get('demo_cases', {}).values())
+    return demo_cases + random_patients(1000, seed=7, disease_ids=disease_ids)
@@ -0,0 +1,75 @@
+"""
+Batch risk engine tests
+predict_risks_batch must return exactly what predict_risks returns, record
+by record, including on odd inputs (aliased lab keys, missing values,
+repeated diseases)
+"""
+
+from ai.risk.batch_model import FACTOR_INDEX, predict_risks_batch, score_records
+from ai.risk.risk_model import predict_risks
+from ai.risk.scoring_rules import calculate_family_score, calculate_lab_score
+
+# Lab dicts OCR clients send that the cohort does not draw
+ODD_LAB_VALUES = [
+    {'hba1c': '6.9', 'ldl': 'high'},
+    {'ldl': 200, 'LDL-C': 'n/a'},          # a non-numeric alias still shadows
+    {'ldl': 'n/a', 'LDL-C': 200},
+    {'hba1c': float('nan'), 'tsh': None},
+    {'hba1c': None, 'HbA1c': 7.1, 'tsh': True},
+    {'unknown_marker': 5.0},
+]
+
+
+def test_detailed_batch_matches_predict_risks(cohort):
+    actual = predict_risks_batch(cohort, details=True)
+    for record, results in zip(cohort, actual):
+        assert results == predict_risks(record)
+
+
+def test_fast_batch_matches_predict_risks(cohort):
+    fields = ('disease_name', 'disease_id', 'probability', 'risk_class')
+    actual = predict_risks_batch(cohort)
+    for record, results in zip(cohort, actual):
+        expected = [{field: result[field] for field in fields} for result in predict_risks(record)]
+        assert results == expected
+
+
+def test_score_records_matches_predict_risks(cohort):
+    scores = score_records(cohort)
+    column = {disease_id: j for j, disease_id in enumerate(scores['disease_ids'])}
+    for i, record in enumerate(cohort):
+        for result in predict_risks(record):
+            assert scores['probability'][i, column[result['disease_id']]] == result['probability']
+
+
+def test_lab_scores_on_odd_values(kb):
+    records = [{'lab_values': lab_values} for lab_values in ODD_LAB_VALUES]
+    scores = score_records(records, kb)
+    for i, lab_values in enumerate(ODD_LAB_VALUES):
+        for j, disease in enumerate(kb.diseases):
+            expected = calculate_lab_score(disease, lab_values, disease.get('thresholds', {}))
+            assert scores['lab'][i, j] == expected
+
+
+def test_family_scores_on_odd_members(kb):
+    family = [
+        {'generation': 1, 'known_issues': ['cad', 'cad', 'hypertension']},
+        {'generation': 1.0, 'known_issues': ['hypertension']},
+        {'known_issues': ['cad', 'not_a_disease']},
+        {'generation': 5, 'known_issues': ['type2_diabetes']},
+    ]
+    records = [{'family': family}, {'family': []}, {'family': None}]
+    scores = score_records(records, kb)
+    for i, record in enumerate(records):
+        for j, disease in enumerate(kb.diseases):
+            expected = calculate_family_score(disease, record['family'])
+            assert scores['family'][i, j] == expected
+
+
+def test_every_configured_lifestyle_factor_is_scored(kb):
+    factors = {factor for disease in kb.diseases for factor in disease.get('lifestyle_factors', [])}
+    assert factors <= set(FACTOR_INDEX)
+
+
+def test_empty_batch():
+    assert predict_risks_batch([]) == []
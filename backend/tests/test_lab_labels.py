@@ -0,0 +1,74 @@
+"""
+Lab label index tests
+OCR-damaged labels resolve to their marker; labels of other analytes that
+merely contain an alias ("VLDL", "MCHC", "Random Urine Glucose") do not
+"""
+
+import pytest
+
+from ai.lab_labels import LAB_LABELS
+from ai.ocr.ocr_pipeline import parse_lab_values, preprocess
+from ai.risk.scoring_rules import normalize_lab_key
+from app.schemas.lab_values import LabValues
+
+
+@pytest.mark.parametrize("label, marker", [
+    ("hbalc", "hba1c"),
+    ("HbA1c", "hba1c"),
+    ("trig1ycerides", "triglycerides"),
+    ("LDL-C", "ldl"),
+    ("ldlcholesterol", "ldl"),
+    ("S.Cholestero1", "total_cholesterol"),
+    ("Cholestrol", "total_cholesterol"),
+    ("Hemoglobn", "hemoglobin"),
+    ("Fasting Blod Sugar", "fasting_glucose"),
+    ("mch", "mch"),
+])
+def test_resolves_damaged_labels(label, marker):
+    assert LAB_LABELS.resolve(label).marker == marker
+
+
+@pytest.mark.parametrize("label", [
+    "vldl",  # not ldl
+    "vldl_cholesterol",  # not ldl cholesterol
+    "mchc",  # not mch
+    "random_urine_glucose",  # not random glucose
+    "non_hdl",
+    "total",
+])
+def test_other_analytes_do_not_resolve(label):
+    assert LAB_LABELS.resolve(label) is None
+
+
+@pytest.mark.parametrize("text", [
+    "VLDL Cholesterol 30 mg/dl",
+    "Non-HDL Cholesterol 150 mg/dl",
+    "Random Urine Glucose 90 mg/dl",
+])
+def test_correct_text_keeps_other_analytes(text):
+    assert LAB_LABELS.correct_text(text) == text
+    assert parse_lab_values(preprocess(text)) == {}
+
+
+def test_bare_cholesterol_after_lipid_word_is_not_total():
+    text = "LDL      Cholesterol 120 mg/dl"
+    assert "total" not in LAB_LABELS.correct_text(text)
+    assert "total_cholesterol" not in parse_lab_values(preprocess(text))
+
+
+def test_correct_text_rewrites_damaged_labels():
+    values = parse_lab_values(preprocess("S.Cholestero1 : 212 mg/dl\nTrig1ycerides 180 mg/dl\nhbalc 6.4 %"))
+    assert values == {"total_cholesterol": 212.0, "triglycerides": 180.0, "hba1c": 6.4}
+
+
+def test_unknown_keys_pass_through():
+    assert normalize_lab_key("vldl_cholesterol") == "vldl_cholesterol"
+    assert normalize_lab_key("Random Urine Glucose") == "random_urine_glucose"
+    assert normalize_lab_key("LDL-C") == "ldl"
+
+
+def test_lab_values_canonical_keys():
+    values = LabValues.model_validate({"HbA1c": 6.1, "vldl": 30, "mchc": 33, "LDL Cholesterol": 140})
+    assert values.hba1c == 6.1
+    assert values.ldl == 140
+    assert values.model_dump(exclude_none=True) == {"hba1c": 6.1, "ldl": 140}
@@ -0,0 +1,59 @@
+"""
+Label matcher tests
+The single anchor scan finds exactly what one re.search/finditer per label
+pattern finds: overlapping labels, lookbehinds, greedy '.*' labels and
+first occurrences that are too short
+"""
+
+import pytest
+
+from ai.ocr.label_matcher import label_anchors
+from ai.ocr.ocr_pipeline import LAB_MATCHER
+
+TEXTS = [
+    "hbhba1c 6.1 a1c 7 glycated 6.4",
+    "non-hdl 40 non hdl 45 hdl 55 vldl 30 ldl 120",
+    "the total number of samples 3 total cholesterol 180 cholesterol total 210",
+    "bp: 120/80 blood pressure 130/85",
+    "hb 1 hemoglobin 13.5 hb12 \nhb 9.8",
+    "referred 12 red blood cell 4.5 rbc 5.1",
+    "t3t4 1 2 tsh 3 thyroid stimulating hormone 2.5",
+    "fasting for 10 hours fasting blood glucose 101 random plasma glucose 140",
+    "",
+]
+
+
+def per_pattern_match(text):
+    results = {}
+    for lab, index, pattern, min_digits, _ in LAB_MATCHER._patterns:
+        found = pattern.search(text)
+        if lab not in results and found and LAB_MATCHER._enough_digits(found.groups(), min_digits):
+            results[lab] = (lab, index, found.start(), found.end(), found.groups())
+    return results
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_match_equals_per_pattern_search(text):
+    assert {lab: tuple(match) for lab, match in LAB_MATCHER.match(text).items()} == per_pattern_match(text)
+    assert LAB_MATCHER.match(text) == LAB_MATCHER.resolve(LAB_MATCHER.find_all(text))
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_find_labels_equals_per_pattern_finditer(text):
+    expected = sorted(
+        (found.start(), order, (lab, index, found.start(), found.end()))
+        for order, (lab, index, pattern) in enumerate(LAB_MATCHER._labels)
+        for found in pattern.finditer(text)
+    )
+    assert LAB_MATCHER.find_labels(text) == [label for _, _, label in expected]
+
+
+@pytest.mark.parametrize("label, anchors", [
+    (r'(?<!non-)(?<!non )\bhdl', ('hdl',)),
+    (r'hb[a-z]*c', ('hb',)),
+    (r'(?:blood pressure|bp)', ('blood pressure', 'bp')),
+    (r'(?:blood|bp)?x', ('',)),
+    (r'[a-z]+', ('',)),
+])
+def test_label_anchors(label, anchors):
+    assert label_anchors(label) == anchors
@@ -0,0 +1,54 @@
+"""
+Synchronous OCR endpoint tests
+Response shape of POST /api/ocr, with and without include_readings, and
+the 413 for oversized uploads; the OCR run itself is replaced by fixed
+readings
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import ocr_service
+from app.services.upload_service import MULTIPART_OVERHEAD
+
+READINGS = {
+    "hba1c": {"value": 6.2, "unit": "%", "confidence": 0.94, "source": "layout"},
+    "ldl": {"value": 145.0, "unit": "mg/dL", "confidence": None, "source": "text"},
+}
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 64
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def process_image_file(file, budget=None):
+        return READINGS
+    monkeypatch.setattr(ocr_service, "process_image_file", process_image_file)
+    return TestClient(app)
+
+
+def post(client, **params):
+    return client.post("/api/ocr/", params=params, files={"file": ("report.png", PNG, "image/png")})
+
+
+def test_values_without_readings(client):
+    body = post(client).json()
+    assert body["hba1c"] == 6.2
+    assert body["ldl"] == 145.0
+    assert body["tsh"] is None
+    assert body["readings"] is None
+
+
+def test_readings_on_request(client):
+    body = post(client, include_readings="true").json()
+    assert body["hba1c"] == 6.2
+    assert body["readings"] == READINGS
+
+
+def test_oversized_upload_keeps_cors_headers(client):
+    origin = "http://localhost:5173"
+    body = b"\0" * (settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD + 1)
+    response = client.post("/api/ocr/", content=body, headers={"Origin": origin, "Content-Type": "image/png"})
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == origin
@@ -0,0 +1,95 @@
+"""
+OCR job queue tests
+Job status while the OCR pool is busy, the busy timeout and a successful
+run, with OCR itself replaced by a stub; and a prediction-only process
+(OCR_ENABLED=false) that never loads the OCR services or job store
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.config import settings
+from app.services import ocr_job_service
+from app.services.execution_service import ServiceBusyError
+from app.services.ocr_job_service import DONE, FAILED, QUEUED, JobStore, MemoryJobStore, OCRJobQueue
+
+READINGS = {"hba1c": {"value": 6.2, "unit": "%", "confidence": 0.94, "source": "layout"}}
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setattr(settings, "BUSY_RETRY_AFTER", 0.01)
+    return OCRJobQueue(MemoryJobStore(ttl=60), workers=1, max_queue=4)
+
+
+def run_job(queue, wait_for):
+    """Submit one upload and return its status history until wait_for(job) holds"""
+    async def scenario():
+        job = await queue.submit(b"upload", "image/png")
+        history = []
+        for _ in range(500):
+            current = await queue.get(job.job_id)
+            if not history or history[-1] != current.status:
+                history.append(current.status)
+            if wait_for(current):
+                break
+            await asyncio.sleep(0.005)
+        await queue.stop()
+        return current, history
+    return asyncio.run(scenario())
+
+
+def test_job_store_is_abstract():
+    with pytest.raises(TypeError):
+        JobStore(ttl=60)
+
+
+def test_job_done(queue, monkeypatch):
+    async def process_upload(content, content_type):
+        return READINGS
+    monkeypatch.setattr(ocr_job_service, "process_upload", process_upload)
+    job, _ = run_job(queue, lambda job: job.status == DONE)
+    assert job.lab_values.hba1c == 6.2
+    assert job.readings["hba1c"].value == 6.2
+    assert queue.completed == 1
+
+
+def test_busy_job_stays_queued_then_fails(queue, monkeypatch):
+    async def process_upload(content, content_type):
+        raise ServiceBusyError("ocr", 1)
+    monkeypatch.setattr(ocr_job_service, "process_upload", process_upload)
+    monkeypatch.setattr(ocr_job_service.ocr_executor, "saturated", lambda: True)
+    monkeypatch.setattr(settings, "OCR_JOB_BUSY_TIMEOUT", 0.1)
+    job, history = run_job(queue, lambda job: job.status == FAILED)
+    assert history == [QUEUED, FAILED]
+    assert "busy" in job.error
+    assert queue.failed == 1
+
+
+def test_busy_job_runs_once_a_slot_frees(queue, monkeypatch):
+    attempts = []
+
+    async def process_upload(content, content_type):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ServiceBusyError("ocr", 1)
+        return READINGS
+    monkeypatch.setattr(ocr_job_service, "process_upload", process_upload)
+    job, _ = run_job(queue, lambda job: job.status in (DONE, FAILED))
+    assert job.status == DONE
+    assert len(attempts) == 3
+
+
+def test_ocr_disabled_loads_no_ocr_services(tmp_path):
+    script = "import sys, app.main; print(sorted(m for m in sys.modules if 'ocr' in m))"
+    env = {**os.environ, "OCR_ENABLED": "false", "TMPDIR": str(tmp_path)}
+    backend = Path(__file__).resolve().parents[1]
+    output = subprocess.run([sys.executable, "-c", script], cwd=backend, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+    assert list(tmp_path.iterdir()) == []
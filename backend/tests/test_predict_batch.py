@@ -0,0 +1,100 @@
+"""
+Batch prediction endpoint tests
+Body formats, per-item errors and the size limits of POST /api/predict-risk/batch
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services.prediction_service import read_batch_body
+
+SAMPLE_INPUTS = Path(__file__).resolve().parents[2] / "ai" / "data" / "sample_inputs.json"
+URL = "/api/predict-risk/batch"
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def case():
+    with open(SAMPLE_INPUTS) as f:
+        return json.load(f)["demo_cases"]["case_a_low_risk"]
+
+
+def ndjson(items) -> bytes:
+    """Items as an NDJSON body"""
+    return b"".join(json.dumps(item).encode() + b"\n" for item in items)
+
+
+def read(body_chunks, content_type="", **limits):
+    """read_batch_body over body_chunks, as request.stream() would deliver them"""
+    async def chunks():
+        for chunk in body_chunks:
+            yield chunk
+    return asyncio.run(read_batch_body(chunks(), content_type, **limits))
+
+
+def test_json_array(client, case):
+    response = client.post(URL, json=[case, case])
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1]
+    assert all(line["success"] for line in lines)
+
+
+def test_ndjson_reports_bad_lines_in_place(client, case):
+    body = ndjson([case]) + b"{not json\n" + ndjson([{"patient": {}}])
+    response = client.post(URL, content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["success"] for line in lines] == [True, False, False]
+    assert "Invalid JSON" in lines[1]["error"]
+
+
+def test_empty_batch(client):
+    response = client.post(URL, content=b"\n\n", headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 400
+
+
+def test_too_many_items(client, case, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_ITEMS", 2)
+    for body, content_type in ((json.dumps([case] * 3).encode(), "application/json"),
+                               (ndjson([case] * 3), "application/x-ndjson")):
+        response = client.post(URL, content=body, headers={"Content-Type": content_type})
+        assert response.status_code == 413
+
+
+def test_body_too_large(client, case, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_BODY_BYTES", 1000)
+    response = client.post(URL, content=ndjson([case] * 5), headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 413
+
+
+def test_ndjson_refused_before_the_rest_arrives():
+    def chunks():
+        yield b'{"a": 1}\n{"a": 2}\n'
+        yield b'{"a": 3}\n'
+        raise AssertionError("read past the first item over the limit")
+    with pytest.raises(HTTPException) as error:
+        read(chunks(), "application/x-ndjson", max_items=2, max_bytes=10_000)
+    assert error.value.status_code == 413
+
+
+def test_lines_split_across_chunks():
+    items = read([b'{"a"', b': 1}\n{"a": 2', b'}'], max_items=5, max_bytes=10_000)
+    assert items == [{"a": 1}, {"a": 2}]
+
+
+def test_json_array_across_chunks():
+    assert read([b"  ", b'[{"a": 1},', b' {"a": 2}]'], max_items=5, max_bytes=10_000) == [{"a": 1}, {"a": 2}]
+    with pytest.raises(ValueError):
+        read([b'[{"a": 1}'], max_items=5, max_bytes=10_000)
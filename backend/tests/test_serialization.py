@@ -0,0 +1,49 @@
+"""
+Response serialization contract tests
+FAST_SERIALIZATION bytes must be exactly what the RiskResponse /
+BatchRiskItem model path produces for the same engine output
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from ai.risk.risk_model import predict_risks
+from app.schemas.prediction import BatchRiskItem, RiskRequest, RiskResponse
+from app.services import serialization_service
+from app.services.prediction_service import to_risk_response, to_user_data
+from app.services.serialization_service import render_risk_response
+
+
+@pytest.fixture(params=["default", "stdlib"])
+def encoder(request, monkeypatch):
+    """The installed encoder (orjson if present), then the stdlib fallback"""
+    if request.param == "stdlib":
+        monkeypatch.setattr(serialization_service, "orjson", None)
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def requests(cohort):
+    """Schema-valid cases of the cohort, as API requests"""
+    valid = []
+    for case in cohort[:300]:
+        try:
+            valid.append(RiskRequest(**case))
+        except ValidationError:
+            continue  # e.g. an empty lifestyle, which only the engine accepts
+    return valid
+
+
+def test_fast_bytes_match_model_path(requests, kb, encoder):
+    assert len(requests) > 200
+    for index, payload in enumerate(requests):
+        ai_results = predict_risks(to_user_data(payload), kb)
+        expected = RiskResponse.model_validate(to_risk_response(ai_results, kb))
+
+        fast = render_risk_response(ai_results, kb.version)
+        assert fast == expected.model_dump_json().encode("utf-8")
+        assert RiskResponse.model_validate_json(fast) == expected
+
+        batch = render_risk_response(ai_results, kb.version, index)
+        item = BatchRiskItem(index=index, **expected.model_dump())
+        assert batch == item.model_dump_json().encode("utf-8")
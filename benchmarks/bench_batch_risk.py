@@ -0,0 +1,75 @@
+"""
+Batch risk engine benchmark
+Compares predict_risks_batch throughput with predict_risks, after checking
+that both agree on the timed sample (backend/tests/test_batch_model.py
+checks the same on the test cohort, drawn by the same generator)
+
+Run from the repository root:
+    python benchmarks/bench_batch_risk.py --patients 20000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai.risk.risk_model import predict_risks
+from ai.risk.batch_model import predict_risks_batch, score_records
+from cohort import random_patients
+
+
+def best_of(func, repeats: int = 3) -> float:
+    """Fastest wall time of func() over a few runs"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_agreement(sample: list) -> None:
+    """Exit if predict_risks_batch disagrees with predict_risks on sample"""
+    fields = ('disease_name', 'disease_id', 'probability', 'risk_class')
+    detailed = predict_risks_batch(sample, details=True)
+    fast = predict_risks_batch(sample)
+    for i, record in enumerate(sample):
+        expected = predict_risks(record)
+        if detailed[i] != expected or fast[i] != [{f: r[f] for f in fields} for r in expected]:
+            sys.exit(f"predict_risks_batch disagrees with predict_risks on patient {i}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=20000, help='Cohort size for the batch timings')
+    parser.add_argument('--scalar-sample', type=int, default=1000, help='Patients timed on the scalar path')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed rounds; each path keeps its best')
+    args = parser.parse_args()
+
+    cohort = random_patients(args.patients)
+    sample = cohort[:args.scalar_sample]
+    check_agreement(sample)
+
+    paths = [
+        ('predict_risks (scalar)', lambda: [predict_risks(p) for p in sample], len(sample)),
+        ('predict_risks_batch(details=True)', lambda: predict_risks_batch(sample, details=True), len(sample)),
+        ('predict_risks_batch', lambda: predict_risks_batch(cohort), len(cohort)),
+        ('score_records (columnar)', lambda: score_records(cohort), len(cohort)),
+    ]
+    # Rounds interleave the paths so every path sees the same machine load;
+    # timing one path after another skews the ratios on a busy machine
+    per_patient = {label: float('inf') for label, _, _ in paths}
+    for _ in range(args.repeats):
+        for label, func, count in paths:
+            per_patient[label] = min(per_patient[label], best_of(func, repeats=1) / count)
+
+    scalar = per_patient['predict_risks (scalar)']
+    print(f"{'path':<34}{'us/patient':>12}{'patients/s':>14}{'speedup':>10}")
+    for label, seconds in per_patient.items():
+        print(f"{label:<34}{seconds * 1e6:>12.1f}{1 / seconds:>14,.0f}{scalar / seconds:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
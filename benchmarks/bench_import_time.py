@@ -0,0 +1,89 @@
+"""
+API startup import-time benchmark
+Imports app.main in fresh interpreters under `python -X importtime` and
+reports the total, the slowest modules, and whether heavy OCR
+dependencies (easyocr, torch, cv2) were loaded
+
+Run from the repository root:
+    python benchmarks/bench_import_time.py --runs 5 --budget 1500
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT / "backend"
+
+# Must never be imported by the API process at startup
+HEAVY_MODULES = ("easyocr", "torch", "cv2", "torchvision", "scipy", "skimage")
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def import_profile(module: str, env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    """[(module, self_us, cumulative_us), ...] for one fresh interpreter"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        sys.exit(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return rows
+
+
+def measure(module: str, runs: int, extra_env: Dict[str, str]):
+    """Fastest run's profile (least noise) plus its total in microseconds"""
+    env = {**os.environ, **extra_env}
+    best_rows, best_total = None, float("inf")
+    for _ in range(runs):
+        rows = import_profile(module, env)
+        total = next(cumulative for name, _, cumulative in rows if name == module)
+        if total < best_total:
+            best_rows, best_total = rows, total
+    return best_rows, best_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app.main', help='Module to import (from backend/)')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per configuration')
+    parser.add_argument('--top', type=int, default=15, help='Slowest modules listed (by self time)')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='Fail (exit 1) if the OCR-enabled import takes longer than this many ms')
+    args = parser.parse_args()
+
+    results = {}
+    for label, extra_env in [('OCR enabled', {}), ('OCR disabled', {'OCR_ENABLED': 'false'})]:
+        rows, total = measure(args.module, args.runs, extra_env)
+        results[label] = total
+        loaded = sorted({name.split('.')[0] for name, _, _ in rows} & set(HEAVY_MODULES))
+
+        print(f"\n{label}: import {args.module} {total / 1000:.1f} ms "
+              f"(best of {args.runs}), {len(rows)} modules")
+        print(f"  heavy OCR modules loaded: {', '.join(loaded) if loaded else 'none'}")
+        print(f"  {'self ms':>9}{'cumulative ms':>15}  module")
+        for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+            print(f"  {self_us / 1000:>9.1f}{cumulative_us / 1000:>15.1f}  {name}")
+
+        if loaded:
+            print(f"  FAIL: {', '.join(loaded)} imported at startup")
+            sys.exit(1)
+
+    if args.budget is not None and results['OCR enabled'] / 1000 > args.budget:
+        print(f"\nFAIL: {results['OCR enabled'] / 1000:.1f} ms exceeds the {args.budget:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Lab value parsing benchmark
+Checks LabelMatcher against the previous per-pattern re.search loop on
+generated report text, then compares parse time for single pages and
+multi-page documents (bulk re-parsing of cached OCR text)
+
+Run from the repository root:
+    python benchmarks/bench_lab_parsing.py --documents 2000 --pages 10
+"""
+
+import argparse
+import random
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ai.ocr.ocr_pipeline import LAB_DEFINITIONS, parse_lab_values
+from bench_batch_risk import best_of
+
+# Report boilerplate; "red", "total", "random" and "fasting" are first words of greedy '.*' labels
+PROSE = [
+    "the results were reviewed and the total number of samples required is reported to the referring doctor.",
+    "random checks are performed a hundred times a year on stored samples.",
+    "fasting for 10 hours is advised before collection.",
+    "reference ranges depend on age and sex; consult your physician.",
+    "patient id 40213 collected 08:15 reported 14:02 page",
+]
+LAB_LINES = [
+    "hba1c {:.1f} %", "fasting glucose {:.0f} mg/dl", "random blood glucose {:.0f} mg/dl",
+    "ldl cholesterol {:.0f} mg/dl", "hdl cholesterol {:.0f} mg/dl", "triglycerides {:.0f} mg/dl",
+    "total cholesterol {:.0f} mg/dl", "hemoglobin {:.1f} g/dl", "rbc count {:.2f}",
+    "tsh {:.2f} miu/l", "t4 {:.1f}", "t3 {:.0f}", "blood pressure {:.0f}/{:.0f}",
+]
+
+
+def reference_parse(text: str) -> dict:
+    """The previous implementation: one re.search per label, pattern built per call"""
+    results = {}
+    for lab, config in LAB_DEFINITIONS.items():
+        for label in config["labels"]:
+            match = re.search(rf'{label}[^0-9]{{0,30}}([\d]+\.?\d*)', text)
+            if match:
+                value = match.group(1)
+                if len(value.replace('.', '')) >= config["min_digits"]:
+                    results[lab] = float(value)
+                    break
+    match = re.search(r'(blood pressure|bp)[^0-9]*([1-9]\d{1,2})\s*/\s*([1-9]\d{1,2})', text)
+    if match:
+        results["systolic_bp"] = float(match.group(2))
+        results["diastolic_bp"] = float(match.group(3))
+    return results
+
+
+def random_document(rng: random.Random, pages: int) -> str:
+    """Lower-cased OCR-like text: boilerplate with a few lab lines per page"""
+    parts = []
+    for _ in range(pages):
+        for _ in range(rng.randint(10, 30)):
+            parts.append(rng.choice(PROSE))
+        for line in rng.sample(LAB_LINES, rng.randint(0, 5)):
+            parts.append(line.format(*(rng.uniform(1, 200) for _ in range(line.count('{')))))
+    return " ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=2000, help='Documents per corpus')
+    parser.add_argument('--pages', type=int, default=10, help='Pages per multi-page document')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpora = {
+        'single page': [random_document(rng, 1) for _ in range(args.documents)],
+        f'{args.pages} pages': [random_document(rng, args.pages) for _ in range(args.documents // 10 or 1)],
+    }
+
+    for name, documents in corpora.items():
+        mismatches = sum(1 for text in documents if reference_parse(text) != parse_lab_values(text))
+        if mismatches:
+            sys.exit(f"FAIL: {mismatches} {name} documents parse differently")
+
+        reference = best_of(lambda: [reference_parse(text) for text in documents])
+        matcher = best_of(lambda: [parse_lab_values(text) for text in documents])
+        size = sum(map(len, documents)) / len(documents) / 1024
+        print(f"{name:>12} ({len(documents)} docs, {size:.1f} KB avg): "
+              f"per-pattern loop {reference / len(documents) * 1e6:8.1f} us/doc   "
+              f"LabelMatcher {matcher / len(documents) * 1e6:8.1f} us/doc   "
+              f"speedup {reference / matcher:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Lab label index benchmark
+Resolves OCR-damaged lab labels ("hbalc", "trig1ycerides", "S.Cholestero1")
+with the trigram LabelIndex and with an edit-distance scan of every alias
+for every word window, then compares accuracy, false positives on report
+boilerplate and time per document
+
+Run from the repository root:
+    python benchmarks/bench_label_index.py --documents 20
+"""
+
+import argparse
+import difflib
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ai.lab_labels import LAB_ALIASES, LabelIndex
+from bench_lab_parsing import PROSE
+
+# Labels as printed on reports, with their markers
+PRINTED_LABELS = [
+    ("HbA1c", "hba1c"), ("Glycated Haemoglobin", "hba1c"), ("Fasting Blood Sugar", "fasting_glucose"),
+    ("Fasting Glucose", "fasting_glucose"), ("Random Blood Sugar", "random_glucose"), ("LDL-C", "ldl"),
+    ("LDL Cholesterol", "ldl"), ("HDL Cholesterol", "hdl"), ("Triglycerides", "triglycerides"),
+    ("S.Cholesterol", "total_cholesterol"), ("Total Cholesterol", "total_cholesterol"),
+    ("Haemoglobin", "hemoglobin"), ("TSH", "tsh"), ("Thyroxine", "t4"), ("Triiodothyronine", "t3"),
+    ("RBC Count", "rbc"), ("Blood Pressure", "blood_pressure"),
+]
+
+# Substitutions OCR makes, applied per character
+CONFUSIONS = {'l': '1', 'i': 'l', 'o': '0', 's': '5', 'e': 'c', 'c': 'e', 'a': 'o'}
+
+# Edit-distance scan: windows of up to this many words, ratio needed to resolve
+SCAN_WORDS = 3
+SCAN_MIN_RATIO = 0.8
+
+
+def damage(label: str, rng: random.Random, rate: float) -> str:
+    """Label with OCR confusions and dropped characters"""
+    out = []
+    for char in label:
+        roll = rng.random()
+        if roll < rate and char.lower() in CONFUSIONS:
+            out.append(CONFUSIONS[char.lower()])
+        elif roll < rate * 1.3 and char.isalpha() and len(label) > 5:
+            continue
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def scan_resolve(label: str):
+    """Marker of the alias most similar to label (difflib ratio), scanning every alias"""
+    text = " ".join(label.lower().replace('-', ' ').replace('.', ' ').replace('_', ' ').split())
+    best, best_ratio = None, SCAN_MIN_RATIO
+    for marker, aliases in LAB_ALIASES.items():
+        for alias in aliases:
+            ratio = difflib.SequenceMatcher(None, text, alias).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = marker, ratio
+    return best
+
+
+def scan_find(text: str) -> list:
+    """Markers in text: every window of up to SCAN_WORDS words against every alias"""
+    words = text.split()
+    found, i = [], 0
+    while i < len(words):
+        for size in range(min(SCAN_WORDS, len(words) - i), 0, -1):
+            marker = scan_resolve(" ".join(words[i:i + size]))
+            if marker is not None:
+                found.append(marker)
+                i += size
+                break
+        else:
+            i += 1
+    return found
+
+
+def random_document(rng: random.Random, rate: float):
+    """One page of boilerplate with damaged lab rows, and the markers it holds"""
+    parts, markers = [], []
+    for _ in range(rng.randint(10, 30)):
+        parts.append(rng.choice(PROSE))
+    for label, marker in rng.sample(PRINTED_LABELS, rng.randint(3, 8)):
+        parts.append(f"{damage(label, rng, rate)} {rng.uniform(1, 200):.1f} mg/dl")
+        markers.append(marker)
+    rng.shuffle(parts)
+    return " ".join(parts), markers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=20, help='Documents in the corpus (the scan is slow)')
+    parser.add_argument('--labels', type=int, default=2000, help='Damaged labels for the accuracy check')
+    parser.add_argument('--rate', type=float, default=0.12, help='Per-character OCR damage rate')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    index = LabelIndex(LAB_ALIASES)
+
+    samples = [rng.choice(PRINTED_LABELS) for _ in range(args.labels)]
+    samples = [(damage(label, rng, args.rate), marker) for label, marker in samples]
+    for name, resolve in (("LabelIndex", lambda label: (index.resolve(label) or (None,))[0]),
+                          ("alias scan", scan_resolve)):
+        correct = sum(1 for label, marker in samples if resolve(label) == marker)
+        unresolved = sum(1 for label, _ in samples if resolve(label) is None)
+        boilerplate = {word for line in PROSE for word in line.split()}
+        false_hits = sorted(word for word in boilerplate if resolve(word) is not None)
+        print(f"{name:>10}: {correct / len(samples):6.1%} correct, {unresolved / len(samples):6.1%} unresolved, "
+              f"boilerplate words resolved: {', '.join(false_hits) or 'none'}")
+
+    documents = [random_document(rng, args.rate) for _ in range(args.documents)]
+    words = sum(len(text.split()) for text, _ in documents) / len(documents)
+    cold = LabelIndex(LAB_ALIASES)
+    start = time.perf_counter()
+    for text, _ in documents:
+        cold.find(text)
+    cold_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for text, _ in documents:
+        cold.find(text)
+    warm_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for text, _ in documents:
+        scan_find(text)
+    scan_time = time.perf_counter() - start
+
+    per_doc = 1000 / len(documents)
+    print(f"\n{len(documents)} documents, {words:.0f} words avg")
+    print(f"  LabelIndex first pass {cold_time * per_doc:8.3f} ms/doc   "
+          f"memoized {warm_time * per_doc:8.3f} ms/doc")
+    print(f"  alias scan            {scan_time * per_doc:8.3f} ms/doc   "
+          f"speedup {scan_time / warm_time:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+OCR preprocessing benchmark
+Runs a fixture corpus through preprocessing configurations and reports
+per-step latency, output size, OCR latency and extraction accuracy
+
+Without --fixtures a seeded synthetic corpus is generated: lab reports
+rendered at phone-photo resolution (12MP JPEG) with margins, a slight
+rotation and noise. A fixture directory holds images plus an
+expected.json mapping file names to lab values, e.g.
+    {"report1.jpg": {"hba1c": 6.2, "ldl": 145}}
+
+Run from the repository root:
+    python benchmarks/bench_ocr_preprocessing.py --images 10
+    python benchmarks/bench_ocr_preprocessing.py --fixtures path/to/reports --no-ocr
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "backend"))
+
+from ai.ocr.ocr_pipeline import create_reader, extract_boxes, ocr_page, parse_pages, reading_values
+from ai.ocr.preprocessing import STEPS, load_and_preprocess
+from app.config import settings
+
+# name -> enabled steps; cumulative, so each row shows one step's effect
+CONFIGURATIONS = [
+    ('none', ()),
+    ('+reduced_decode', ('reduced_decode',)),
+    ('+grayscale', ('reduced_decode', 'grayscale')),
+    ('+downscale', ('reduced_decode', 'grayscale', 'downscale')),
+    ('+crop', ('reduced_decode', 'grayscale', 'downscale', 'crop')),
+    ('+deskew', ('reduced_decode', 'grayscale', 'downscale', 'crop', 'deskew')),
+    ('+contrast', STEPS),
+    ('settings', tuple(settings.OCR_PREPROCESS_STEPS)),
+]
+
+REPORT_LINES = [
+    ("HbA1c", "hba1c", "{:.1f} %", 4.5, 11.0),
+    ("Fasting Glucose", "fasting_glucose", "{:.0f} mg/dL", 70, 200),
+    ("LDL Cholesterol", "ldl", "{:.0f} mg/dL", 60, 220),
+    ("HDL Cholesterol", "hdl", "{:.0f} mg/dL", 25, 90),
+    ("Triglycerides", "triglycerides", "{:.0f} mg/dL", 50, 400),
+    ("Hemoglobin", "hemoglobin", "{:.1f} g/dL", 9.0, 18.0),
+    ("TSH", "tsh", "{:.2f} mIU/L", 0.3, 8.0),
+]
+
+
+def synthetic_report(rng: random.Random) -> Tuple[bytes, Dict[str, float]]:
+    """One rendered lab report as JPEG bytes plus its expected values"""
+    height, width = 3000, 4000
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    # Paper tint, as in a photo under indoor light
+    page[:] = (rng.randint(200, 235), rng.randint(210, 240), rng.randint(215, 245))
+
+    left, top = rng.randint(300, 700), rng.randint(300, 600)
+    cv2.putText(page, "LABORATORY REPORT", (left, top), cv2.FONT_HERSHEY_SIMPLEX, 3.0, (20, 20, 20), 7)
+    expected = {}
+    for row, (label, key, fmt, low, high) in enumerate(REPORT_LINES):
+        value = float(fmt.split()[0].format(rng.uniform(low, high)))
+        expected[key] = value
+        y = top + 220 + row * 170
+        cv2.putText(page, label, (left, y), cv2.FONT_HERSHEY_SIMPLEX, 2.4, (30, 30, 30), 5)
+        cv2.putText(page, fmt.format(value), (left + 1500, y), cv2.FONT_HERSHEY_SIMPLEX, 2.4, (30, 30, 30), 5)
+
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), rng.uniform(-6, 6), 1.0)
+    border = tuple(int(c) for c in page[0, 0])
+    page = cv2.warpAffine(page, matrix, (width, height), borderValue=border)
+    noise = np.random.default_rng(rng.randint(0, 2**31)).normal(0, 8, page.shape)
+    page = np.clip(page + noise, 0, 255).astype(np.uint8)
+
+    ok, encoded = cv2.imencode(".jpg", page, [cv2.IMWRITE_JPEG_QUALITY, 88])
+    return encoded.tobytes(), expected
+
+
+def load_corpus(args) -> List[Tuple[str, bytes, Dict[str, float]]]:
+    """[(name, image bytes, expected values), ...]"""
+    if args.fixtures:
+        fixtures = Path(args.fixtures)
+        expected = json.loads((fixtures / "expected.json").read_text())
+        return [(name, (fixtures / name).read_bytes(), values) for name, values in sorted(expected.items())]
+    rng = random.Random(args.seed)
+    return [(f"synthetic-{i}.jpg", *synthetic_report(rng)) for i in range(args.images)]
+
+
+def accuracy(found: Dict[str, float], expected: Dict[str, float]) -> Tuple[int, int]:
+    """(values extracted exactly, values expected)"""
+    hits = sum(1 for key, value in expected.items() if found.get(key) is not None and abs(found[key] - value) < 1e-6)
+    return hits, len(expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=None, help='Directory with images and expected.json')
+    parser.add_argument('--images', type=int, default=10, help='Synthetic reports to generate (without --fixtures)')
+    parser.add_argument('--seed', type=int, default=7, help='Seed for the synthetic corpus')
+    parser.add_argument('--no-ocr', action='store_true', help='Time preprocessing only (no easyocr needed)')
+    parser.add_argument('--max-side', type=int, default=settings.OCR_MAX_SIDE, help='Long side cap for downscale')
+    parser.add_argument('--text-height', type=int, default=settings.OCR_TARGET_TEXT_HEIGHT,
+                        help='Target glyph height for downscale (0 = off)')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    print(f"Corpus: {len(corpus)} images, {sum(len(expected) for _, _, expected in corpus)} expected values")
+
+    reader = None
+    if not args.no_ocr:
+        try:
+            reader = create_reader()
+        except ImportError:
+            print("easyocr is not installed - timing preprocessing only (--no-ocr)")
+
+    print(f"\n{'configuration':<16}{'prep ms':>9}{'output':>12}{'ocr ms':>9}{'total ms':>10}{'accuracy':>10}  slowest step")
+    for name, steps in CONFIGURATIONS:
+        prep_times, ocr_times, step_totals = [], [], {}
+        hits = total = 0
+        shape = None
+        for _, content, expected in corpus:
+            start = time.perf_counter()
+            image, timings = load_and_preprocess(content, steps, args.max_side, args.text_height)
+            prep_times.append(time.perf_counter() - start)
+            for step, seconds in timings.items():
+                step_totals[step] = step_totals.get(step, 0.0) + seconds
+            shape = image.shape
+
+            if reader is not None:
+                if image.ndim == 3:
+                    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                start = time.perf_counter()
+                boxes = extract_boxes(image, reader)
+                ocr_times.append(time.perf_counter() - start)
+                found = reading_values(parse_pages([ocr_page(boxes)]))
+                found_hits, found_total = accuracy(found, expected)
+                hits += found_hits
+                total += found_total
+
+        prep_ms = statistics.median(prep_times) * 1000
+        slowest = max(step_totals, key=step_totals.get)
+        slowest_ms = step_totals[slowest] / len(corpus) * 1000
+        output = f"{shape[1]}x{shape[0]}"
+        if reader is None:
+            print(f"{name:<16}{prep_ms:>9.1f}{output:>12}{'-':>9}{'-':>10}{'-':>10}  {slowest} {slowest_ms:.1f} ms")
+        else:
+            ocr_ms = statistics.median(ocr_times) * 1000
+            print(f"{name:<16}{prep_ms:>9.1f}{output:>12}{ocr_ms:>9.0f}{prep_ms + ocr_ms:>10.0f}"
+                  f"{hits / total:>10.1%}  {slowest} {slowest_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Prediction response serialization benchmark
+Compares the FAST_SERIALIZATION path with the RiskResponse model path, for
+serialization alone and end to end (byte-for-byte agreement is checked by
+backend/tests/test_serialization.py)
+
+Run from the repository root:
+    python benchmarks/bench_serialization.py --requests 500
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "backend"))
+
+# Measure the work itself, not cache hits
+os.environ.setdefault("PREDICT_CACHE_BACKEND", "none")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from ai.knowledge_base import get_knowledge_base
+from ai.risk.risk_model import predict_risks
+from app.config import settings
+from app.routers import predict
+from app.schemas.prediction import RiskRequest, RiskResponse
+from app.services import serialization_service
+from app.services.prediction_service import to_risk_response, to_user_data
+from app.services.serialization_service import render_risk_response
+from bench_batch_risk import best_of
+from cohort import random_patients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='Requests per end-to-end timing')
+    args = parser.parse_args()
+
+    kb = get_knowledge_base()
+    encoder = 'orjson' if serialization_service.orjson is not None else 'json (orjson not installed)'
+    print(f"Encoder: {encoder}")
+
+    # ---- Serialization only (engine output -> response bytes) ----
+    demo_cases = list(kb.sample_inputs.get('demo_cases', {}).values())
+    cohort = demo_cases + random_patients(args.requests, seed=7)
+    # Empty lifestyles are engine-only input; the API rejects them
+    sample = [case for case in cohort if case.get('lifestyle')][:args.requests]
+    outputs = [predict_risks(to_user_data(RiskRequest(**case)), kb) for case in sample]
+    adapter = TypeAdapter(RiskResponse)
+
+    def model_path():
+        # What the endpoint did: build models, then response_model validates and dumps them
+        for ai_results in outputs:
+            adapter.dump_json(adapter.validate_python(to_risk_response(ai_results, kb)))
+
+    def fast_path():
+        for ai_results in outputs:
+            render_risk_response(ai_results, kb.version)
+
+    model = best_of(model_path) / len(outputs)
+    fast = best_of(fast_path) / len(outputs)
+
+    # ---- End to end (POST /api/predict-risk/) ----
+    app = FastAPI()
+    app.include_router(predict.router, prefix="/api")
+    client = TestClient(app)
+
+    def post_all():
+        for case in sample:
+            client.post('/api/predict-risk/', json=case)
+
+    timings = {}
+    for mode in (False, True):
+        settings.FAST_SERIALIZATION = mode
+        post_all()  # warm up
+        timings[mode] = best_of(post_all) / len(sample)
+
+    print(f"\n{'stage':<34}{'model path us':>15}{'fast us':>10}{'speedup':>10}")
+    for label, slow_time, fast_time in [
+        ('engine output -> bytes', model, fast),
+        ('POST /api/predict-risk/', timings[False], timings[True]),
+    ]:
+        print(f"{label:<34}{slow_time * 1e6:>15.1f}{fast_time * 1e6:>10.1f}{slow_time / fast_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Two-stage OCR benchmark
+Compares full-page recognition (readtext) with two-stage OCR (detect once,
+recognize only rows holding a lab label) on lab reports: latency, text
+width recognized, fallbacks and extraction accuracy
+
+Without --fixtures a seeded synthetic corpus of scanned A4 reports is
+generated: letterhead, patient block, a lab table, a disclaimer paragraph
+and a signature. A fixture directory holds images plus an expected.json
+mapping file names to lab values (as for bench_ocr_preprocessing.py).
+
+Run from the repository root (needs easyocr):
+    python benchmarks/bench_two_stage_ocr.py --images 10
+    python benchmarks/bench_two_stage_ocr.py --fixtures path/to/reports --required hba1c ldl
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ai.ocr.ocr_pipeline import LAB_MATCHER, create_reader, extract_boxes, ocr_page, parse_pages, reading_values
+from ai.ocr.preprocessing import load_and_preprocess
+from ai.ocr.two_stage import extract_two_stage
+from bench_ocr_preprocessing import REPORT_LINES, accuracy
+
+# Preprocessing applied to every image before either OCR mode
+STEPS = ('reduced_decode', 'grayscale', 'downscale', 'crop', 'deskew')
+
+LETTERHEAD = [
+    "CITY DIAGNOSTIC LABORATORIES PVT LTD",
+    "NABL accredited - 221 Park Street, Kolkata 700016 - Tel 033 4000 1234 - www.citydiagnostics.example",
+]
+PATIENT = [
+    "Patient Name: {name}   Age/Sex: {age} Y / {sex}   Sample ID: {sample}",
+    "Referred by: Dr. {doctor} MBBS MD   Collected: 12/03/2024 08:15   Reported: 12/03/2024 14:02",
+]
+DISCLAIMER = [
+    "Results relate only to the sample as received. Reference ranges are age and sex specific and",
+    "should be interpreted by a registered medical practitioner together with clinical findings.",
+    "This is an electronically verified report and does not require a physical signature.",
+    "Partial reproduction of this report is not permitted without written approval of the laboratory.",
+]
+SIGNATURE = ["Dr. {doctor} MD (Pathology)", "Consultant Pathologist - Reg. No. {reg}", "*** End of Report ***"]
+NAMES = ["Anita Sharma", "Rahul Verma", "Priya Nair", "Vikram Singh", "Meera Iyer"]
+
+
+def synthetic_report(rng: random.Random) -> Tuple[bytes, Dict[str, float]]:
+    """One scanned A4 report (200 dpi PNG) plus its expected values"""
+    height, width = 2339, 1654
+    page = np.full((height, width), 255, dtype=np.uint8)
+    font, y = cv2.FONT_HERSHEY_SIMPLEX, 110
+
+    def text(line, x, scale=0.9, thickness=2):
+        cv2.putText(page, line, (x, y), font, scale, 20, thickness)
+
+    text(LETTERHEAD[0], 120, 1.4, 3)
+    y += 50
+    text(LETTERHEAD[1], 120, 0.7)
+    y += 90
+    fields = dict(name=rng.choice(NAMES), age=rng.randint(25, 80), sex=rng.choice("MF"),
+                  sample=rng.randint(10**6, 10**7), doctor=rng.choice(NAMES), reg=rng.randint(1000, 99999))
+    for line in PATIENT:
+        text(line.format(**fields), 120, 0.75)
+        y += 45
+
+    y += 60
+    expected = {}
+    for label, key, fmt, low, high in rng.sample(REPORT_LINES, rng.randint(4, len(REPORT_LINES))):
+        value = float(fmt.split()[0].format(rng.uniform(low, high)))
+        expected[key] = value
+        text(label, 120)
+        text(fmt.format(value), 800)
+        y += 60
+
+    y += 80
+    for line in DISCLAIMER:
+        text(line, 120, 0.7)
+        y += 40
+    y += 120
+    for line in SIGNATURE:
+        text(line.format(**fields), 1000, 0.75)
+        y += 45
+
+    noise = np.random.default_rng(rng.randint(0, 2**31)).normal(0, 6, page.shape)
+    page = np.clip(page + noise, 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode(".png", page)
+    return encoded.tobytes(), expected
+
+
+def load_corpus(args) -> List[Tuple[str, bytes, Dict[str, float]]]:
+    """[(name, image bytes, expected values), ...]"""
+    if args.fixtures:
+        fixtures = Path(args.fixtures)
+        expected = json.loads((fixtures / "expected.json").read_text())
+        return [(name, (fixtures / name).read_bytes(), values) for name, values in sorted(expected.items())]
+    rng = random.Random(args.seed)
+    return [(f"synthetic-{i}.png", *synthetic_report(rng)) for i in range(args.images)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=None, help='Directory with images and expected.json')
+    parser.add_argument('--images', type=int, default=10, help='Synthetic reports to generate (without --fixtures)')
+    parser.add_argument('--seed', type=int, default=7, help='Seed for the synthetic corpus')
+    parser.add_argument('--required', nargs='*', default=[], help='Labs that must be found to skip the fallback')
+    args = parser.parse_args()
+
+    try:
+        reader = create_reader()
+    except ImportError:
+        sys.exit("easyocr is not installed - this benchmark needs a real reader")
+
+    corpus = load_corpus(args)
+    images = [(load_and_preprocess(content, STEPS)[0], expected) for _, content, expected in corpus]
+    print(f"Corpus: {len(images)} images, {sum(len(expected) for _, expected in images)} expected values")
+    # First inference pays for lazy model setup
+    extract_boxes(images[0][0], reader)
+
+    full_times, staged_times = [], []
+    full_hits = staged_hits = total = fallbacks = 0
+    cheap_width = full_width = page_width = 0
+    for image, expected in images:
+        start = time.perf_counter()
+        boxes = extract_boxes(image, reader)
+        full_times.append(time.perf_counter() - start)
+        hits, count = accuracy(reading_values(parse_pages([ocr_page(boxes)])), expected)
+        full_hits += hits
+        total += count
+        page_width += sum(box[3] - box[1] for box in boxes)
+
+        start = time.perf_counter()
+        boxes, stats = extract_two_stage(image, reader, LAB_MATCHER, args.required)
+        staged_times.append(time.perf_counter() - start)
+        staged_hits += accuracy(reading_values(parse_pages([ocr_page(boxes)])), expected)[0]
+        cheap_width += stats["cheap_width"]
+        full_width += stats["full_width"]
+        fallbacks += stats["fallback"]
+
+    full_ms = statistics.median(full_times) * 1000
+    staged_ms = statistics.median(staged_times) * 1000
+    print(f"\n{'mode':<12}{'median ms':>11}{'text px':>10}{'accuracy':>10}")
+    print(f"{'full':<12}{full_ms:>11.0f}{page_width / len(images):>10.0f}{full_hits / total:>10.1%}")
+    print(f"{'two_stage':<12}{staged_ms:>11.0f}{(cheap_width + full_width) / len(images):>10.0f}"
+          f"{staged_hits / total:>10.1%}")
+    print(f"\nTime saved: {1 - staged_ms / full_ms:.0%}   fallbacks: {fallbacks}/{len(images)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Random patient cohorts
+The one patient generator shared by the benchmarks and backend/tests, so
+timings and agreement checks run on the same kind of input: aliased lab
+keys, missing lab values, empty lifestyles and repeated diseases included
+"""
+
+import random
+from typing import List, Optional
+
+LAB_RANGES = {
+    'hba1c': (4, 10), 'fasting_glucose': (70, 200), 'random_glucose': (70, 250),
+    'ldl': (50, 250), 'hdl': (20, 80), 'triglycerides': (50, 400),
+    'total_cholesterol': (120, 350), 'systolic_bp': (90, 180), 'diastolic_bp': (55, 110),
+    'tsh': (0.2, 9), 't4': (3, 15), 't3': (50, 250), 'hemoglobin': (8, 17),
+    'rbc': (3, 6), 'mcv': (60, 100), 'mch': (20, 35)
+}
+
+# Lab keys as OCR clients send them
+LAB_KEY_VARIANTS = {'ldl': 'LDL-C', 'hba1c': 'HbA1c', 'triglycerides': 'Trig1ycerides', 'tsh': 'TSH'}
+
+
+def random_patient(rng: random.Random, disease_ids: List[str]) -> dict:
+    """Random predict_risks input (RiskRequest-shaped unless lifestyle is empty)"""
+    lab_values = {}
+    if rng.random() < 0.7:
+        for marker in rng.sample(sorted(LAB_RANGES), rng.randint(0, 10)):
+            low, high = LAB_RANGES[marker]
+            value = round(rng.uniform(low, high), 1)
+            if rng.random() < 0.05:
+                value = None
+            key = LAB_KEY_VARIANTS.get(marker, marker) if rng.random() < 0.2 else marker
+            lab_values[key] = value
+
+    return {
+        'patient': {
+            'age': rng.randint(15, 90),
+            'gender': rng.choice(['M', 'F', 'Other']),
+            'weight': round(rng.uniform(40, 140), 1),
+            'height': round(rng.uniform(140, 200), 1),
+            'known_issues': []
+        },
+        'lifestyle': {} if rng.random() < 0.05 else {
+            'smoking': rng.random() < 0.3,
+            'alcohol': rng.choice(['none', 'occasional', 'moderate', 'heavy', 'daily']),
+            'exercise': rng.choice(['sedentary', 'none', 'rare', 'occasional', 'regular']),
+            'diet': rng.choice(['balanced', 'high_sugar', 'high_fat_diet', 'high_salt', 'vegan']),
+            'sleep_hours': rng.choice([4, 5, 6, 7, 8]),
+            'stress_level': rng.choice(['low', 'moderate', 'high', 'severe'])
+        },
+        'family': [
+            {
+                'role': 'relative',
+                'generation': rng.choice([-1, 0, 1, 2]),
+                # Repeats allowed: a relative still counts once per disease
+                'known_issues': rng.choices(disease_ids + ['unknown_disease'], k=rng.randint(0, 3))
+            }
+            for _ in range(rng.randint(0, 6))
+        ],
+        'lab_values': lab_values
+    }
+
+
+def random_patients(count: int, seed: int = 42, disease_ids: Optional[List[str]] = None) -> List[dict]:
+    """
+    count random patients, reproducible for a given seed
+
+    Args:
+        count: Number of patients
+        seed: Random seed
+        disease_ids: Diseases relatives may have (defaults to the active knowledge base)
+    """
+    if disease_ids is None:
+        from ai.knowledge_base import get_knowledge_base
+        disease_ids = [d['id'] for d in get_knowledge_base().diseases]
+    rng = random.Random(seed)
+    return [random_patient(rng, disease_ids) for _ in range(count)]
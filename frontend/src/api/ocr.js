@@ -5,10 +5,17 @@
 
 import { apiClient } from './client';
 
+// Poll settings for OCR jobs - OCR of a phone photo can take a while
+const JOB_POLL_INTERVAL = 1000; // 1 second
+const JOB_TIMEOUT = 180000; // 3 minutes
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 /**
  * Upload medical report for OCR processing
+ * Queues an OCR job and polls it, so slow OCR never hits the request timeout
  * @param {File} file - Image or PDF file containing lab report
- * @returns {Promise} Extracted lab values
+ * @returns {Promise} Finished job: { job_id, status, lab_values, error }
  */
 export const uploadReport = async (file) => {
   try {
@@ -16,14 +23,27 @@ export const uploadReport = async (file) => {
     const formData = new FormData();
     formData.append('file', file);
     
-    // Send with multipart/form-data header
-    const response = await apiClient.post('/ocr/', formData, {
+    // Send with multipart/form-data header - returns at once with a job ID
+    const response = await apiClient.post('/ocr/jobs', formData, {
       headers: {
         'Content-Type': 'multipart/form-data'
       }
     });
     
-    return response.data;
+    let job = response.data;
+    const deadline = Date.now() + JOB_TIMEOUT;
+    while (job.status === 'queued' || job.status === 'running') {
+      if (Date.now() > deadline) {
+        throw new Error('OCR job timed out');
+      }
+      await sleep(JOB_POLL_INTERVAL);
+      job = (await apiClient.get(`/ocr/jobs/${job.job_id}`)).data;
+    }
+    
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'OCR job failed');
+    }
+    return job;
   } catch (error) {
     console.error('Error uploading report:', error);
     throw error;